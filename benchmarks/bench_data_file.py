@@ -0,0 +1,41 @@
+"""Size and load/save time of the data file, version 1 (pretty JSON) vs version 2 per compression.
+
+    python benchmarks/bench_data_file.py [events] [roster]
+"""
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('LEADER_BACKEND', 'local')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import raid_bot  # noqa: E402
+from synthetic import synthetic_data  # noqa: E402
+
+
+def _timed(fn, runs: int = 3):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - start) / runs * 1e3, result
+
+
+def main(events: int = 10_000, roster: int = 10) -> None:
+    raw  = synthetic_data(events, roster)
+    data = raid_bot._load_model(json.loads(json.dumps(raw)))
+    print(f"{events} events x {roster} signups")
+    print(f"  {'format':<10} {'size':>9} {'save':>9} {'load':>9}")
+
+    save, v1 = _timed(lambda: json.dumps(data, indent=2, default=raid_bot._json_default).encode())
+    load, _  = _timed(lambda: raid_bot._decode_state(v1))
+    print(f"  {'v1 pretty':<10} {len(v1) / 1e6:6.2f} MB {save:6.0f} ms {load:6.0f} ms")
+    for compression in ('none', 'zlib', 'lzma'):
+        save, v2   = _timed(lambda: raid_bot._encode_state(data, compression))
+        load, back = _timed(lambda: raid_bot._decode_state(v2))
+        assert back == raw, f"{compression} round trip changed the data"
+        print(f"  {'v2 ' + compression:<10} {len(v2) / 1e6:6.2f} MB {save:6.0f} ms {load:6.0f} ms")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
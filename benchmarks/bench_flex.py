@@ -0,0 +1,66 @@
+"""Per-click cost of re-solving flexible signups on a busy event.
+
+Builds a Vale Guardian event (three boons, three special roles) with N flexible signups
+of three choices each, then times what a signup click pays for: a full re-solve after one
+player changes their choices, and the skipped solve when an unrelated click saves.
+
+    python benchmarks/bench_flex.py [signups] [clicks]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('LEADER_BACKEND', 'local')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import raid_bot  # noqa: E402
+
+TEMPLATE = 'W1 - Vale Guardian'
+COMBOS   = [('Tank', None), ('Heal', 'Alacrity'), ('Heal', 'Quickness'), ('Heal', None),
+            ('DPS', 'Alacrity'), ('DPS', 'Quickness'), ('DPS', None), ('DPS', 'Condi')]
+
+
+def _event(signups: int, rng: random.Random) -> raid_bot.Event:
+    fields = raid_bot._template_fields(TEMPLATE)
+    event  = raid_bot.Event(dict(fields, name=TEMPLATE, description='', unix_ts=1_900_000_000,
+                                 status='open', participants={}, flex={}))
+    specials = list(fields['special_role_limits'])
+    for i in range(signups):
+        event['flex'][str(i)] = {'name': f'Player {i}', 'choices': [list(c) for c in rng.sample(COMBOS, 3)],
+                                 'specials': rng.sample(specials, 2), 'joined': float(i)}
+    return event
+
+
+def main(signups: int = 60, clicks: int = 200) -> None:
+    rng = random.Random(35)
+    with tempfile.TemporaryDirectory() as root:
+        raid_bot.leader.renew()
+        raid_bot.stores = raid_bot.StoreRegistry(root)
+        raid_bot._current_guild.set(1)
+        st    = raid_bot.stores.get(1)
+        event = st.data['events']['1'] = _event(signups, rng)
+        raid_bot._rebalance('1', event)
+
+        start = time.perf_counter()
+        for _ in range(clicks):
+            uid = str(rng.randrange(signups))
+            event['flex'][uid]['choices'] = [list(c) for c in rng.sample(COMBOS, 3)]
+            raid_bot._rebalance('1', event)
+        solve = (time.perf_counter() - start) / clicks
+
+        start = time.perf_counter()
+        for _ in range(clicks):
+            raid_bot._rebalance('1', event)
+        skip = (time.perf_counter() - start) / clicks
+
+        seated = sum(1 for p in event['participants'].values() if p.get('flex'))
+        raid_bot.leader.release()
+    print(f"{signups} flexible signups, {seated} seated on {TEMPLATE}")
+    print(f"  re-solve after a changed signup: {solve * 1e3:8.2f} ms/click")
+    print(f"  unrelated click (solve skipped): {skip * 1e6:8.1f} us/click")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,39 @@
+"""Memory held by a loaded data file: plain JSON dicts vs the slotted model records.
+
+    python benchmarks/bench_model_memory.py [events] [roster]
+"""
+import json
+import os
+import sys
+import tracemalloc
+
+os.environ.setdefault('LEADER_BACKEND', 'local')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import raid_bot  # noqa: E402
+from synthetic import synthetic_data  # noqa: E402
+
+
+def _traced(build):
+    """Bytes still allocated by build() once it returns, and its result."""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def main(events: int = 10_000, roster: int = 10) -> None:
+    raw  = synthetic_data(events, roster)
+    text = json.dumps(raw)
+    plain, _     = _traced(lambda: json.loads(text))
+    model, data  = _traced(lambda: raid_bot._load_model(json.loads(text)))
+    lossless     = json.loads(json.dumps(data, default=raid_bot._json_default)) == raw
+    print(f"{events} events x {roster} signups")
+    print(f"  plain dicts:   {plain / 1e6:7.1f} MB")
+    print(f"  model records: {model / 1e6:7.1f} MB ({(1 - model / plain) * 100:.0f}% less)")
+    print(f"  lossless round trip: {lossless}")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
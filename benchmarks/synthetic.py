@@ -0,0 +1,35 @@
+"""A synthetic guild data file for the benchmarks: many closed events with full rosters."""
+import random
+
+ROLES = ['Tank', 'Heal', 'DPS']
+BOONS = [None, 'Alacrity', 'Quickness']
+
+
+def synthetic_data(events: int = 10_000, roster: int = 10, players: int = 300, seed: int = 0) -> dict:
+    """Plain JSON-shaped data, as a version 1 file would hold it."""
+    rng   = random.Random(seed)
+    uids  = [str(100_000_000_000_000_000 + i) for i in range(players)]
+    names = {uid: f'Player {i}' for i, uid in enumerate(uids)}
+
+    def event(i: int) -> dict:
+        participants = {
+            uid: {'name': names[uid], 'role': rng.choice(ROLES), 'boon': rng.choice(BOONS),
+                  'special_role': rng.choice([None, 'Kite'])}
+            for uid in rng.sample(uids, roster)
+        }
+        return {
+            'name': f'Event {i}', 'description': '', 'unix_ts': 1_700_000_000 + i * 3600,
+            'type': 'raid', 'boss': 'W1 - Vale Guardian', 'wing': 'W1 - Spirit Vale',
+            'role_limits': {'Tank': 1, 'Heal': 2, 'DPS': 7}, 'boon_limits': {'Alacrity': 2, 'Quickness': 2},
+            'special_role_limits': {'Kite': 1}, 'open_signup': False, 'creator_id': 1,
+            'participants': participants, 'channel_id': 2, 'message_id': 3, 'status': 'closed',
+            'dm_sent': True, 'reminded_1h': True, 'reminded_30m': True, 'point_value': 10, 'series_id': '1',
+        }
+
+    return {
+        'next_event_id': events + 1, 'next_lottery_id': 2, 'next_series_id': 2,
+        'events':    {str(i): event(i) for i in range(1, events + 1)},
+        'players':   {uid: {'name': names[uid], 'points': 5, 'events_attended': 1} for uid in uids},
+        'lotteries': {'1': {'name': 'Spring', 'prizes': ['Legendary'], 'status': 'open', 'winners': []}},
+        'series':    {},
+    }
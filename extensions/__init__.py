@@ -0,0 +1 @@
+"""Parts of the bot loaded as discord.py extensions; see EXTENSIONS in raid_bot.py."""
@@ -0,0 +1,196 @@
+"""Officer event management: /delete_event, /edit_event, /add_attendee and /remove_attendee."""
+import discord
+from datetime import datetime
+from discord import app_commands
+
+from raid_bot import (
+    GuildModal, _announce_promotions, _event_choices, _is_officer, _leave_waitlist,
+    _refresh_event_embed, _remove_participant, _schedule_embed_refresh, _set_participant,
+    bot, dt_to_unix, load_data, parse_utc_offset, save_data, store,
+)
+
+
+# ---------------------------------------------------------------------------
+# Admin commands
+# ---------------------------------------------------------------------------
+
+@app_commands.command(name="delete_event", description="Delete an event and remove its Discord message (officers only)")
+async def delete_event(interaction: discord.Interaction, event_id: str):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+
+    data  = load_data()
+    event = data['events'].get(event_id)
+    if not event:
+        await interaction.response.send_message(f"❌ Event `{event_id}` not found.", ephemeral=True)
+        return
+
+    # Delete the public Discord message if we can find it
+    channel = bot.get_channel(event['channel_id'])
+    if channel and event.get('message_id'):
+        try:
+            message = await channel.fetch_message(event['message_id'])
+            await message.delete()
+        except discord.NotFound:
+            pass
+
+    del data['events'][event_id]
+    store.event_index.remove(event_id)
+    save_data(data)
+    await interaction.response.send_message(f"✅ Event `{event_id}` deleted.", ephemeral=True)
+
+
+@app_commands.command(name="edit_event", description="Edit event name, description, or time (officers only)")
+async def edit_event(interaction: discord.Interaction, event_id: str):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+
+    data  = load_data()
+    event = data['events'].get(event_id)
+    if not event:
+        await interaction.response.send_message(f"❌ Event `{event_id}` not found.", ephemeral=True)
+        return
+
+    await interaction.response.send_modal(EditEventModal(event_id, event))
+
+
+class EditEventModal(GuildModal, title='Edit Event'):
+    event_name = discord.ui.TextInput(label='Event Name', max_length=100)
+    description = discord.ui.TextInput(
+        label='Description',
+        style=discord.TextStyle.paragraph,
+        required=False,
+        max_length=500
+    )
+    event_time = discord.ui.TextInput(
+        label='New Date & Time (your local time)',
+        placeholder='YYYY-MM-DD HH:MM',
+        max_length=16
+    )
+    timezone = discord.ui.TextInput(
+        label='Your UTC offset',
+        placeholder='e.g. UTC+1  UTC-5  UTC (leave as UTC if unchanged)',
+        default='UTC',
+        max_length=10
+    )
+
+    def __init__(self, event_id: str, event: dict):
+        super().__init__()
+        self.event_id = event_id
+        # Pre-fill time as UTC so officer knows the current stored value
+        utc_dt = datetime.utcfromtimestamp(event['unix_ts'])
+        self.event_name.default  = event['name']
+        self.description.default = event.get('description', '')
+        self.event_time.default  = utc_dt.strftime('%Y-%m-%d %H:%M')
+
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            local_dt = datetime.strptime(self.event_time.value.strip(), "%Y-%m-%d %H:%M")
+        except ValueError:
+            await interaction.response.send_message(
+                "❌ Invalid time format. Use: YYYY-MM-DD HH:MM", ephemeral=True
+            )
+            return
+
+        try:
+            offset  = parse_utc_offset(self.timezone.value)
+            unix_ts = dt_to_unix(local_dt - offset)
+        except ValueError:
+            await interaction.response.send_message(
+                "❌ Invalid UTC offset. Use format: UTC+1, UTC-5, or UTC.", ephemeral=True
+            )
+            return
+
+        data  = load_data()
+        event = data['events'].get(self.event_id)
+        if not event:
+            await interaction.response.send_message("❌ Event no longer exists.", ephemeral=True)
+            return
+
+        event['name']        = self.event_name.value.strip()
+        event['description'] = self.description.value.strip()
+        event['unix_ts']     = unix_ts
+        # Reset reminder flags so they fire again at the new time
+        event['reminded_1h']  = False
+        event['reminded_30m'] = False
+        store.event_index.update(self.event_id, event)
+        save_data(data)
+
+        await _refresh_event_embed(event, self.event_id)
+        await interaction.response.send_message(f"✅ Event `{self.event_id}` updated.", ephemeral=True)
+
+
+@app_commands.command(name="add_attendee", description="Add a filler who attended but didn't sign up (officers only)")
+async def add_attendee(interaction: discord.Interaction, event_id: str, user: discord.Member):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+
+    data  = load_data()
+    event = data['events'].get(event_id)
+    if not event:
+        await interaction.response.send_message(f"❌ Event `{event_id}` not found.", ephemeral=True)
+        return
+
+    uid = str(user.id)
+    if uid in event['participants']:
+        await interaction.response.send_message(
+            f"❌ {user.display_name} is already on the roster.", ephemeral=True
+        )
+        return
+
+    _set_participant(event_id, event, uid, user.display_name, 'Filler')   # the resolved Member carries the nickname
+    save_data(data)
+    await _refresh_event_embed(event, event_id)
+    await interaction.response.send_message(
+        f"✅ Added **{user.display_name}** as a filler to event `{event_id}`.", ephemeral=True
+    )
+
+
+@app_commands.command(name="remove_attendee", description="Remove a player from an event roster or waitlist (officers only)")
+async def remove_attendee(interaction: discord.Interaction, event_id: str, user: discord.Member):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+
+    data  = load_data()
+    event = data['events'].get(event_id)
+    if not event:
+        await interaction.response.send_message(f"❌ Event `{event_id}` not found.", ephemeral=True)
+        return
+
+    uid = str(user.id)
+    if uid in event['participants']:
+        promoted = _remove_participant(event_id, event, uid)
+        where    = "roster"
+    elif _leave_waitlist(event, uid):
+        promoted = []
+        where    = "waitlist"
+    else:
+        await interaction.response.send_message(
+            f"❌ {user.display_name} isn't on that event's roster or waitlist.", ephemeral=True
+        )
+        return
+
+    save_data(data)
+    _announce_promotions(event_id, event, promoted)
+    _schedule_embed_refresh(event_id)
+    moved = f" {len(promoted)} player(s) moved up from the waitlist." if promoted else ""
+    await interaction.response.send_message(
+        f"✅ Removed **{user.display_name}** from the {where} of event `{event_id}`.{moved}", ephemeral=True
+    )
+
+
+@edit_event.autocomplete('event_id')
+@delete_event.autocomplete('event_id')
+@add_attendee.autocomplete('event_id')
+@remove_attendee.autocomplete('event_id')
+async def _any_event_autocomplete(interaction: discord.Interaction, current: str):
+    return _event_choices(current, open_only=False)
+
+
+async def setup(bot):
+    for command in (delete_event, edit_event, add_attendee, remove_attendee):
+        bot.tree.add_command(command)
@@ -0,0 +1,433 @@
+"""Attendance: /close_event, the attendance DMs and the reminder loop that sends them."""
+import discord
+import logging
+from datetime import datetime
+from discord.ext import tasks
+from discord import app_commands
+
+from raid_bot import (
+    GuildView, Player, _event_choices, _is_officer, _night_events, _run_in_due_guilds,
+    add_lottery_weight, bot, leader, load_data, save_data, store,
+)
+
+log = logging.getLogger('kds.attendance')
+
+
+# ---------------------------------------------------------------------------
+# Attendance confirmation
+# ---------------------------------------------------------------------------
+
+@app_commands.command(name="close_event", description="Close event and confirm who attended (officers only)")
+async def close_event(interaction: discord.Interaction, event_id: str):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+
+    data  = load_data()
+    event = data['events'].get(event_id)
+    if not event:
+        await interaction.response.send_message(f"❌ Event `{event_id}` not found.", ephemeral=True)
+        return
+    if event['status'] != 'open':
+        await interaction.response.send_message(f"❌ Event `{event_id}` is already closed.", ephemeral=True)
+        return
+
+    participants = event.get('participants', {})
+    if not participants:
+        event['status'] = 'closed'
+        store.event_index.update(event_id, event)
+        save_data(data)
+        await interaction.response.send_message(
+            f"✅ Event `{event_id}` closed. No participants — no points awarded.", ephemeral=True
+        )
+        return
+
+    embed = discord.Embed(
+        title=f"Close: {event['name']}",
+        description=(
+            "Select everyone who **actually attended**.\n"
+            f"Each confirmed player receives **{event['point_value']} points**."
+        ),
+        color=0xf39c12
+    )
+    await interaction.response.send_message(
+        embed=embed, view=AttendanceConfirmView(event_id, event), ephemeral=True
+    )
+
+
+class AttendanceConfirmView(GuildView):
+    def __init__(self, event_id: str, event: dict):
+        super().__init__(timeout=300)
+        self.event_id      = event_id
+        self.confirmed_uids = []           # populated by AttendanceSelect.callback
+        self.add_item(AttendanceSelect(event_id, event))
+
+    @discord.ui.button(label="Confirm & Award Points", style=discord.ButtonStyle.green, emoji="✅", row=1)
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        event = load_data()['events'].get(self.event_id)
+        if not event:
+            await interaction.response.edit_message(content="❌ Event not found.", embed=None, view=None)
+            return
+        if event['status'] != 'open':
+            # Confirmed already (e.g. via /close_event and the DM) — don't award twice, or write
+            await interaction.response.edit_message(content="❌ This event is already closed.", embed=None, view=None)
+            return
+        # No await between the check and the transaction body, so the event is still open in it
+        async with store.transaction() as data:
+            point_value = event['point_value']
+            totals      = _apply_attendance(data, {self.event_id: self.confirmed_uids})
+
+        awarded = [t['name'] for t in totals.values()]
+        if awarded:
+            names_text  = "\n".join(f"• {n}" for n in awarded)
+            result_text = f"✅ **Event closed.** {point_value} points awarded to:\n{names_text}"
+        else:
+            result_text = "✅ **Event closed.** No attendance confirmed — no points awarded."
+
+        await interaction.response.edit_message(content=result_text, embed=None, view=None)
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.grey, emoji="❌", row=1)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(content="Cancelled.", embed=None, view=None)
+
+
+class AttendanceSelect(discord.ui.Select):
+    def __init__(self, event_id: str, event: dict):
+        self.event_id    = event_id
+        participants     = event.get('participants', {})
+        point_value     = event['point_value']
+
+        options = [
+            discord.SelectOption(
+                label=p['name'][:100],
+                value=uid,
+                description=p['role'] + (f" [{p['boon']}]" if p.get('boon') else "")
+            )
+            for uid, p in participants.items()
+        ]
+        super().__init__(
+            placeholder="Select who attended...",
+            options=options,
+            min_values=0,
+            max_values=len(options),
+            row=0
+        )
+        self.point_value = point_value
+
+    async def callback(self, interaction: discord.Interaction):
+        # Store selected UIDs on the parent view for the Confirm button to read
+        self.view.confirmed_uids = self.values
+
+        # Show a live preview of who will receive points
+        if self.values:
+            data  = load_data()
+            event = data['events'].get(self.event_id)
+            names = [
+                event['participants'][uid]['name']
+                for uid in self.values
+                if uid in event.get('participants', {})
+            ]
+            preview = "\n".join(f"• {n}" for n in names)
+        else:
+            preview = "*(none selected)*"
+
+        embed = discord.Embed(
+            title="Attendance Preview",
+            description=(
+                f"**Will receive {self.point_value} points:**\n{preview}\n\n"
+                "Click **Confirm & Award Points** when ready."
+            ),
+            color=0xf39c12
+        )
+        await interaction.response.edit_message(embed=embed)
+
+
+def _apply_attendance(data: dict, confirmed: dict) -> dict:
+    """Award points for {event_id: [uid, ...]}, record who came and who didn't, and close those events.
+
+    Totals are accumulated first so each player record is written once, however
+    many of the events they attended. Returns {uid: {'name', 'points', 'events', 'awards'}}.
+    """
+    totals = {}
+    for eid, uids in confirmed.items():
+        event = data['events'].get(eid)
+        if not event or event['status'] != 'open':
+            continue
+        for uid in uids:
+            participant = event['participants'].get(uid)
+            if not participant:
+                continue
+            t = totals.setdefault(uid, {'name': participant['name'], 'points': 0, 'events': 0, 'awards': []})
+            t['name']    = participant['name']   # keep display name current
+            t['points'] += event['point_value']
+            t['events'] += 1
+            t['awards'].append((event['point_value'], event['unix_ts']))
+        came = set(uids)
+        event['attended'] = [uid for uid in event['participants'] if uid in came]
+        event['no_shows'] = [uid for uid in event['participants'] if uid not in came]
+        event['status']   = 'closed'
+        store.event_index.update(eid, event)
+
+    for uid, t in totals.items():
+        player = data['players'].setdefault(uid, Player(name=t['name'], points=0, events_attended=0))
+        for points, earned_at in t['awards']:
+            add_lottery_weight(player, points, earned_at)
+        player['name']             = t['name']
+        player['points']          += t['points']
+        player['events_attended'] += t['events']
+        store.index_player(uid)
+    return totals
+
+
+# --- Wing night: one attendance matrix for every boss of the night ---
+
+NIGHT_ATTENDANCE_MAX_SELECTS = 4    # select rows per message, plus a row for the buttons
+SELECT_MAX_OPTIONS           = 25   # Discord's limit per select
+
+
+def _attendance_pages(event: dict) -> list:
+    """The event's signups split into one list per select, as many as a message can hold."""
+    uids = list(event['participants'])[:NIGHT_ATTENDANCE_MAX_SELECTS * SELECT_MAX_OPTIONS]
+    return [uids[i:i + SELECT_MAX_OPTIONS] for i in range(0, len(uids), SELECT_MAX_OPTIONS)]
+
+
+def _night_attendance_chunks(events: list) -> list:
+    """Group (eid, event) pairs into messages of at most NIGHT_ATTENDANCE_MAX_SELECTS selects.
+    An event's selects always share a message, since confirming a message closes its events."""
+    chunks, used = [], NIGHT_ATTENDANCE_MAX_SELECTS
+    for eid, event in events:
+        need = len(_attendance_pages(event))
+        if used + need > NIGHT_ATTENDANCE_MAX_SELECTS:
+            chunks.append([])
+            used = 0
+        chunks[-1].append((eid, event))
+        used += need
+    return chunks
+
+
+def _night_attendance_embed(events: list, selected: dict) -> discord.Embed:
+    title = events[0][1]['name'].split(' — ')[0]
+    embed = discord.Embed(
+        title=f"📋 Attendance Check: {title}",
+        description=(
+            "Everyone who signed up is pre-selected as **attended**.\n"
+            "Deselect no-shows in each event, then confirm once for the whole night."
+        ),
+        color=0xf39c12
+    )
+    for eid, event in events:
+        count  = len(selected[eid])
+        hidden = len(event['participants']) - sum(len(page) for page in _attendance_pages(event))
+        value  = f"{count}/{len(event['participants'])} attended  •  {event['point_value']} pts each"
+        if hidden > 0:
+            value += f"\n⚠️ {hidden} more signups don't fit here and are counted as absent"
+        embed.add_field(name=f"{event.get('boss') or event['name']}  (ID: {eid})", value=value, inline=False)
+    return embed
+
+
+class NightAttendanceView(GuildView):
+    """Players × events attendance matrix: a multi-select per 25 signups of each event, confirmed in one write."""
+    def __init__(self, events: list):
+        # DMs are often answered hours later; the single-event view's 5 minutes is too short
+        super().__init__(timeout=12 * 3600)
+        self.events   = events
+        self.selected = {}
+        row = 0
+        for eid, event in events:
+            # Only the players a select shows are pre-selected, so every one of them can be deselected
+            pages = _attendance_pages(event)
+            self.selected[eid] = [uid for page in pages for uid in page]
+            for page, uids in enumerate(pages):
+                self.add_item(NightAttendanceSelect(eid, event, uids, row, page, len(pages)))
+                row += 1
+
+    @discord.ui.button(label="Confirm & Award Points", style=discord.ButtonStyle.green, emoji="✅", row=4)
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        events = load_data()['events']
+        if not any(events.get(eid, {}).get('status') == 'open' for eid in self.selected):
+            await interaction.response.edit_message(
+                content="❌ This wing night is already closed.", embed=None, view=None
+            )
+            return
+        async with store.transaction() as data:
+            totals = _apply_attendance(data, self.selected)   # skips events closed in the meantime
+
+        if totals:
+            lines = [f"• {t['name']} — {t['points']} pts ({t['events']} events)" for t in totals.values()]
+            result_text = "✅ **Wing night closed.** Points awarded:\n" + "\n".join(lines)
+        else:
+            result_text = "✅ **Wing night closed.** No attendance confirmed — no points awarded."
+        await interaction.response.edit_message(content=result_text[:2000], embed=None, view=None)
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.grey, emoji="❌", row=4)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(content="Cancelled.", embed=None, view=None)
+
+
+class NightAttendanceSelect(discord.ui.Select):
+    """One page (up to SELECT_MAX_OPTIONS players) of one event's attendance."""
+    def __init__(self, event_id: str, event: dict, uids: list, row: int, page: int, pages: int):
+        self.event_id = event_id
+        self.uids     = uids
+        options = []
+        for uid in uids:
+            p = event['participants'][uid]
+            options.append(discord.SelectOption(
+                label=p['name'][:100],
+                value=uid,
+                description=p['role'] + (f" [{p['boon']}]" if p.get('boon') else ""),
+                default=True,
+            ))
+        part = f" ({page + 1}/{pages})" if pages > 1 else ""
+        super().__init__(
+            placeholder=f"{event.get('boss') or event['name']}{part}: who attended?"[:150],
+            options=options,
+            min_values=0,
+            max_values=len(options),
+            row=row
+        )
+
+    async def callback(self, interaction: discord.Interaction):
+        mine     = set(self.uids)
+        selected = self.view.selected
+        selected[self.event_id] = [u for u in selected[self.event_id] if u not in mine] + list(self.values)
+        # Keep the checked state on re-render
+        for option in self.options:
+            option.default = option.value in self.values
+        await interaction.response.edit_message(
+            embed=_night_attendance_embed(self.view.events, self.view.selected), view=self.view
+        )
+
+
+# ---------------------------------------------------------------------------
+# Reminder loop
+# ---------------------------------------------------------------------------
+
+@tasks.loop(minutes=1)
+async def check_events():
+    """Run the reminder pass of every guild with something due."""
+    if leader.is_leader:
+        await _run_in_due_guilds(_check_guild_events, "Reminder pass")
+
+
+@check_events.before_loop
+async def _before_check_events():
+    await bot.wait_until_ready()   # reminders need the channel cache
+
+
+async def _check_guild_events():
+    """Send 1h and 30m reminders and post-event attendance DMs for the current guild's events."""
+    data = load_data()
+    now = datetime.now()
+
+    changed = False
+    # Snapshot the items: handlers may add events to the live store while we await below
+    for eid, event in list(data['events'].items()):
+        if event.get('status') != 'open':
+            continue
+
+        event_unix = event['unix_ts']
+        now_unix   = int(now.timestamp())
+        channel    = bot.get_channel(event['channel_id'])
+        if not channel:
+            continue
+
+        if not event.get('reminded_1h') and now_unix >= event_unix - 3600:
+            await _send_reminder(channel, event, "1 hour")
+            event['reminded_1h'] = True
+            changed = True
+
+        if not event.get('reminded_30m') and now_unix >= event_unix - 1800:
+            await _send_reminder(channel, event, "30 minutes")
+            event['reminded_30m'] = True
+            changed = True
+
+        if (not event.get('dm_sent')
+                and event.get('point_value', 0) > 0
+                and event.get('participants')
+                and now_unix >= event_unix + 7200):
+            if event.get('group_id'):
+                changed |= await _send_night_attendance_dm(data, event['group_id'], now_unix)
+            else:
+                await _send_attendance_dm(eid, event)
+                event['dm_sent'] = True
+                changed = True
+
+    if changed:
+        save_data(data)
+
+async def _send_reminder(channel, event: dict, time_left: str):
+    participants = event.get('participants', {})
+    if not participants:
+        return
+    mentions = " ".join(f"<@{uid}>" for uid in participants)
+    embed = discord.Embed(
+        title=f"⏰ Reminder: {event['name']}",
+        description=f"Starting in {time_left}!",
+        color=0xff9900
+    )
+    await channel.send(mentions, embed=embed)
+
+async def _send_attendance_dm(eid: str, event: dict):
+    """DM the event creator 2 hours after start to confirm attendance and award points."""
+    creator_id = event.get('creator_id')
+    if not creator_id:
+        return
+    try:
+        user = await bot.fetch_user(creator_id)
+        embed = discord.Embed(
+            title=f"📋 Attendance Check: {event['name']}",
+            description=(
+                f"This event started 2 hours ago.\n"
+                f"Select who attended to award **{event['point_value']} points** each."
+            ),
+            color=0xf39c12
+        )
+        await user.send(embed=embed, view=AttendanceConfirmView(eid, event))
+    except discord.Forbidden:
+        log.warning("Could not DM creator, DMs likely disabled", extra={'event_id': eid})
+    except Exception:
+        log.exception("Failed to send attendance DM", extra={'event_id': eid})
+
+
+async def _send_night_attendance_dm(data: dict, group_id: str, now_unix: int) -> bool:
+    """Once the whole wing night is 2h past its last start, DM one combined attendance matrix.
+
+    Returns True if any event was marked as DM'd.
+    """
+    pending = [
+        (eid, e) for eid, e in _night_events(data, group_id)
+        if not e.get('dm_sent') and e.get('point_value', 0) > 0 and e.get('participants')
+    ]
+    if not pending or now_unix < pending[-1][1]['unix_ts'] + 7200:
+        return False   # wait for the last boss so the creator gets a single DM
+
+    creator_id = pending[0][1].get('creator_id')
+    for eid, event in pending:
+        event['dm_sent'] = True
+    if not creator_id:
+        return True
+    try:
+        user = await bot.fetch_user(creator_id)
+        for chunk in _night_attendance_chunks(pending):
+            view = NightAttendanceView(chunk)
+            await user.send(embed=_night_attendance_embed(chunk, view.selected), view=view)
+    except discord.Forbidden:
+        log.warning("Could not DM creator, DMs likely disabled", extra={'group_id': group_id})
+    except Exception:
+        log.exception("Failed to send attendance DM", extra={'group_id': group_id})
+    return True
+
+
+@close_event.autocomplete('event_id')
+async def _open_event_autocomplete(interaction: discord.Interaction, current: str):
+    return _event_choices(current, open_only=True)
+
+
+async def setup(bot):
+    bot.tree.add_command(close_event)
+    check_events.start()
+
+
+async def teardown(bot):
+    check_events.cancel()
@@ -0,0 +1,135 @@
+"""Backups: the hourly snapshot loop and /restore_backup. The snapshot format lives in
+BackupChain (raid_bot)."""
+import discord
+import logging
+import asyncio
+import time
+import zlib
+from datetime import datetime, timezone
+from discord import app_commands
+from discord.ext import tasks
+
+from raid_bot import (
+    GuildView, MAX_CHOICES, Store, _is_officer, _schedule_embed_refresh, dt_to_unix, leader,
+    load_data, store, stores, unix_to_discord_ts,
+)
+
+log = logging.getLogger('kds.backups')
+
+
+# ---------------------------------------------------------------------------
+# Backups — periodic snapshots, restore to a point in time
+# ---------------------------------------------------------------------------
+
+BACKUP_INTERVAL_MINUTES = 60
+
+
+async def take_backup(st: Store) -> str:
+    """Back up a store's latest committed state. The read snapshot is immutable, so serialising,
+    diffing, compressing and writing can all run in a thread while handlers keep writing."""
+    async with st.backups.lock:
+        return await asyncio.to_thread(st.backups.write_snapshot, st.view, int(time.time()))
+
+
+@tasks.loop(minutes=BACKUP_INTERVAL_MINUTES)
+async def backup_loop():
+    """Snapshot every guild loaded this run; a guild that was never loaded can't have changed."""
+    if not leader.is_leader:
+        return
+    for guild_id, st in stores.loaded():
+        try:
+            kind = await take_backup(st)
+            log.info("Backup taken", extra={'guild_id': guild_id, 'kind': kind})
+        except OSError as e:
+            log.error("Backup failed", extra={'guild_id': guild_id, 'reason': str(e)})
+    # Backed up just now, so idle guilds can be let go without losing a snapshot
+    for guild_id in stores.evict_idle(time.time()):
+        log.info("Unloaded idle guild", extra={'guild_id': guild_id})
+
+
+def _parse_backup_time(value: str) -> int:
+    """Unix timestamp, 'YYYY-MM-DD HH:MM' or 'YYYY-MM-DD' (UTC) -> Unix timestamp. Raises ValueError."""
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return dt_to_unix(datetime.strptime(value, fmt).replace(tzinfo=timezone.utc))
+        except ValueError:
+            pass
+    raise ValueError(f"Cannot parse time: {value!r}")
+
+
+class RestoreConfirmView(GuildView):
+    def __init__(self, snapshot_ts: int, state: dict):
+        super().__init__(timeout=120)
+        self.snapshot_ts = snapshot_ts
+        self.state       = state
+
+    @discord.ui.button(label="Restore", style=discord.ButtonStyle.red, emoji="⏪")
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.defer()
+        await take_backup(stores.current())   # so the restore itself can be undone
+        store.replace(self.state)
+        for eid, event in load_data()['events'].items():
+            if event['status'] == 'open':
+                _schedule_embed_refresh(eid)
+        log.warning("State restored from backup", extra={'snapshot_ts': self.snapshot_ts})
+        await interaction.edit_original_response(
+            content=f"✅ Restored state from {unix_to_discord_ts(self.snapshot_ts, 'F')}. "
+                    f"The state just before the restore was backed up first.",
+            view=None
+        )
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.grey)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(content="❌ Restore cancelled.", view=None)
+
+
+@app_commands.command(name="restore_backup", description="Restore this server's bot data from a backup (officers only)")
+@app_commands.describe(when="Restore the newest backup at or before this time (YYYY-MM-DD HH:MM UTC)")
+async def restore_backup(interaction: discord.Interaction, when: str):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+    try:
+        target = _parse_backup_time(when)
+    except ValueError:
+        await interaction.response.send_message(
+            "❌ Use `YYYY-MM-DD HH:MM` (UTC) or pick a backup from the list.", ephemeral=True
+        )
+        return
+
+    await interaction.response.defer(ephemeral=True)
+    try:
+        snapshot_ts, state = await asyncio.to_thread(store.backups.state_at, target)
+    except (LookupError, OSError, ValueError, zlib.error) as e:
+        await interaction.followup.send(f"❌ Could not rebuild a backup: {e}", ephemeral=True)
+        return
+
+    summary = (f"{len(state.get('events', {}))} events, {len(state.get('players', {}))} players, "
+               f"{sum(p.get('points', 0) for p in state.get('players', {}).values())} points in total")
+    await interaction.followup.send(
+        f"⚠️ Replace **all** current bot data with the backup from "
+        f"{unix_to_discord_ts(snapshot_ts, 'F')} ({summary})?",
+        view=RestoreConfirmView(snapshot_ts, state),
+        ephemeral=True
+    )
+
+
+@restore_backup.autocomplete('when')
+async def _backup_autocomplete(interaction: discord.Interaction, current: str):
+    points = await asyncio.to_thread(store.backups.points)
+    labels = [(datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M UTC") + f" ({kind})", str(ts))
+              for ts, kind in reversed(points)]
+    return [app_commands.Choice(name=label, value=value)
+            for label, value in labels if current.lower() in label.lower()][:MAX_CHOICES]
+
+
+async def setup(bot):
+    bot.tree.add_command(restore_backup)
+    backup_loop.start()
+
+
+async def teardown(bot):
+    backup_loop.cancel()
@@ -0,0 +1,165 @@
+"""Exports: /export streams events, rosters, attendance and points into a CSV or JSON-lines file."""
+import discord
+import logging
+import asyncio
+import csv
+import io
+import json
+import tempfile
+from datetime import datetime, timezone
+from discord import app_commands
+
+from raid_bot import EVENT_TYPE_LABELS, _is_officer, _parse_date_utc, store
+
+log = logging.getLogger('kds.export')
+
+
+# ---------------------------------------------------------------------------
+# Exports — one row per roster entry, written as it is produced
+# ---------------------------------------------------------------------------
+
+EXPORT_FIELDS = ['event_id', 'event_name', 'event_type', 'boss', 'wing', 'start_utc', 'status',
+                 'user_id', 'name', 'role', 'boon', 'special_role', 'outcome', 'points_awarded']
+EXPORT_SPOOL_BYTES = 1 << 20   # rows are buffered in memory up to this size, then on disk
+
+
+def _outcome(event, uid: str) -> str:
+    """'pending' while the event is open, 'attended' / 'absent' once closed. Events closed
+    before attendance was recorded per event report 'unrecorded'."""
+    if event['status'] == 'open':
+        return 'pending'
+    attended = event.get('attended')
+    if attended is None:
+        return 'unrecorded'
+    return 'attended' if uid in attended else 'absent'
+
+
+def _export_rows(events, eids):
+    """Yield one flat dict per (event, participant); events with an empty roster get one row."""
+    for eid in eids:
+        event = events.get(eid)
+        if event is None:
+            continue
+        base = {
+            'event_id':   eid,
+            'event_name': event['name'],
+            'event_type': event.get('type'),
+            'boss':       event.get('boss'),
+            'wing':       event.get('wing'),
+            'start_utc':  datetime.fromtimestamp(event['unix_ts'], timezone.utc).strftime("%Y-%m-%d %H:%M"),
+            'status':     event['status'],
+        }
+        participants = event.get('participants', {})
+        if not participants:
+            yield dict(base, user_id=None, name=None, role=None, boon=None, special_role=None,
+                       outcome=None, points_awarded=0)
+            continue
+        for uid, p in participants.items():
+            outcome = _outcome(event, uid)
+            yield dict(
+                base,
+                user_id        = uid,
+                name           = p['name'],
+                role           = p.get('role'),
+                boon           = p.get('boon'),
+                special_role   = p.get('special_role'),
+                outcome        = outcome,
+                points_awarded = event['point_value'] if outcome == 'attended' else 0,
+            )
+
+
+def _write_csv(rows, out) -> int:
+    writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def _write_jsonl(rows, out) -> int:
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row, ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+EXPORT_WRITERS = {'csv': _write_csv, 'jsonl': _write_jsonl}
+
+
+def _build_export(events, eids: list, fmt: str):
+    """Encode the rows into a spooled temp file. Returns (file positioned at 0, size, row count);
+    the caller closes the file."""
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES, mode='w+b')
+    text  = io.TextIOWrapper(spool, encoding='utf-8', newline='')
+    try:
+        count = EXPORT_WRITERS[fmt](_export_rows(events, eids), text)
+        text.flush()
+    except BaseException:
+        text.close()
+        raise
+    text.detach()
+    size = spool.tell()
+    spool.seek(0)
+    return spool, size, count
+
+
+@app_commands.command(name="export", description="Export events, rosters, attendance and points as a file (officers only)")
+@app_commands.describe(
+    file_format="CSV for spreadsheets, JSON lines for scripts",
+    from_date="Only events on or after this day (YYYY-MM-DD, UTC)",
+    to_date="Only events on or before this day (YYYY-MM-DD, UTC)",
+    event_type="Only events of this type",
+)
+@app_commands.choices(
+    file_format=[app_commands.Choice(name="CSV", value='csv'),
+                 app_commands.Choice(name="JSON lines", value='jsonl')],
+    event_type=[app_commands.Choice(name=label, value=t) for t, label in EVENT_TYPE_LABELS.items()],
+)
+async def export(
+    interaction: discord.Interaction,
+    file_format: app_commands.Choice[str] = None,
+    from_date: str = None,
+    to_date: str = None,
+    event_type: app_commands.Choice[str] = None,
+):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+    try:
+        start_ts = _parse_date_utc(from_date) if from_date else None
+        end_ts   = _parse_date_utc(to_date) + 86400 if to_date else None
+    except ValueError:
+        await interaction.response.send_message("❌ Invalid date. Use: YYYY-MM-DD", ephemeral=True)
+        return
+
+    fmt  = file_format.value if file_format else 'csv'
+    eids = store.event_index.query(start_ts, end_ts, etype=event_type.value if event_type else None,
+                                   open_only=False)
+    if not eids:
+        await interaction.response.send_message("No events match those filters.", ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True)
+    # The snapshot is immutable, so the rows can be encoded off the event loop
+    spool, size, count = await asyncio.to_thread(_build_export, store.view.events, eids, fmt)
+    with spool:
+        limit = interaction.guild.filesize_limit if interaction.guild else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+        if size > limit:
+            await interaction.followup.send(
+                f"❌ The export is {size / 1e6:.1f} MB, over this server's {limit / 1e6:.0f} MB upload limit. "
+                "Narrow the date range or event type.", ephemeral=True
+            )
+            return
+        log.info("Export built", extra={'format': fmt, 'events': len(eids), 'rows': count, 'bytes': size})
+        filename = f"kds_export_{datetime.now(timezone.utc):%Y%m%d_%H%M}.{fmt}"
+        await interaction.followup.send(
+            f"📤 {len(eids)} events, {count} rows.", file=discord.File(spool, filename=filename), ephemeral=True
+        )
+
+
+async def setup(bot):
+    bot.tree.add_command(export)
@@ -0,0 +1,130 @@
+"""Lotteries: /create_lottery and /draw_lottery."""
+import discord
+import random
+import time
+from discord import app_commands
+
+from raid_bot import (
+    LOTTERY_HALF_LIFE_DAYS, GuildModal, Lottery, _is_officer, _lottery_choices, load_data,
+    lottery_weight, next_lottery_id, save_data, store,
+)
+
+
+# ---------------------------------------------------------------------------
+# Lottery system
+# ---------------------------------------------------------------------------
+
+@app_commands.command(name="create_lottery", description="Create a new points lottery (officers only)")
+async def create_lottery(interaction: discord.Interaction):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+    await interaction.response.send_modal(CreateLotteryModal())
+
+
+class CreateLotteryModal(GuildModal, title='Create Lottery'):
+    lottery_name = discord.ui.TextInput(
+        label='Lottery Name',
+        placeholder='e.g. March 2026 Lottery',
+        max_length=100
+    )
+    prizes = discord.ui.TextInput(
+        label='Prizes (one per line, best prize first)',
+        placeholder='500g\n250g\nLegendary weapon skin',
+        style=discord.TextStyle.paragraph,
+        max_length=1000
+    )
+
+    async def on_submit(self, interaction: discord.Interaction):
+        prize_list = [p.strip() for p in self.prizes.value.strip().splitlines() if p.strip()]
+        if not prize_list:
+            await interaction.response.send_message("❌ At least one prize is required.", ephemeral=True)
+            return
+
+        data = load_data()
+        lid  = next_lottery_id(data)
+        data['lotteries'][lid] = Lottery({
+            'name':    self.lottery_name.value.strip(),
+            'prizes':  prize_list,
+            'status':  'open',
+            'winners': []
+        })
+        store.lottery_search.add(lid, data['lotteries'][lid]['name'])
+        save_data(data)
+
+        prizes_display = "\n".join(f"{i+1}. {p}" for i, p in enumerate(prize_list))
+        await interaction.response.send_message(
+            f"✅ Lottery **{self.lottery_name.value.strip()}** created (ID: `{lid}`).\n\n**Prizes:**\n{prizes_display}",
+            ephemeral=True
+        )
+
+
+@app_commands.command(name="draw_lottery", description="Draw lottery winners and reset all points (officers only)")
+async def draw_lottery(interaction: discord.Interaction, lottery_id: str):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+
+    data    = load_data()
+    lottery = data['lotteries'].get(lottery_id)
+    if not lottery:
+        await interaction.response.send_message(f"❌ Lottery `{lottery_id}` not found.", ephemeral=True)
+        return
+    if lottery['status'] == 'drawn':
+        await interaction.response.send_message(f"❌ Lottery `{lottery_id}` has already been drawn.", ephemeral=True)
+        return
+
+    # Build the weighted draw pool — more points = more chances (recent points more, with decay on)
+    now     = time.time()
+    pool    = [(uid, p) for uid, p in data['players'].items() if p['points'] > 0]
+    weights = [lottery_weight(p, now) for _, p in pool]
+    if not any(weights):
+        await interaction.response.send_message("❌ No players have points yet — cannot draw.", ephemeral=True)
+        return
+
+    winners = []
+
+    for prize in lottery['prizes']:
+        if not any(weights):
+            break
+        # Pick one winner from the remaining pool, weighted by lottery weight
+        idx              = random.choices(range(len(pool)), weights=weights, k=1)[0]
+        winner_uid, winner_data = pool[idx]
+        winners.append({'uid': winner_uid, 'name': winner_data['name'], 'prize': prize})
+        # Remove winner so they can't win a second prize
+        pool.pop(idx)
+        weights.pop(idx)
+
+    # Persist results and reset all points
+    lottery['status']  = 'drawn'
+    lottery['winners'] = winners
+    for player in data['players'].values():
+        player['points'] = 0
+        if LOTTERY_HALF_LIFE_DAYS:
+            player['weight'], player['weight_ts'] = 0.0, int(now)
+    store.rebuild_player_rank()
+    save_data(data)
+
+    # Public announcement embed
+    medals = {1: '🥇', 2: '🥈', 3: '🥉'}
+    lines  = [
+        f"{medals.get(i, f'**{i}.**')} <@{w['uid']}> — **{w['prize']}**"
+        for i, w in enumerate(winners, start=1)
+    ]
+    embed = discord.Embed(
+        title=f"🎉 {lottery['name']} — Results!",
+        description="\n".join(lines) if lines else "No eligible players.",
+        color=0xf1c40f
+    )
+    embed.set_footer(text="All points have been reset to 0. Good luck next time!")
+    await interaction.response.send_message(embed=embed)
+
+
+@draw_lottery.autocomplete('lottery_id')
+async def _open_lottery_autocomplete(interaction: discord.Interaction, current: str):
+    return _lottery_choices(current, open_only=True)
+
+
+async def setup(bot):
+    for command in (create_lottery, draw_lottery):
+        bot.tree.add_command(command)
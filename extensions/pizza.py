@@ -0,0 +1,163 @@
+"""/pizza: one-liners from public APIs, prefetched into per-category buffers."""
+import discord
+import logging
+import aiohttp
+import asyncio
+import random
+import time
+from collections import deque
+from discord import app_commands
+from discord.ext import tasks
+
+from raid_bot import _spawn, bot, leader
+
+log = logging.getLogger('kds.pizza')
+
+
+# ---------------------------------------------------------------------------
+# /pizza content providers — prefetched buffers behind circuit breakers
+# ---------------------------------------------------------------------------
+
+PIZZA_BUFFER_SIZE  = 5    # items kept ready per category
+PIZZA_LOW_WATER    = 2    # refill in the background below this many items
+PIZZA_FALLBACK     = "Something went wrong. The universe is as broken as your build."
+
+
+def _parse_dad_joke(payload) -> list:
+    return [payload["joke"]]
+
+def _parse_zen_quotes(payload) -> list:
+    return [f'"{q["q"]}" — {q["a"]}' for q in payload if q.get("q")]
+
+def _parse_depressing_facts(payload) -> list:
+    return [post["data"]["title"] for post in payload["data"]["children"]]
+
+def _parse_insult(payload) -> list:
+    return [payload["insult"]]
+
+
+# category -> provider; 'timeout' is the total request budget in seconds
+PIZZA_PROVIDERS = {
+    0: {'name': 'dad joke',   'url': "https://icanhazdadjoke.com/",
+        'headers': {"Accept": "application/json"}, 'timeout': 4, 'parse': _parse_dad_joke},
+    1: {'name': 'zenquotes',  'url': "https://zenquotes.io/api/quotes",
+        'headers': {}, 'timeout': 5, 'parse': _parse_zen_quotes},
+    2: {'name': 'reddit',     'url': "https://www.reddit.com/r/DepressingFacts/top.json?limit=25&t=week",
+        'headers': {}, 'timeout': 6, 'parse': _parse_depressing_facts},
+    3: {'name': 'evilinsult', 'url': "https://evilinsult.com/generate_insult.php?lang=en&type=json",
+        'headers': {}, 'timeout': 4, 'parse': _parse_insult},
+}
+
+
+class CircuitBreaker:
+    """Stop calling a provider after repeated failures; retry once the cool-down passes."""
+    def __init__(self, threshold: int = 3, cooldown: float = 120.0):
+        self.threshold  = threshold
+        self.cooldown   = cooldown
+        self.failures   = 0
+        self.opened_at  = None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return False
+        # Half-open: this caller is the one probe. Restarting the cool-down holds everyone
+        # else back until it succeeds (closed) or fails (open again), or the probe is lost.
+        self.opened_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        self.failures  = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+_pizza_buffers    = {cat: deque(maxlen=PIZZA_BUFFER_SIZE) for cat in PIZZA_PROVIDERS}
+_pizza_breakers   = {cat: CircuitBreaker() for cat in PIZZA_PROVIDERS}
+_pizza_refilling  = set()   # categories with a refill in flight
+
+
+async def _fetch_pizza(category: int) -> list:
+    """Fetch a batch of items for one category over the shared session. Never raises."""
+    provider = PIZZA_PROVIDERS[category]
+    breaker  = _pizza_breakers[category]
+    if bot.http_session is None or not breaker.allow():
+        return []
+    try:
+        async with bot.http_session.get(
+            provider['url'],
+            headers=provider['headers'],
+            timeout=aiohttp.ClientTimeout(total=provider['timeout']),
+        ) as resp:
+            resp.raise_for_status()
+            payload = await resp.json(content_type=None)
+        items = provider['parse'](payload)
+    except Exception as e:
+        breaker.record_failure()
+        log.warning("Pizza provider failed", extra={'provider': provider['name'], 'failures': breaker.failures,
+                                                    'reason': repr(e)})
+        return []
+    breaker.record_success()
+    return items
+
+
+async def _refill_pizza(category: int) -> None:
+    """Top up one category's buffer. Only one refill per category runs at a time."""
+    if category in _pizza_refilling:
+        return
+    _pizza_refilling.add(category)
+    try:
+        buf = _pizza_buffers[category]
+        for _ in range(PIZZA_BUFFER_SIZE):
+            if len(buf) >= PIZZA_BUFFER_SIZE:
+                break
+            items = await _fetch_pizza(category)
+            if not items:
+                break
+            random.shuffle(items)
+            buf.extend(items[:PIZZA_BUFFER_SIZE - len(buf)])
+    finally:
+        _pizza_refilling.discard(category)
+
+
+@tasks.loop(minutes=1)
+async def pizza_refill():
+    """Keep every category's buffer topped up so /pizza answers from memory."""
+    if leader.is_leader:   # a standby answers no /pizza, so it has nothing to prefetch for
+        await asyncio.gather(*(_refill_pizza(cat) for cat in PIZZA_PROVIDERS))
+
+
+@app_commands.command(name="pizza", description="Sometimes motivational...sometimes funny and sometimes not.")
+async def pizza_command(interaction: discord.Interaction):
+    if interaction.user.id == 271986635674091531:
+        category = random.randint(0, 1)  # dad joke or motivational only (no insults or despair)
+    else:
+        category = random.randint(0, 3)
+
+    buf = _pizza_buffers[category]
+    if buf:
+        await interaction.response.send_message(buf.popleft())
+    else:
+        # Buffer drained (cold start or provider down) — fall back to a live fetch
+        await interaction.response.defer()
+        items = await _fetch_pizza(category)
+        random.shuffle(items)
+        await interaction.followup.send(items[0] if items else PIZZA_FALLBACK)
+        buf.extend(items[1:][:PIZZA_BUFFER_SIZE - len(buf)])   # the rest of the batch serves the next calls
+
+    if len(buf) < PIZZA_LOW_WATER:
+        _spawn(_refill_pizza(category))
+
+
+async def setup(bot):
+    bot.tree.add_command(pizza_command)
+    pizza_refill.start()
+
+
+async def teardown(bot):
+    pizza_refill.cancel()
@@ -0,0 +1,354 @@
+"""Recurring series: /create_series, /edit_series, /end_series, /list_series and the loop that
+keeps each series' next few occurrences posted."""
+import discord
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from discord import app_commands
+from discord.ext import tasks
+
+from raid_bot import (
+    BOSS_TEMPLATES, MAX_CHOICES, POINT_VALUES, TEMPLATE_CATEGORIES, _add_event,
+    _announce_promotions, _announce_roster_changes, _choice_label, _is_officer, _publish_event,
+    _refit_roster, _refresh_event_embed, _run_in_due_guilds, _template_fields, bot, dt_to_unix, leader,
+    load_data, next_series_id, parse_utc_offset, save_data, store,
+)
+
+log = logging.getLogger('kds.series')
+
+
+# ---------------------------------------------------------------------------
+# Recurring series — a weekly rule, with only the next few occurrences posted
+# ---------------------------------------------------------------------------
+
+SERIES_DEFAULT_HORIZON = 2   # upcoming occurrences kept posted per series
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def _next_occurrence(series: dict, after_ts: int) -> int:
+    """First start time of the series strictly after after_ts, as a UTC Unix timestamp."""
+    offset    = parse_utc_offset(series['utc_offset'])
+    hh, mm    = map(int, series['time'].split(':'))
+    local_now = datetime.fromtimestamp(after_ts, timezone.utc) + offset
+    days      = (series['weekday'] - local_now.weekday()) % 7
+    local_dt  = (local_now + timedelta(days=days)).replace(hour=hh, minute=mm, second=0, microsecond=0)
+    if local_dt <= local_now:
+        local_dt += timedelta(days=7)
+    return dt_to_unix(local_dt - offset)
+
+
+def _future_occurrences(data: dict, series: dict, now_unix: int) -> list:
+    """IDs of this series' events that are still open and haven't started, soonest first."""
+    events = data['events']
+    eids = [
+        eid for eid in series['occurrences']
+        if eid in events and events[eid]['status'] == 'open' and events[eid]['unix_ts'] > now_unix
+    ]
+    return sorted(eids, key=lambda eid: events[eid]['unix_ts'])
+
+
+def _series_temp(sid: str, series: dict, unix_ts: int) -> dict:
+    temp = {
+        'name':        series['name'],
+        'description': series['description'],
+        'unix_ts':     unix_ts,
+        'channel_id':  series['channel_id'],
+        'series_id':   sid,
+    }
+    temp.update(_template_fields(series['template']))
+    return temp
+
+
+async def _materialize_series(data: dict) -> bool:
+    """Top every active series up to `horizon` posted future occurrences. Returns True if data changed."""
+    now_unix = int(time.time())
+    changed  = False
+    for sid, series in data['series'].items():
+        if series['status'] != 'active':
+            continue
+        upcoming = _future_occurrences(data, series, now_unix)
+        if upcoming != series['occurrences']:
+            series['occurrences'] = upcoming   # drop started/closed/deleted occurrences
+            changed = True
+        channel = bot.get_channel(series['channel_id'])
+        if not channel:
+            continue
+
+        # the count and the last start time are re-read after every post, and each occurrence
+        # is claimed before its post is awaited: a run that overlaps the await (the loop, or an
+        # /edit_series) then counts it instead of posting the same one again
+        while len(series['occurrences']) < series['horizon']:
+            ts         = _next_occurrence(series, max(series.get('last_ts') or 0, now_unix))
+            eid, event = _add_event(data, _series_temp(sid, series, ts), series['creator_id'])
+            previous_ts = series.get('last_ts')
+            series['occurrences'].append(eid)
+            series['last_ts'] = ts
+            try:
+                await _publish_event(channel, eid, event)
+            except discord.HTTPException as e:
+                log.warning("Could not post series occurrence", extra={'series_id': sid, 'reason': str(e)})
+                del data['events'][eid]
+                store.event_index.remove(eid)
+                if eid in series['occurrences']:
+                    series['occurrences'].remove(eid)
+                if series.get('last_ts') == ts:   # unless a later run has moved it on since
+                    series['last_ts'] = previous_ts
+                break
+            changed = True
+    return changed
+
+
+@tasks.loop(minutes=1)
+async def series_loop():
+    """Post the next occurrences of every due guild's series as earlier ones start."""
+    if leader.is_leader:
+        await _run_in_due_guilds(_materialize_guild_series, "Series refresh")
+
+
+@series_loop.before_loop
+async def _before_series_loop():
+    await bot.wait_until_ready()   # posting needs the channel cache
+
+
+async def _materialize_guild_series():
+    data = load_data()
+    if await _materialize_series(data):
+        save_data(data)
+
+
+async def _apply_series_to_future(data: dict, series: dict, reschedule: bool) -> int:
+    """Push the series' current rule onto its not-yet-started occurrences. Returns how many changed."""
+    now_unix = int(time.time())
+    upcoming = _future_occurrences(data, series, now_unix)
+    template = _template_fields(series['template'])
+    after    = now_unix
+    promoted = []
+    for eid in upcoming:
+        event = data['events'][eid]
+        event['name']        = series['name']
+        event['description'] = series['description']
+        for key in ('type', 'boss', 'wing'):
+            event[key] = template[key]
+        for key in ('role_limits', 'boon_limits', 'special_role_limits'):
+            event[key] = dict(template[key])
+        event['open_signup'] = template.get('open_signup', False)
+        event['point_value'] = POINT_VALUES[event['type']]
+        if reschedule:
+            event['unix_ts']      = after = _next_occurrence(series, after)
+            event['reminded_1h']  = False
+            event['reminded_30m'] = False
+        # lowered limits push people off; raised ones make room for the waitlist
+        promoted.append((eid, event, *_refit_roster(eid, event)))
+    if reschedule:
+        series['last_ts'] = after if upcoming else None
+    series['occurrences'] = upcoming
+    save_data(data)
+    for eid, event, uids, changed in promoted:
+        _announce_promotions(eid, event, uids)
+        _announce_roster_changes(eid, event, changed)
+    for eid in upcoming:
+        await _refresh_event_embed(data['events'][eid], eid)
+    return len(upcoming)
+
+
+def _parse_series_time(value: str) -> str:
+    """Validate 'HH:MM' and return it normalised. Raises ValueError."""
+    return datetime.strptime(value.strip(), "%H:%M").strftime("%H:%M")
+
+
+SERIES_TEMPLATE_CHOICES = [app_commands.Choice(name=t, value=t) for t in [*BOSS_TEMPLATES, *TEMPLATE_CATEGORIES]]
+WEEKDAY_CHOICES         = [app_commands.Choice(name=d, value=i) for i, d in enumerate(WEEKDAYS)]
+
+
+@app_commands.command(name="create_series", description="Create a weekly recurring event (officers only)")
+@app_commands.describe(
+    name="Event name used for every occurrence",
+    weekday="Day of the week it repeats on",
+    start_time="Start time in your local time, HH:MM",
+    utc_offset="Your UTC offset, e.g. UTC+1 (default UTC)",
+    template="Boss or event category the slots are taken from",
+    channel="Channel to post occurrences in (default: this channel)",
+    occurrences="How many upcoming occurrences to keep posted",
+    description="Optional details shown on every occurrence",
+)
+@app_commands.choices(weekday=WEEKDAY_CHOICES, template=SERIES_TEMPLATE_CHOICES)
+async def create_series(
+    interaction: discord.Interaction,
+    name: str,
+    weekday: app_commands.Choice[int],
+    start_time: str,
+    template: app_commands.Choice[str],
+    utc_offset: str = "UTC",
+    channel: discord.TextChannel = None,
+    occurrences: app_commands.Range[int, 1, 8] = SERIES_DEFAULT_HORIZON,
+    description: str = "",
+):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+    try:
+        start_time = _parse_series_time(start_time)
+        parse_utc_offset(utc_offset)
+    except ValueError:
+        await interaction.response.send_message(
+            "❌ Invalid time or UTC offset. Use HH:MM and e.g. UTC+1.", ephemeral=True
+        )
+        return
+
+    data = load_data()
+    sid  = next_series_id(data)
+    data['series'][sid] = {
+        'name':        name.strip()[:100],
+        'description': description.strip()[:500],
+        'weekday':     weekday.value,
+        'time':        start_time,
+        'utc_offset':  utc_offset.strip(),
+        'template':    template.value,
+        'channel_id':  (channel or interaction.channel).id,
+        'creator_id':  interaction.user.id,
+        'horizon':     occurrences,
+        'status':      'active',
+        'occurrences': [],      # posted, not-yet-started event IDs
+        'last_ts':     None,    # start time of the latest posted occurrence
+    }
+    save_data(data)
+
+    await interaction.response.defer(ephemeral=True)
+    if await _materialize_series(data):
+        save_data(data)
+    posted = ", ".join(f"`{eid}`" for eid in data['series'][sid]['occurrences']) or "none yet"
+    await interaction.followup.send(
+        f"✅ Weekly series **{name}** created (ID: `{sid}`) — every {weekday.name} at {start_time} "
+        f"{utc_offset}. Posted occurrences: {posted}.",
+        ephemeral=True
+    )
+
+
+@app_commands.command(name="edit_series", description="Change a recurring series; applies to upcoming occurrences (officers only)")
+@app_commands.describe(
+    series_id="Series to change",
+    name="New event name",
+    weekday="New day of the week",
+    start_time="New start time in your local time, HH:MM",
+    utc_offset="UTC offset the start time is in",
+    template="New boss or event category",
+    occurrences="How many upcoming occurrences to keep posted",
+    description="New details text",
+)
+@app_commands.choices(weekday=WEEKDAY_CHOICES, template=SERIES_TEMPLATE_CHOICES)
+async def edit_series(
+    interaction: discord.Interaction,
+    series_id: str,
+    name: str = None,
+    weekday: app_commands.Choice[int] = None,
+    start_time: str = None,
+    utc_offset: str = None,
+    template: app_commands.Choice[str] = None,
+    occurrences: app_commands.Range[int, 1, 8] = None,
+    description: str = None,
+):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+    data   = load_data()
+    series = data['series'].get(series_id)
+    if not series or series['status'] != 'active':
+        await interaction.response.send_message(f"❌ Active series `{series_id}` not found.", ephemeral=True)
+        return
+    try:
+        if start_time is not None:
+            start_time = _parse_series_time(start_time)
+        if utc_offset is not None:
+            parse_utc_offset(utc_offset)
+    except ValueError:
+        await interaction.response.send_message(
+            "❌ Invalid time or UTC offset. Use HH:MM and e.g. UTC+1.", ephemeral=True
+        )
+        return
+
+    reschedule = any(v is not None for v in (weekday, start_time, utc_offset))
+    if name is not None:
+        series['name'] = name.strip()[:100]
+    if description is not None:
+        series['description'] = description.strip()[:500]
+    if weekday is not None:
+        series['weekday'] = weekday.value
+    if start_time is not None:
+        series['time'] = start_time
+    if utc_offset is not None:
+        series['utc_offset'] = utc_offset.strip()
+    if template is not None:
+        series['template'] = template.value
+    if occurrences is not None:
+        series['horizon'] = occurrences
+
+    await interaction.response.defer(ephemeral=True)
+    updated = await _apply_series_to_future(data, series, reschedule)
+    if await _materialize_series(data):
+        save_data(data)
+    await interaction.followup.send(
+        f"✅ Series `{series_id}` updated — {updated} upcoming occurrence(s) changed.", ephemeral=True
+    )
+
+
+@app_commands.command(name="end_series", description="Stop a recurring series (officers only)")
+async def end_series(interaction: discord.Interaction, series_id: str):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+    data   = load_data()
+    series = data['series'].get(series_id)
+    if not series or series['status'] != 'active':
+        await interaction.response.send_message(f"❌ Active series `{series_id}` not found.", ephemeral=True)
+        return
+    series['status'] = 'ended'
+    save_data(data)
+    await interaction.response.send_message(
+        f"✅ Series `{series_id}` ended. Already-posted occurrences stay up; "
+        "use /delete_event to remove them.",
+        ephemeral=True
+    )
+
+
+@app_commands.command(name="list_series", description="Show recurring event series")
+async def list_series(interaction: discord.Interaction):
+    data   = load_data()
+    active = {sid: s for sid, s in data['series'].items() if s['status'] == 'active'}
+    if not active:
+        await interaction.response.send_message("No recurring series right now.", ephemeral=True)
+        return
+    embed = discord.Embed(title="🔁 Recurring Series", color=0x0099ff)
+    for sid, series in list(active.items())[:25]:
+        upcoming = ", ".join(f"`{eid}`" for eid in series['occurrences']) or "*(none posted)*"
+        embed.add_field(
+            name=f"{series['name']}  (ID: {sid})",
+            value=(
+                f"**When:** {WEEKDAYS[series['weekday']]}s {series['time']} {series['utc_offset']}\n"
+                f"**Template:** {series['template']}  •  <#{series['channel_id']}>\n"
+                f"**Upcoming:** {upcoming}"
+            ),
+            inline=False
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@edit_series.autocomplete('series_id')
+@end_series.autocomplete('series_id')
+async def _active_series_autocomplete(interaction: discord.Interaction, current: str):
+    # A guild has a handful of series at most — a linear scan is fine here
+    needle = current.lower()
+    return [
+        app_commands.Choice(name=_choice_label(f"#{sid}", s['name'], WEEKDAYS[s['weekday']]), value=sid)
+        for sid, s in load_data()['series'].items()
+        if s['status'] == 'active' and (needle in sid or needle in s['name'].lower())
+    ][:MAX_CHOICES]
+
+
+async def setup(bot):
+    for command in (create_series, edit_series, end_series, list_series):
+        bot.tree.add_command(command)
+    series_loop.start()
+
+
+async def teardown(bot):
+    series_loop.cancel()
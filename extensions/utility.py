@@ -0,0 +1,515 @@
+"""Read-only commands: /list_events, /my_events, /calendar, /website_api, /leaderboard, /my_points,
+/stats, /status and /help, with the paging buttons they share."""
+import discord
+import asyncio
+import time
+import numpy as np
+from datetime import datetime
+from discord import app_commands
+
+from raid_bot import (
+    BOSS_TEMPLATES, EVENT_TYPE_LABELS, EVENT_WINGS, LOTTERY_HALF_LIFE_DAYS, GuildView,
+    _enter_interaction, _is_officer, _parse_date_utc, api_url, bot, calendar_url, click_stats,
+    lottery_weight, store, stores, unix_to_discord_ts,
+)
+
+
+# ---------------------------------------------------------------------------
+# Utility commands
+# ---------------------------------------------------------------------------
+
+EVENTS_PER_PAGE   = 10   # stays well under Discord's 25-field embed limit
+PLAYERS_PER_PAGE  = 15
+MEDALS            = {1: "🥇", 2: "🥈", 3: "🥉"}
+STATS_TOP         = 10
+STATS_MIN_SIGNUPS = 3    # below this a reliability ranking says more about luck than the player
+
+
+def _encode_event_query(filters: dict) -> str:
+    """Pack /list_events filters into a short string that fits in a custom_id."""
+    if not any(v is not None for v in filters.values()):
+        return ""
+    wing = EVENT_WINGS.index(filters['wing']) if filters['wing'] is not None else None
+    boss = list(BOSS_TEMPLATES).index(filters['boss']) if filters['boss'] is not None else None
+    parts = [filters['start_ts'], filters['end_ts'], filters['etype'], wing, boss]
+    return "~".join("" if v is None else str(v) for v in parts)
+
+
+def _decode_event_query(query: str) -> dict:
+    filters = dict.fromkeys(['start_ts', 'end_ts', 'etype', 'wing', 'boss'])
+    if not query:
+        return filters
+    start_ts, end_ts, etype, wing, boss = query.split("~")
+    filters['start_ts'] = int(start_ts) if start_ts else None
+    filters['end_ts']   = int(end_ts) if end_ts else None
+    filters['etype']    = etype or None
+    filters['wing']     = EVENT_WINGS[int(wing)] if wing else None
+    filters['boss']     = list(BOSS_TEMPLATES)[int(boss)] if boss else None
+    return filters
+
+
+def _describe_event_query(filters: dict) -> str:
+    parts = []
+    if filters['start_ts'] is not None:
+        parts.append(f"from {unix_to_discord_ts(filters['start_ts'], 'd')}")
+    if filters['end_ts'] is not None:
+        parts.append(f"before {unix_to_discord_ts(filters['end_ts'], 'd')}")
+    if filters['etype']:
+        parts.append(EVENT_TYPE_LABELS.get(filters['etype'], filters['etype']))
+    if filters['wing']:
+        parts.append(filters['wing'])
+    if filters['boss']:
+        parts.append(filters['boss'])
+    return "  •  ".join(parts)
+
+
+def _events_page(start: int, query: str = "") -> tuple:
+    """Render one page of open events, soonest first. Returns (embed, view) or (None, None)."""
+    events  = store.view.events
+    filters = _decode_event_query(query)
+    if query:
+        matches = store.event_index.query(**filters)
+        total   = len(matches)
+    else:
+        # Unfiltered: slice the time index directly, O(page size)
+        matches = None
+        total   = len(store.event_index.open_by_time)
+    if not total:
+        return None, None
+    start = _clamp_cursor(start, total, EVENTS_PER_PAGE)
+    if matches is None:
+        page = store.event_index.open_by_time.page(start, EVENTS_PER_PAGE)
+    else:
+        page = matches[start:start + EVENTS_PER_PAGE]
+
+    embed = discord.Embed(title="📅 Open Events", description=_describe_event_query(filters) or None, color=0x0099ff)
+    for eid in page:
+        e = events.get(eid)
+        if e is None:      # indexed by a write that hasn't been committed yet
+            continue
+        ts          = e['unix_ts']
+        signed_up   = len(e.get('participants', {}))
+        total_slots = sum(e['role_limits'].values())
+        boss_line   = f"**Boss:** {e['boss']}\n" if e.get('boss') else ""
+        embed.add_field(
+            name=f"{e['name']}  (ID: {eid})",
+            value=(
+                f"{boss_line}"
+                f"**When:** {unix_to_discord_ts(ts, 'F')}\n"
+                f"**Signed up:** {signed_up}/{total_slots}"
+            ),
+            inline=False
+        )
+    embed.set_footer(text=_page_footer(start, total, EVENTS_PER_PAGE, "events"))
+    return embed, PageView('events', start, total, EVENTS_PER_PAGE, query)
+
+
+def _leaderboard_page(start: int, query: str = "") -> tuple:
+    """Render one page of the points leaderboard. Returns (embed, view) or (None, None)."""
+    players = store.view.players
+    index   = store.player_rank
+    total   = len(index)
+    if not total:
+        return None, None
+    start = _clamp_cursor(start, total, PLAYERS_PER_PAGE)
+
+    lines = []
+    now   = time.time()
+    for i, uid in enumerate(index.page(start, PLAYERS_PER_PAGE), start=start + 1):
+        p = players.get(uid)
+        if p is None:
+            continue
+        prefix = MEDALS.get(i, f"`{i}.`")
+        if LOTTERY_HALF_LIFE_DAYS:   # ranked by lottery weight, which favours recent points
+            lines.append(f"{prefix} **{p['name']}** — {lottery_weight(p, now):.1f} weight  "
+                         f"*({p['points']} pts, attended {p['events_attended']})*")
+        else:
+            lines.append(f"{prefix} **{p['name']}** — {p['points']} pts  *(attended {p['events_attended']})*")
+
+    embed = discord.Embed(title="🏆 Points Leaderboard", description="\n".join(lines), color=0xf1c40f)
+    embed.set_footer(text=_page_footer(start, total, PLAYERS_PER_PAGE, "players"))
+    return embed, PageView('leaderboard', start, total, PLAYERS_PER_PAGE)
+
+
+PAGE_RENDERERS = {'events': _events_page, 'leaderboard': _leaderboard_page}
+
+
+def _clamp_cursor(start: int, total: int, per_page: int) -> int:
+    """Keep a stale cursor (list shrank since the buttons were drawn) on the last page."""
+    last = (total - 1) // per_page * per_page
+    return max(0, min(start, last))
+
+
+def _page_footer(start: int, total: int, per_page: int, noun: str) -> str:
+    pages = (total + per_page - 1) // per_page
+    return f"Page {start // per_page + 1}/{pages}  •  {total} {noun}"
+
+
+class PageButton(discord.ui.DynamicItem[discord.ui.Button],
+                 template=r'kds:page:(?P<kind>[a-z]+):(?P<cursor>\d+)(?::(?P<query>[0-9a-z_~]*))?'):
+    """Prev/next button whose custom_id carries the list kind, target cursor and filters.
+
+    Being a DynamicItem, it keeps working after a restart without re-registering views.
+    """
+    def __init__(self, kind: str, cursor: int, label: str = "", disabled: bool = False, query: str = ""):
+        custom_id = f"kds:page:{kind}:{cursor}" + (f":{query}" if query else "")
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=discord.ButtonStyle.grey,
+            custom_id=custom_id,
+            disabled=disabled,
+        ))
+        self.kind   = kind
+        self.cursor = cursor
+        self.query  = query
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match['kind'], int(match['cursor']), item.label, query=match['query'] or "")
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await _enter_interaction(interaction, interaction.guild_id)
+
+    async def callback(self, interaction: discord.Interaction):
+        render = PAGE_RENDERERS.get(self.kind)
+        embed, view = render(self.cursor, self.query) if render else (None, None)
+        if embed is None:
+            await interaction.response.edit_message(content="Nothing to show any more.", embed=None, view=None)
+            return
+        await interaction.response.edit_message(embed=embed, view=view)
+
+
+class PageView(GuildView):
+    # The view can expire: PageButton is registered as a dynamic item, so clicks
+    # on old messages are still routed from the custom_id alone.
+    def __init__(self, kind: str, start: int, total: int, per_page: int, query: str = ""):
+        super().__init__(timeout=600)
+        prev_start = max(0, start - per_page)
+        next_start = start + per_page
+        self.add_item(PageButton(kind, prev_start, "◀ Prev", disabled=start == 0, query=query))
+        # Distinct custom_id from Prev even when both are disabled on a single page
+        self.add_item(PageButton(kind, max(next_start, prev_start + 1), "Next ▶",
+                                 disabled=next_start >= total, query=query))
+
+
+@app_commands.command(name="list_events", description="Show open events, optionally filtered by date, wing, boss or type")
+@app_commands.describe(
+    from_date="Only events on or after this day (YYYY-MM-DD, UTC)",
+    to_date="Only events on or before this day (YYYY-MM-DD, UTC)",
+    wing="Only events for this wing / category",
+    boss="Only events for this boss",
+    event_type="Only events of this type",
+)
+@app_commands.choices(
+    wing=[app_commands.Choice(name=w, value=w) for w in EVENT_WINGS],
+    boss=[app_commands.Choice(name=b, value=b) for b in BOSS_TEMPLATES],
+    event_type=[app_commands.Choice(name=label, value=t) for t, label in EVENT_TYPE_LABELS.items()],
+)
+async def list_events(
+    interaction: discord.Interaction,
+    from_date: str = None,
+    to_date: str = None,
+    wing: app_commands.Choice[str] = None,
+    boss: app_commands.Choice[str] = None,
+    event_type: app_commands.Choice[str] = None,
+):
+    try:
+        start_ts = _parse_date_utc(from_date) if from_date else None
+        end_ts   = _parse_date_utc(to_date) + 86400 if to_date else None
+    except ValueError:
+        await interaction.response.send_message("❌ Invalid date. Use: YYYY-MM-DD", ephemeral=True)
+        return
+
+    query = _encode_event_query({
+        'start_ts': start_ts,
+        'end_ts':   end_ts,
+        'etype':    event_type.value if event_type else None,
+        'wing':     wing.value if wing else None,
+        'boss':     boss.value if boss else None,
+    })
+    embed, view = _events_page(0, query)
+    if embed is None:
+        msg = "No open events match those filters." if query else "No open events right now."
+        await interaction.response.send_message(msg, ephemeral=True)
+        return
+    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+
+@app_commands.command(name="my_events", description="Show the upcoming events you're signed up for")
+async def my_events(interaction: discord.Interaction):
+    events   = store.view.events
+    uid      = str(interaction.user.id)
+    timeline = store.event_index.open_by_time
+    eids     = [eid for eid in store.event_index.by_user.get(uid, ())
+                if eid in timeline and uid in events.get(eid, {}).get('participants', {})]
+
+    if not eids:
+        await interaction.response.send_message("You're not signed up for any open events.", ephemeral=True)
+        return
+
+    eids.sort(key=timeline.value)
+    lines = []
+    for eid in eids[:EVENTS_PER_PAGE * 2]:
+        e        = events[eid]
+        p        = e['participants'][uid]
+        boon_tag = f" [{p['boon']}]" if p.get('boon') else ""
+        lines.append(
+            f"**{e['name']}** (ID: {eid}) — {unix_to_discord_ts(e['unix_ts'], 'f')}\n"
+            f"↳ {p['role']}{boon_tag}" + (f" — {p['special_role']}" if p.get('special_role') else "")
+        )
+    embed = discord.Embed(title="🗓️ Your Events", description="\n".join(lines), color=0x0099ff)
+    if len(eids) > EVENTS_PER_PAGE * 2:
+        embed.set_footer(text=f"Showing the next {EVENTS_PER_PAGE * 2} of {len(eids)} events")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@app_commands.command(name="calendar", description="Get calendar links for this server's events and your signups")
+async def calendar_command(interaction: discord.Interaction):
+    guild_url = calendar_url(interaction.guild_id)
+    if guild_url is None:
+        await interaction.response.send_message(
+            "❌ Calendar feeds aren't set up — the bot needs `PUBLIC_URL` and `CALENDAR_SECRET`.", ephemeral=True
+        )
+        return
+    embed = discord.Embed(
+        title="📆 Calendar feeds",
+        description=(
+            "Subscribe to a link in Google Calendar (*Other calendars → From URL*), Outlook or Apple "
+            "Calendar and events stay in sync. Keep the links to yourself — anyone with one can read the schedule."
+        ),
+        color=0x0099ff
+    )
+    embed.add_field(name="All open events", value=guild_url, inline=False)
+    embed.add_field(name="Only events you're signed up for",
+                    value=calendar_url(interaction.guild_id, str(interaction.user.id)), inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@app_commands.command(name="website_api", description="Get the read-only JSON API link for a website widget (officers only)")
+async def website_api(interaction: discord.Interaction):
+    if not _is_officer(interaction):
+        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
+        return
+    url = api_url(interaction.guild_id)
+    if url is None:
+        await interaction.response.send_message(
+            "❌ The API isn't set up — the bot needs `PUBLIC_URL` and `CALENDAR_SECRET`.", ephemeral=True
+        )
+        return
+    await interaction.response.send_message(
+        f"🔌 **Events:** {url}\n"
+        "Same token for `/events/<id>`, `/leaderboard` and `/players/<user id>`; lists take "
+        "`?page=` and `?per_page=` (max 100), events also `?status=open|closed|all`.\n"
+        "Anyone with the token can read the schedule, rosters and points.",
+        ephemeral=True
+    )
+
+
+@app_commands.command(name="leaderboard", description="Show the points leaderboard")
+async def leaderboard(interaction: discord.Interaction):
+    embed, view = _leaderboard_page(0)
+    if embed is None:
+        await interaction.response.send_message("No points recorded yet.", ephemeral=True)
+        return
+    await interaction.response.send_message(embed=embed, view=view)
+
+
+async def _guild_stats():
+    """This guild's AttendanceStats; rebuilt off the loop when the data has changed since the last call."""
+    return await asyncio.to_thread(store.analytics.stats, store.view)
+
+
+def _player_stats_text(p: dict) -> str:
+    return (
+        f"**Attendance:** {p['attended']}/{p['signups']} signups ({p['attendance_rate']:.0%})  •  "
+        f"**No-shows:** {p['no_shows']} ({p['no_show_rate']:.0%})\n"
+        f"**Reliability:** {p['reliability']:.0f}/100\n"
+        f"**Streak:** {p['current_streak']} in a row  •  best {p['longest_streak']}"
+    )
+
+
+def _counts_text(counts: dict, limit: int = 8) -> str:
+    top = sorted(counts.items(), key=lambda kv: -kv[1])[:limit]
+    return "\n".join(f"{name}: {n}" for name, n in top) or "—"
+
+
+@app_commands.command(name="my_points", description="Check your own point total (private)")
+async def my_points(interaction: discord.Interaction):
+    uid    = str(interaction.user.id)
+    player = store.view.players.get(uid)
+
+    if not player:
+        await interaction.response.send_message(
+            "You don't have any points yet — attend an event to earn some!", ephemeral=True
+        )
+        return
+
+    description = (
+        f"**Points:** {player['points']}\n"
+        f"**Events attended:** {player['events_attended']}"
+    )
+    if LOTTERY_HALF_LIFE_DAYS:
+        description += (f"\n**Lottery weight:** {lottery_weight(player, time.time()):.1f}  "
+                        f"*(points lose half their weight every {LOTTERY_HALF_LIFE_DAYS:g} days)*")
+    record = (await _guild_stats()).player(uid)
+    if record:
+        description += "\n" + _player_stats_text(record)
+    embed = discord.Embed(title="📊 Your Points", description=description, color=0x2ecc71)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@app_commands.command(name="stats", description="Attendance rates, streaks and reliability for a player or the guild")
+@app_commands.describe(user="Show one player's record instead of the guild overview")
+async def stats_command(interaction: discord.Interaction, user: discord.Member = None):
+    stats = await _guild_stats()
+    if not len(stats):
+        await interaction.response.send_message(
+            "No closed events with recorded attendance yet.", ephemeral=True
+        )
+        return
+
+    if user is not None:
+        record = stats.player(str(user.id))
+        if record is None:
+            await interaction.response.send_message(
+                f"{user.display_name} hasn't signed up for a closed event yet.", ephemeral=True
+            )
+            return
+        embed = discord.Embed(title=f"📈 {user.display_name}", description=_player_stats_text(record),
+                              color=0x0099ff)
+        embed.add_field(name="By role", value=_counts_text(record['by_role']), inline=True)
+        embed.add_field(name="By boss", value=_counts_text(record['by_boss']), inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+
+    signups  = int(stats.signups.sum())
+    attended = int(stats.attended.sum())
+    embed = discord.Embed(
+        title="📈 Attendance",
+        description=(
+            f"**{len(stats.event_ids)}** closed events  •  **{len(stats)}** players  •  "
+            f"**{attended}/{signups}** signups attended ({attended / max(signups, 1):.0%})"
+        ),
+        color=0x0099ff
+    )
+    eligible = np.flatnonzero(stats.signups >= STATS_MIN_SIGNUPS)
+    ranked   = eligible[np.lexsort((-stats.signups[eligible], -stats.reliability[eligible]))][:STATS_TOP]
+    embed.add_field(
+        name=f"Most reliable ({STATS_MIN_SIGNUPS}+ signups)",
+        value="\n".join(
+            f"**{stats.names[i]}** — {stats.reliability[i]:.0f}  *({stats.attended[i]}/{stats.signups[i]}, "
+            f"streak {stats.current_streak[i]})*" for i in ranked
+        ) or "—",
+        inline=False
+    )
+    embed.add_field(name="By role", value=_counts_text(dict(zip(stats.roles, stats.by_role.sum(axis=0).tolist()))),
+                    inline=True)
+    embed.add_field(name="By boss", value=_counts_text(dict(zip(stats.bosses, stats.by_boss.sum(axis=0).tolist()))),
+                    inline=True)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@app_commands.command(name="status", description="Show bot status and uptime")
+async def status_command(interaction: discord.Interaction):
+    snap     = store.view
+    now      = datetime.utcnow()
+    now_unix = int(now.timestamp())
+    uptime   = now - bot.start_time
+    h, rem   = divmod(int(uptime.total_seconds()), 3600)
+    m, s     = divmod(rem, 60)
+
+    total_events    = len(snap.events)
+    upcoming_events = sum(
+        1 for e in snap.events.values()
+        if e.get('status') == 'open' and e['unix_ts'] > now_unix
+    )
+    total_players = len(snap.players)
+
+    embed = discord.Embed(title="📡 KDS Bot Status", color=0x00ff00)
+    embed.add_field(name="🟢 Status",   value="Online",                          inline=True)
+    embed.add_field(name="⏱ Uptime",   value=f"{h}h {m}m {s}s",                inline=True)
+    embed.add_field(name="📅 Events",   value=f"Upcoming: {upcoming_events}  •  Total: {total_events}", inline=False)
+    embed.add_field(name="👥 Players",  value=str(total_players),               inline=True)
+    attendance = bot.extensions.get('extensions.attendance')
+    reminders  = attendance is not None and attendance.check_events.is_running()
+    embed.add_field(name="⏰ Reminders", value="Running ✅" if reminders else "Stopped ❌", inline=True)
+    embed.add_field(name="🗂️ Guilds loaded", value=str(len(stores.loaded())), inline=True)
+    absorbed = click_stats['throttled'] + click_stats['deduped']
+    embed.add_field(
+        name="🛡️ Click throttle",
+        value=f"Absorbed {absorbed} clicks ({click_stats['throttled']} too fast, {click_stats['deduped']} duplicates)",
+        inline=False
+    )
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@app_commands.command(name="help", description="Show available commands")
+async def help_command(interaction: discord.Interaction):
+    embed = discord.Embed(
+        title="❓ KDS Bot Help",
+        description="Guild Wars 2 raid event management and points tracking.",
+        color=0x0099ff
+    )
+    embed.add_field(
+        name="📅 Events",
+        value=(
+            "**/create_event** — Create a new event (officers)\n"
+            "**/list_events** — Show open events (filter by date, wing, boss, type)\n"
+            "**/my_events** — Show the events you're signed up for\n"
+            "**/calendar** — Calendar links for events and your signups\n"
+            "**/edit_event `<id>`** — Edit name, description, or time (officers)\n"
+            "**/delete_event `<id>`** — Delete an event (officers)\n"
+            "**/close_event `<id>`** — Confirm attendance and award points (officers)\n"
+            "**/add_attendee `<id>` `<user>`** — Add a filler to the roster (officers)\n"
+            "**/remove_attendee `<id>` `<user>`** — Remove from roster or waitlist (officers)\n"
+            "**/create_series** / **/edit_series** / **/end_series** — Weekly recurring events (officers)\n"
+            "**/list_series** — Show recurring series"
+        ),
+        inline=False
+    )
+    embed.add_field(
+        name="🎯 Signing Up",
+        value=(
+            "Click **Register** on an event embed to sign up\n"
+            "Select your role → boon → special role (if applicable)\n"
+            "Full role or boon? Pick it anyway to join the waitlist — you're moved in automatically\n"
+            "Can play several roles? Click **Flexible** and rank them — the bot fills the comp for you\n"
+            "Click **Leave Event** to remove yourself\n"
+            "On a wing night, **Sign up for whole night** joins every boss at once"
+        ),
+        inline=False
+    )
+    embed.add_field(
+        name="🏆 Points",
+        value=(
+            "**/leaderboard** — Show top players by points\n"
+            "**/my_points** — Check your own total and attendance record (private)\n"
+            "**/stats `[user]`** — Attendance rates, streaks and reliability"
+        ),
+        inline=False
+    )
+    embed.add_field(
+        name="ℹ️ Other",
+        value=(
+            "**/status** — Bot uptime and stats\n"
+            "**/export** — Download events, attendance and points as CSV / JSON lines (officers)\n"
+            "**/website_api** — JSON API link for a website widget (officers)\n"
+            "**/restore_backup `<time>`** — Roll this server's data back to a backup (officers)\n"
+            "**/reload `<part>`** — Reload one part of the bot without a restart (bot owner)\n"
+            "**/memory** — Memory use by subsystem and gateway cache sizes (bot owner)"
+        ),
+        inline=False
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot):
+    for command in (list_events, my_events, calendar_command, website_api, leaderboard, my_points,
+                    stats_command, status_command, help_command):
+        bot.tree.add_command(command)
+    bot.add_dynamic_items(PageButton)
+
+
+async def teardown(bot):
+    bot.remove_dynamic_items(PageButton)
@@ -0,0 +1,390 @@
+"""The /create_event wizard: single events, whole wing nights and custom role slots."""
+import discord
+import asyncio
+from datetime import datetime
+from discord import app_commands
+
+from raid_bot import (
+    GuildModal, GuildView, POINT_VALUES, WING_BOSSES, _add_event, _channel_limiter,
+    _publish_event, _template_fields, dt_to_unix, load_data, parse_utc_offset,
+    save_data, store, unix_to_discord_ts,
+)
+
+
+# ---------------------------------------------------------------------------
+# Event creation — /create_event
+# ---------------------------------------------------------------------------
+
+@app_commands.command(name="create_event", description="Create a new event (officers only)")
+async def create_event(interaction: discord.Interaction):
+    await interaction.response.send_modal(EventSetupModal())
+
+
+class EventSetupModal(GuildModal, title='Create Event'):
+    event_name = discord.ui.TextInput(
+        label='Event Name',
+        placeholder='e.g. Tuesday Raid Night',
+        max_length=100
+    )
+    description = discord.ui.TextInput(
+        label='Description',
+        placeholder='Optional details...',
+        style=discord.TextStyle.paragraph,
+        required=False,
+        max_length=500
+    )
+    event_time = discord.ui.TextInput(
+        label='Date & Time (your local time)',
+        placeholder='YYYY-MM-DD HH:MM  (e.g. 2026-03-20 20:00)',
+        max_length=16
+    )
+    timezone = discord.ui.TextInput(
+        label='Your UTC offset',
+        placeholder='e.g. UTC+1  UTC-5  UTC+5:30  UTC (for no offset)',
+        default='UTC',
+        max_length=10
+    )
+
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            local_dt = datetime.strptime(self.event_time.value.strip(), "%Y-%m-%d %H:%M")
+        except ValueError:
+            await interaction.response.send_message(
+                "❌ Invalid time format. Use: YYYY-MM-DD HH:MM", ephemeral=True
+            )
+            return
+
+        try:
+            offset  = parse_utc_offset(self.timezone.value)
+            # Convert local time to UTC by subtracting the offset
+            # e.g. 20:00 UTC+1 → 19:00 UTC
+            utc_dt  = local_dt - offset
+            unix_ts = dt_to_unix(utc_dt)
+        except ValueError:
+            await interaction.response.send_message(
+                "❌ Invalid UTC offset. Use format: UTC+1, UTC-5, UTC+5:30, or UTC.", ephemeral=True
+            )
+            return
+
+        temp = {
+            'name':        self.event_name.value.strip(),
+            'description': self.description.value.strip(),
+            'unix_ts':     unix_ts,     # stored as UTC Unix timestamp
+            'channel_id':  interaction.channel.id,
+        }
+        embed = _creation_embed(temp, "Step 2 of 4: Select Wing")
+        await interaction.response.send_message(embed=embed, view=WingSelectView(temp), ephemeral=True)
+
+
+class WingSelectView(GuildView):
+    def __init__(self, temp: dict):
+        super().__init__(timeout=300)
+        self.add_item(WingSelect(temp))
+
+
+class WingSelect(discord.ui.Select):
+    def __init__(self, temp: dict):
+        self.temp = temp
+        options = [
+            discord.SelectOption(label="W1 - Spirit Vale",                emoji="⚔️"),
+            discord.SelectOption(label="W2 - Salvation Pass",             emoji="⚔️"),
+            discord.SelectOption(label="W3 - Stronghold of the Faithful", emoji="⚔️"),
+            discord.SelectOption(label="W4 - Bastion of the Penitent",    emoji="⚔️"),
+            discord.SelectOption(label="W5 - Hall of Chains",             emoji="⚔️"),
+            discord.SelectOption(label="W6 - Mythwright Gambit",          emoji="⚔️"),
+            discord.SelectOption(label="W7 - Key of Ahdashim",            emoji="⚔️"),
+            discord.SelectOption(label="Fractals",                        emoji="🌀"),
+            discord.SelectOption(label="Guild Missions",                  emoji="🏰"),
+            discord.SelectOption(label="Hang Out / Other Games",          emoji="🎉"),
+            discord.SelectOption(label="Other",                           emoji="🎮"),
+        ]
+        super().__init__(placeholder="Select event type...", options=options)
+
+    async def callback(self, interaction: discord.Interaction):
+        selected = self.values[0]
+        self.temp['wing'] = selected
+
+        if selected == "Fractals":
+            self.temp.update(_template_fields(selected))
+            embed = _role_review_embed(self.temp)
+            await interaction.response.edit_message(embed=embed, view=RoleReviewView(self.temp))
+        elif selected in ("Guild Missions", "Hang Out / Other Games"):
+            self.temp.update(_template_fields(selected))
+            embed = _creation_embed(self.temp, "Step 3 of 3: Confirm & Post")
+            await interaction.response.edit_message(embed=embed, view=RoleReviewView(self.temp))
+        elif selected == "Other":
+            self.temp['type'] = 'normal'
+            self.temp['boss'] = None
+            embed = _creation_embed(self.temp, "Step 3 of 4: Set Role Slots")
+            await interaction.response.edit_message(embed=embed, view=OtherRolesView(self.temp))
+        else:
+            self.temp['type'] = 'raid'
+            bosses = WING_BOSSES[selected]
+            embed = _creation_embed(self.temp, f"Step 3 of 4: Select Boss ({selected})")
+            await interaction.response.edit_message(embed=embed, view=BossSelectView(self.temp, bosses))
+
+
+class BossSelectView(GuildView):
+    def __init__(self, temp: dict, bosses: list):
+        super().__init__(timeout=300)
+        self.add_item(BossSelect(temp, bosses))
+
+
+class BossSelect(discord.ui.Select):
+    def __init__(self, temp: dict, bosses: list):
+        self.temp   = temp
+        self.bosses = bosses
+        options = [discord.SelectOption(label=b) for b in bosses]
+        options.append(discord.SelectOption(
+            label=f"Whole wing ({len(bosses)} bosses)", value=WHOLE_WING, emoji="⭐",
+            description="One event per boss, with staggered start times"
+        ))
+        super().__init__(placeholder="Select a boss...", options=options)
+
+    async def callback(self, interaction: discord.Interaction):
+        if self.values[0] == WHOLE_WING:
+            self.temp['bosses']  = list(self.bosses)
+            self.temp['stagger'] = WING_STAGGER_MINUTES
+            embed = _wing_night_review_embed(self.temp)
+            await interaction.response.edit_message(embed=embed, view=WingNightReviewView(self.temp))
+            return
+
+        self.temp.update(_template_fields(self.values[0]))
+
+        embed = _role_review_embed(self.temp)
+        await interaction.response.edit_message(embed=embed, view=RoleReviewView(self.temp))
+
+
+# ---------------------------------------------------------------------------
+# Whole wing night — one event per boss, created in one transaction
+# ---------------------------------------------------------------------------
+
+WHOLE_WING           = "__whole_wing__"
+WING_STAGGER_MINUTES = 30                  # default gap between boss start times
+STAGGER_OPTIONS      = [15, 20, 30, 45, 60]
+
+
+def _wing_night_temps(temp: dict) -> list:
+    """Expand the wizard state into one event template per boss, staggered in start time."""
+    temps = []
+    for i, boss in enumerate(temp['bosses']):
+        t = {
+            'name':        f"{temp['name']} — {boss.split(' - ', 1)[-1]}"[:100],
+            'description': temp['description'],
+            'unix_ts':     temp['unix_ts'] + i * temp['stagger'] * 60,
+            'channel_id':  temp['channel_id'],
+        }
+        t.update(_template_fields(boss))
+        temps.append(t)
+    return temps
+
+
+def _wing_night_review_embed(temp: dict) -> discord.Embed:
+    embed = _creation_embed(temp, "Step 4 of 4: Review Wing Night")
+    lines = []
+    for t in _wing_night_temps(temp):
+        slots = sum(t['role_limits'].values())
+        lines.append(f"{unix_to_discord_ts(t['unix_ts'], 't')}  **{t['boss']}** — {slots} slots")
+    embed.add_field(name=f"Events ({len(lines)}, every {temp['stagger']} min)", value="\n".join(lines), inline=False)
+    embed.set_footer(text=f"Attendance reward: {POINT_VALUES['raid']} points per boss")
+    return embed
+
+
+class StaggerSelect(discord.ui.Select):
+    def __init__(self, temp: dict):
+        self.temp = temp
+        options = [
+            discord.SelectOption(label=f"{m} minutes between bosses", value=str(m), default=m == temp['stagger'])
+            for m in STAGGER_OPTIONS
+        ]
+        super().__init__(placeholder="Time between bosses...", options=options, row=0)
+
+    async def callback(self, interaction: discord.Interaction):
+        self.temp['stagger'] = int(self.values[0])
+        await interaction.response.edit_message(
+            embed=_wing_night_review_embed(self.temp), view=WingNightReviewView(self.temp)
+        )
+
+
+class WingNightReviewView(GuildView):
+    def __init__(self, temp: dict):
+        super().__init__(timeout=300)
+        self.temp = temp
+        self.add_item(StaggerSelect(temp))
+
+    @discord.ui.button(label="✅ Confirm & Post All", style=discord.ButtonStyle.green, row=1)
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await _post_wing_night(interaction, self.temp)
+
+    @discord.ui.button(label="❌ Cancel", style=discord.ButtonStyle.red, row=1)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(content="❌ Cancelled.", embed=None, view=None)
+
+
+async def _publish_limited(channel, eid: str, event: dict) -> None:
+    async with _channel_limiter(channel.id):
+        await _publish_event(channel, eid, event)
+
+
+async def _post_wing_night(interaction: discord.Interaction, temp: dict):
+    """Create every boss event in one store transaction, then post them concurrently."""
+    temps = _wing_night_temps(temp)
+    # Acknowledge first — waiting on the store lock and posting several messages can outlast
+    # the 3s interaction deadline
+    await interaction.response.edit_message(
+        content=f"⏳ Posting {len(temps)} events...", embed=None, view=None
+    )
+    async with store.transaction() as data:
+        created  = [_add_event(data, t, interaction.user.id) for t in temps]
+        group_id = created[0][0]
+        for eid, event in created:
+            event['group_id'] = group_id   # links the night for later bulk actions
+            store.event_index.update(eid, event)
+
+    results = await asyncio.gather(
+        *(_publish_limited(interaction.channel, eid, event) for eid, event in created),
+        return_exceptions=True
+    )
+    save_data(data)   # message IDs
+
+    failed = [eid for (eid, _), r in zip(created, results) if isinstance(r, Exception)]
+    ids    = ", ".join(f"`{eid}`" for eid, _ in created)
+    text   = f"✅ Wing night **{temp['name']}** posted! (IDs: {ids})"
+    if failed:
+        text += f"\n⚠️ Could not post message for: {', '.join(f'`{eid}`' for eid in failed)}"
+    await interaction.edit_original_response(content=text)
+
+
+# ---------------------------------------------------------------------------
+# Other (non-raid) path — manual role slot entry
+# ---------------------------------------------------------------------------
+
+class OtherRolesView(GuildView):
+    def __init__(self, temp: dict):
+        super().__init__(timeout=300)
+        self.temp = temp
+
+    @discord.ui.button(label="Set Role Slots", style=discord.ButtonStyle.blurple)
+    async def set_roles(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(OtherRolesModal(self.temp, self))
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.red)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(content="❌ Cancelled.", embed=None, view=None)
+
+
+class OtherRolesModal(GuildModal, title='Set Role Slots'):
+    def __init__(self, temp: dict, parent_view: OtherRolesView):
+        super().__init__()
+        self.temp = temp
+        self.parent_view = parent_view
+
+    tank_count = discord.ui.TextInput(label='Tank slots (0–2)',  default='0', max_length=1)
+    heal_count = discord.ui.TextInput(label='Heal slots (1–5)',  default='2', max_length=1)
+    dps_count  = discord.ui.TextInput(label='DPS slots (1–20)', default='8', max_length=2)
+
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            tank = int(self.tank_count.value)
+            heal = int(self.heal_count.value)
+            dps  = int(self.dps_count.value)
+            if any(v < 0 for v in [tank, heal, dps]) or (heal + dps) == 0:
+                raise ValueError
+        except ValueError:
+            await interaction.response.send_message(
+                "❌ Invalid slot counts. Heal + DPS must be at least 1.", ephemeral=True
+            )
+            return
+
+        self.temp['role_limits']         = {'Tank': tank, 'Heal': heal, 'DPS': dps}
+        self.temp['boon_limits']         = {'Alacrity': 2, 'Quickness': 2}
+        self.temp['special_role_limits'] = {}
+
+        embed = _role_review_embed(self.temp)
+        await interaction.response.edit_message(embed=embed, view=RoleReviewView(self.temp))
+
+
+# ---------------------------------------------------------------------------
+# Role review — shared final step before posting
+# ---------------------------------------------------------------------------
+
+class RoleReviewView(GuildView):
+    def __init__(self, temp: dict):
+        super().__init__(timeout=300)
+        self.temp = temp
+
+    @discord.ui.button(label="✅ Confirm & Post", style=discord.ButtonStyle.green)
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await _post_event(interaction, self.temp)
+
+    @discord.ui.button(label="❌ Cancel", style=discord.ButtonStyle.red)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(content="❌ Cancelled.", embed=None, view=None)
+
+
+async def _post_event(interaction: discord.Interaction, temp: dict):
+    """Finalise the event, save it, and post the embed to the channel."""
+    data       = load_data()
+    eid, event = _add_event(data, temp, interaction.user.id)
+    save_data(data)
+
+    await _publish_event(interaction.channel, eid, event)
+    save_data(data)
+
+    await interaction.response.edit_message(
+        content=f"✅ Event **{event['name']}** posted! (ID: {eid})",
+        embed=None, view=None
+    )
+
+
+# ---------------------------------------------------------------------------
+# Creation flow helper embeds
+# ---------------------------------------------------------------------------
+
+def _creation_embed(temp: dict, step_title: str) -> discord.Embed:
+    """Ephemeral status embed shown during the creation wizard."""
+    if 'unix_ts' in temp:
+        time_display = unix_to_discord_ts(temp['unix_ts'], 'F')
+    else:
+        time_display = "*(not set)*"
+    lines = [
+        f"**Name:** {temp['name']}",
+        f"**Time:** {time_display}",
+    ]
+    if temp.get('description'):
+        lines.append(f"**Description:** {temp['description']}")
+    if temp.get('wing'):
+        lines.append(f"**Wing:** {temp['wing']}")
+    if temp.get('boss'):
+        lines.append(f"**Boss:** {temp['boss']}")
+    return discord.Embed(title=step_title, description="\n".join(lines), color=0x0099ff)
+
+
+def _role_review_embed(temp: dict) -> discord.Embed:
+    """Show the pre-filled role slots for officer review before posting."""
+    embed = _creation_embed(temp, "Step 4 of 4: Review & Confirm")
+
+    role_emojis = {'Tank': '🛡️', 'Heal': '💚', 'DPS': '⚔️'}
+    slots_lines = []
+    for role, count in temp['role_limits'].items():
+        if count > 0:
+            slots_lines.append(f"{role_emojis[role]} {role}: {count} slot{'s' if count != 1 else ''}")
+
+    boon_lines = [f"{boon} ×{cap}" for boon, cap in temp['boon_limits'].items()]
+
+    special_lines = [
+        f"• {role}: {count}" for role, count in temp['special_role_limits'].items() if count > 0
+    ]
+
+    embed.add_field(name="Role Slots", value="\n".join(slots_lines) or "None", inline=True)
+    embed.add_field(name="Boon Limits", value="\n".join(boon_lines), inline=True)
+    if special_lines:
+        embed.add_field(name="Special Roles", value="\n".join(special_lines), inline=False)
+
+    ticket_val = POINT_VALUES[temp['type']]
+    embed.set_footer(text=f"Attendance reward: {ticket_val} points")
+    return embed
+
+
+async def setup(bot):
+    bot.tree.add_command(create_event)
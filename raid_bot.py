@@ -1,45 +1,64 @@
 import discord
 from discord.ext import commands, tasks
-from datetime import datetime, timedelta
+from discord import app_commands
+from datetime import datetime, timedelta, timezone
 import asyncio
 import os
 import json
+import logging
+import logging.handlers
+import lzma
+import math
+import zlib
 import random
-from threading import Thread
+import re
+import bisect
+import heapq
+import itertools
+import time
+import contextlib
+import contextvars
+import email.utils
+import gzip
+import fcntl
+import hashlib
+import hmac
+import signal
+import sys
+import traceback
+import tracemalloc
+from collections import deque
+from collections.abc import Mapping, MutableMapping
+from enum import StrEnum
+from queue import SimpleQueue
+from types import MappingProxyType
 import socket
 import aiohttp
+from aiohttp import web
+import numpy as np
 
-# ---------------------------------------------------------------------------
-# HTTP keepalive server for Railway
-# ---------------------------------------------------------------------------
+# The extensions import this module as `raid_bot`. Run as a script it's `__main__`, so register
+# it under its own name as well, or the first extension would import a second copy of it.
+sys.modules.setdefault('raid_bot', sys.modules[__name__])
 
-def run_server():
-    import http.server
-    import socketserver
+_SECTIONS = ([1], ['imports'])   # (start lines, titles) of this file's parts, for /memory
 
-    class Handler(http.server.SimpleHTTPRequestHandler):
-        def do_GET(self):
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(b'KDS Bot is running!')
-        def log_message(self, format, *args):
-            pass  # suppress noisy HTTP logs
 
-    port = int(os.environ.get('PORT', 8080))
-    with socketserver.TCPServer(("", port), Handler) as httpd:
-        print(f"HTTP server running on port {port}")
-        httpd.serve_forever()
+def _section(title: str) -> None:
+    """Mark the line below as the start of a part of this file, to charge its allocations to."""
+    _SECTIONS[0].append(sys._getframe(1).f_lineno + 1)
+    _SECTIONS[1].append(title)
 
-def start_server():
-    server_thread = Thread(target=run_server, daemon=True)
-    server_thread.start()
 
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
+_section('Constants')
 
-DATA_FILE = '/data/kds_bot_data.json'  # Railway volume mount path
+DATA_FILE        = '/data/kds_bot_data.json'  # Railway volume mount path (single-guild layout, adopted on startup)
+GUILDS_DIR       = os.path.join(os.path.dirname(DATA_FILE), 'guilds')   # one <guild_id>/ directory per guild
+PRIMARY_GUILD_ID = os.getenv('PRIMARY_GUILD_ID')   # which guild inherits DATA_FILE when the bot is in several
+DATA_COMPRESSION = os.getenv('DATA_COMPRESSION', 'none')   # 'none' | 'zlib' | 'lzma'
 
 # Tickets awarded per event type on attendance confirmation
 POINT_VALUES = {
@@ -50,6 +69,10 @@ POINT_VALUES = {
     'social': 0,
 }
 
+# Lottery weight decay: points count for half as much in the draw every this many days.
+# 0 (the default) turns decay off, and the lottery weight is simply the points balance.
+LOTTERY_HALF_LIFE_DAYS = float(os.getenv('LOTTERY_HALF_LIFE_DAYS') or 0)
+
 BOSS_TEMPLATES = {
     # Wing 1 - Spirit Vale
     "W1 - Vale Guardian":       {"Tank": 1, "Heal": 2, "DPS": 7, "boon_limits": {"Alacrity": 2, "Quickness": 2, "Condi": 2}, "special": {"G1": 1, "G2 Backups": 1, "G3": 1}},
@@ -91,36 +114,1375 @@ WING_BOSSES = {
     "W7 - Key of Ahdashim":            ["W7 - Cardinal Adina", "W7 - Cardinal Sabir", "W7 - Qadim the Peerless"],
 }
 
+# Wing/category labels offered by the creation wizard, stored in event['wing']
+EVENT_WINGS = list(WING_BOSSES) + ["Fractals", "Guild Missions", "Hang Out / Other Games", "Other"]
+
+EVENT_TYPE_LABELS = {
+    'raid':          'Raid',
+    'fractal':       'Fractals',
+    'guild_mission': 'Guild Missions',
+    'social':        'Hang Out / Other Games',
+    'normal':        'Other',
+}
+
+# ---------------------------------------------------------------------------
+# Logging — JSON lines through a queue, with per-interaction context
+# ---------------------------------------------------------------------------
+#
+# Code on the event loop only puts records on a queue; a QueueListener thread formats them
+# as one JSON object per line and writes them to stdout and a size-rotated file. Whatever is
+# in the log context when a record is made (guild, interaction id, command, user, event id,
+# and elapsed_ms since the interaction arrived) is copied onto it before it's queued, since
+# the listener thread can't see the handler's context. Keyword fields go in `extra=`.
+# LOG_SAMPLING keeps only a fraction of the routine records of chatty loggers such as
+# kds.signup ("kds.signup=0.1,..."); warnings and errors are always kept.
+_section('Logging')
+
+LOG_LEVEL        = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FILE         = os.path.join(os.path.dirname(DATA_FILE), 'logs', 'kds_bot.jsonl')
+LOG_FILE_BYTES   = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+LOG_SAMPLING     = {
+    name: float(rate)
+    for name, _, rate in (item.partition('=') for item in os.getenv('LOG_SAMPLING', 'kds.signup=0.1').split(','))
+    if rate
+}
+
+log          = logging.getLogger('kds')
+_log_context = contextvars.ContextVar('log_context', default=None)
+
+# Attributes every LogRecord has; anything else on a record is a field to emit
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'taskName'}
+
+
+def log_context(**fields) -> None:
+    """Add fields to the log context of the current task (and of tasks it goes on to spawn)."""
+    _log_context.set({**(_log_context.get() or {}), **fields})
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts':     datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level':  record.levelname,
+            'logger': record.name,
+            'msg':    record.getMessage(),
+        }
+        entry.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _SamplingFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = LOG_SAMPLING.get(record.name)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        record.sample_rate = rate   # so counts can be scaled back up
+        return random.random() < rate
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """Stamps the caller's log context onto each record and keeps any traceback as its own field."""
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        context = dict(_log_context.get() or {})
+        started = context.pop('started', None)
+        if started is not None:
+            context['elapsed_ms'] = round((time.monotonic() - started) * 1000, 1)
+        for key, value in context.items():
+            record.__dict__.setdefault(key, value)   # explicit extra= fields win
+        if record.exc_info:
+            record.traceback = "".join(traceback.format_exception(*record.exc_info))
+            record.exc_info  = None
+        return super().prepare(record)
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Send every logger (ours and discord.py's) through the queue to JSON stdout + rotating file handlers."""
+    handlers = [logging.StreamHandler(sys.stdout)]
+    file_error = None
+    try:
+        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8'
+        ))
+    except OSError as e:
+        file_error = e
+    for handler in handlers:
+        handler.setFormatter(JsonFormatter())
+
+    records = SimpleQueue()
+    handler = _ContextQueueHandler(records)
+    handler.addFilter(_SamplingFilter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(LOG_LEVEL)
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    if file_error:
+        log.warning("Logging to stdout only", extra={'path': LOG_FILE, 'reason': str(file_error)})
+    return listener
+
+# ---------------------------------------------------------------------------
+# In-memory indexes
+# ---------------------------------------------------------------------------
+_section('In-memory indexes')
+
+def _tokens(text: str) -> list:
+    """Lower-case word tokens, e.g. 'W4 - Deimos' -> ['w4', 'deimos']."""
+    return [t for t in re.split(r'[^0-9a-z]+', text.lower()) if t]
+
+
+class TokenIndex:
+    """Token -> keys index with prefix lookup, used for autocomplete."""
+    def __init__(self):
+        self._postings = {}   # token -> set of keys
+        self._sorted   = []   # every token, sorted so a prefix is a contiguous range
+        self._by_key   = {}   # key -> tokens, so a key can be removed/replaced
+
+    def add(self, key: str, text: str) -> None:
+        self.remove(key)
+        toks = set(_tokens(text)) | {key.lower()}
+        self._by_key[key] = toks
+        for t in toks:
+            posting = self._postings.get(t)
+            if posting is None:
+                posting = self._postings[t] = set()
+                bisect.insort(self._sorted, t)
+            posting.add(key)
+
+    def remove(self, key: str) -> None:
+        for t in self._by_key.pop(key, ()):
+            posting = self._postings[t]
+            posting.discard(key)
+            if not posting:
+                del self._postings[t]
+                del self._sorted[bisect.bisect_left(self._sorted, t)]
+
+    def _prefix(self, prefix: str) -> set:
+        keys = set()
+        i = bisect.bisect_left(self._sorted, prefix)
+        while i < len(self._sorted) and self._sorted[i].startswith(prefix):
+            keys |= self._postings[self._sorted[i]]
+            i += 1
+        return keys
+
+    def search(self, query: str):
+        """Keys whose tokens prefix-match every query word, or None for an empty query."""
+        result = None
+        for word in _tokens(query):
+            hits   = self._prefix(word)
+            result = hits if result is None else result & hits
+            if not result:
+                return set()
+        return result
+
+
+class SortedIndex:
+    """Keys kept ordered by a sort value; paging and range reads cost O(log n + k)."""
+    def __init__(self):
+        self._entries = []   # sorted (sort_value, key)
+        self._values  = {}   # key -> sort_value
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._values
+
+    def value(self, key: str):
+        return self._values[key]
+
+    def upsert(self, key: str, value) -> None:
+        self.discard(key)
+        self._values[key] = value
+        bisect.insort(self._entries, (value, key))
+
+    def discard(self, key: str) -> None:
+        if key not in self._values:
+            return
+        value = self._values.pop(key)
+        del self._entries[bisect.bisect_left(self._entries, (value, key))]
+
+    def position(self, key: str) -> int:
+        """Sorted position of a key that is in the index."""
+        return bisect.bisect_left(self._entries, (self._values[key], key))
+
+    def page(self, start: int, count: int) -> list:
+        """Keys at sorted positions [start, start + count)."""
+        return [key for _, key in self._entries[start:start + count]]
+
+    def range(self, lo=None, hi=None) -> list:
+        """Keys with lo <= value < hi, in order. Either bound may be None (unbounded)."""
+        i = 0 if lo is None else bisect.bisect_left(self._entries, (lo,))
+        j = len(self._entries) if hi is None else bisect.bisect_left(self._entries, (hi,))
+        return [key for _, key in self._entries[i:j]]
+
+
+def _add_posting(postings: dict, value, key: str) -> None:
+    if value is not None:
+        postings.setdefault(value, set()).add(key)
+
+def _drop_posting(postings: dict, value, key: str) -> None:
+    keys = postings.get(value)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del postings[value]
+
+
+class EventIndex:
+    """Secondary indexes over data['events'], kept current by the code paths that mutate events.
+
+    Call update() after any change to an event's name, time, status or roster, and
+    remove() when it is deleted.
+    """
+    def __init__(self):
+        self.search       = TokenIndex()
+        self.by_time      = SortedIndex()   # every event by start time (range queries)
+        self.open_by_time = SortedIndex()   # open events by start time, for /list_events
+        self.by_boss      = {}              # boss -> event ids
+        self.by_wing      = {}              # wing -> event ids
+        self.by_type      = {}              # type -> event ids
+        self.by_group     = {}              # wing-night group id -> event ids
+        self.by_user      = {}              # uid -> event ids the user is on the roster of
+        self._indexed     = {}              # eid -> (boss, wing, type, group, uids) as last indexed
+
+    def rebuild(self, events: dict) -> None:
+        self.__init__()
+        for eid, event in events.items():
+            self.update(eid, event)
+
+    def update(self, eid: str, event: dict) -> None:
+        label = " ".join(filter(None, [event['name'], event.get('boss'), event.get('wing')]))
+        self.search.add(eid, label)
+        self.by_time.upsert(eid, event['unix_ts'])
+        if event.get('status') == 'open':
+            self.open_by_time.upsert(eid, event['unix_ts'])
+        else:
+            self.open_by_time.discard(eid)
+
+        new = (event.get('boss'), event.get('wing'), event.get('type'), event.get('group_id'),
+               frozenset(event.get('participants', {})))
+        old = self._indexed.get(eid, (None, None, None, None, frozenset()))
+        for postings, before, after in zip(self._postings(), old, new):
+            if before != after:
+                _drop_posting(postings, before, eid)
+                _add_posting(postings, after, eid)
+        for uid in old[4] - new[4]:
+            _drop_posting(self.by_user, uid, eid)
+        for uid in new[4] - old[4]:
+            _add_posting(self.by_user, uid, eid)
+        self._indexed[eid] = new
+
+    def _postings(self) -> tuple:
+        """Single-valued posting maps, in the order of the _indexed tuple."""
+        return (self.by_boss, self.by_wing, self.by_type, self.by_group)
+
+    def remove(self, eid: str) -> None:
+        self.search.remove(eid)
+        self.by_time.discard(eid)
+        self.open_by_time.discard(eid)
+        *values, uids = self._indexed.pop(eid, (None, None, None, None, frozenset()))
+        for postings, value in zip(self._postings(), values):
+            _drop_posting(postings, value, eid)
+        for uid in uids:
+            _drop_posting(self.by_user, uid, eid)
+
+    def query(self, start_ts=None, end_ts=None, boss=None, wing=None, etype=None,
+              open_only: bool = True) -> list:
+        """Event ids matching every given filter, ordered by start time.
+
+        Drives from the smallest candidate set — a boss/wing/type posting list or the
+        time range — and checks the remaining filters against the index only.
+        """
+        timeline = self.open_by_time if open_only else self.by_time
+        postings = [
+            p.get(v, set()) for p, v in
+            ((self.by_boss, boss), (self.by_wing, wing), (self.by_type, etype)) if v is not None
+        ]
+        if not postings:
+            return timeline.range(start_ts, end_ts)
+
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        hits = []
+        for eid in candidates:
+            if eid not in timeline:
+                continue
+            ts = timeline.value(eid)
+            if (start_ts is None or ts >= start_ts) and (end_ts is None or ts < end_ts):
+                hits.append((ts, eid))
+        hits.sort()
+        return [eid for _, eid in hits]
+
+
+# ---------------------------------------------------------------------------
+# Domain model
+# ---------------------------------------------------------------------------
+#
+# Events, participants, players and lotteries are slotted records rather than plain dicts:
+# no per-instance dict and no repeated key strings, roles/boons stored as shared enum members,
+# and names/uids interned so the same player on many rosters shares one string.
+# Records still speak the mapping protocol (record['name'], .get, .setdefault, `in`), so the
+# rest of the bot reads them exactly like the JSON dicts they're loaded from.
+_section('Domain model')
+
+class Role(StrEnum):
+    TANK     = 'Tank'
+    HEAL     = 'Heal'
+    DPS      = 'DPS'
+    ATTENDEE = 'Attendee'
+    FILLER   = 'Filler'
+    __hash__ = str.__hash__   # Enum hashes by member name; keep hash(Role.TANK) == hash('Tank') for dict lookups
+
+
+class Boon(StrEnum):
+    ALACRITY  = 'Alacrity'
+    QUICKNESS = 'Quickness'
+    CONDI     = 'Condi'
+    __hash__  = str.__hash__
+
+
+def _interned(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _as_enum(enum, value):
+    """The enum member for value, or the interned string if it isn't one (e.g. custom roles)."""
+    if value is None:
+        return None
+    # members hash like their values, so the member map doubles as a str -> member lookup
+    return enum._value2member_map_.get(value) or _interned(value)
+
+
+class Record(MutableMapping):
+    """Dict-compatible base for the slotted model classes.
+
+    Item access maps onto slots; an unset slot reads as a missing key. Keys outside the
+    slots go to a lazily created `extra` dict, so loading and saving is lossless.
+    Every write reports itself up to the Section holding the record (see TrackedDict), which
+    is how read snapshots spot changed records.
+    """
+    __slots__ = ('extra', '_parent', '_key')
+    _fields   = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = frozenset(cls.__slots__)
+
+    def __init__(self, fields: dict = (), **kwargs):
+        self.extra   = None
+        self._parent = None
+        self._key    = None
+        for key, value in dict(fields, **kwargs).items():
+            self[key] = value
+
+    def touch(self) -> None:
+        """Mark as changed. Writes through item access do this themselves."""
+        if self._parent is not None:
+            self._parent._changed(self._key)
+
+    def _changed(self, key) -> None:
+        self.touch()
+
+    def _coerce(self, key: str, value):
+        return value
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        value = _adopt(self._coerce(key, value), self, key)
+        if key in self._fields:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+        self.touch()
+
+    def __delitem__(self, key):
+        if key in self._fields:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+        self.touch()
+
+    def setdefault(self, key, default=None):
+        # the stored value, not `default`: a dict is stored as a TrackedDict copy of it
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def __iter__(self):
+        for key in self.__slots__:
+            if hasattr(self, key):
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+# --- Change tracking ---
+#
+# Dicts stored in a record (participants, waitlist, flex, limits, ...) become TrackedDicts, and
+# records and TrackedDicts know their parent and the key they sit under. Any write, however
+# deeply nested, walks up that chain to the Section (data['events'], ['players'],
+# ['lotteries']), which notes the top-level key as dirty, so Store.publish re-freezes only
+# those. Lists are replaced, never mutated in place, so they need no tracking.
+
+class TrackedDict(dict):
+    """A dict inside a record that reports every change to its parent."""
+    __slots__ = ('_parent', '_key')
+
+    def __init__(self, items=(), parent=None, key=None):
+        super().__init__(items)
+        self._parent = parent
+        self._key    = key
+        for k, v in self.items():
+            if isinstance(v, (dict, Record)):
+                dict.__setitem__(self, k, _adopt(v, self, k))
+
+    def _changed(self, key) -> None:
+        if self._parent is not None:
+            self._parent._changed(self._key)
+
+    def __setitem__(self, key, value):
+        self._changed(key)
+        super().__setitem__(key, _adopt(value, self, key))
+
+    def __delitem__(self, key):
+        self._changed(key)
+        super().__delitem__(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self._changed(key)
+        return super().pop(key, *default)
+
+    def popitem(self):
+        if self:
+            self._changed(next(reversed(self)))
+        return super().popitem()
+
+    def clear(self):
+        for key in self:
+            self._changed(key)
+        super().clear()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+
+class Section(TrackedDict):
+    """One top-level section of records, keyed by id, noting which ids changed since the last publish.
+
+    While a transaction runs, `journal` also keeps the record each changed id held when it
+    started (None if it had none), so a rollback can put the same objects back.
+    """
+    __slots__ = ('dirty', 'journal')
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.dirty   = set(self)
+        self.journal = None
+
+    def _changed(self, key) -> None:
+        if self.journal is not None and key not in self.journal:
+            self.journal[key] = dict.get(self, key)
+        self.dirty.add(key)
+
+
+def _adopt(value, parent, key):
+    """`value` as stored under parent[key]: records are attached, plain dicts become TrackedDicts."""
+    if isinstance(value, Record):
+        value._parent, value._key = parent, key
+        return value
+    if isinstance(value, TrackedDict) and (value._parent is None or value._parent is parent):
+        value._parent, value._key = parent, key
+        return value
+    if isinstance(value, dict):
+        return TrackedDict(value, parent, key)   # a copy, if it already belongs somewhere else
+    return value
+
+
+class Participant(Record):
+    __slots__ = ('name', 'role', 'boon', 'special_role', 'flex')
+
+    def _coerce(self, key, value):
+        if key == 'role':
+            return _as_enum(Role, value)
+        if key == 'boon':
+            return _as_enum(Boon, value)
+        return _interned(value)
+
+
+class Event(Record):
+    __slots__ = ('name', 'description', 'unix_ts', 'type', 'boss', 'wing',
+                 'role_limits', 'boon_limits', 'special_role_limits', 'open_signup',
+                 'creator_id', 'participants', 'channel_id', 'message_id', 'status',
+                 'dm_sent', 'reminded_1h', 'reminded_30m', 'point_value',
+                 'series_id', 'group_id', 'waitlist', 'flex', 'attended', 'no_shows')
+
+    def _coerce(self, key, value):
+        if key == 'participants':
+            return {sys.intern(uid): p if isinstance(p, Participant) else Participant(p)
+                    for uid, p in value.items()}
+        if key in ('type', 'status', 'boss', 'wing'):
+            return _interned(value)
+        return value
+
+
+class Player(Record):
+    __slots__ = ('name', 'points', 'events_attended', 'weight', 'weight_ts')
+
+    def _coerce(self, key, value):
+        return _interned(value)
+
+
+# --- Lottery weight: points decayed by age, evaluated on read ---
+#
+# With decay on, a player stores `weight` as of `weight_ts` rather than a weight per award:
+# every award decays by the same factor per second, so their sum does too, and reading it
+# at any later time is one multiplication. Nothing rewrites players as time passes.
+
+def _decay(seconds: float) -> float:
+    return 0.5 ** (seconds / (LOTTERY_HALF_LIFE_DAYS * 86400))
+
+
+def _weight_state(player) -> tuple:
+    """(weight, as-of time). Everyone is seeded at load, so a player without a weight was
+    created since and has no points yet."""
+    return player.get('weight', 0.0), player.get('weight_ts', 0)
+
+
+def _seed_lottery_weights(players: dict) -> None:
+    """Line stored weights up with the decay setting at load.
+
+    With decay off, awards only add to points, so any stored weight would go stale: drop it.
+    With decay on, a player without one (decay was off until now) gets their points as a
+    weight fixed at load time, so it decays alongside everyone else's from here on.
+    """
+    if not LOTTERY_HALF_LIFE_DAYS:
+        for player in players.values():
+            player.pop('weight', None)
+            player.pop('weight_ts', None)
+        return
+    now = int(time.time())
+    for player in players.values():
+        if player.get('weight') is None:
+            player['weight'], player['weight_ts'] = float(player['points']), now
+
+
+def add_lottery_weight(player: Player, points: int, ts: int) -> None:
+    """Fold an award of `points` earned at `ts` into the player's running weight."""
+    if not LOTTERY_HALF_LIFE_DAYS:
+        return
+    ts = min(ts, int(time.time()))   # an event closed before its start time counts from now
+    weight, since = _weight_state(player)
+    if ts >= since:
+        player['weight'], player['weight_ts'] = weight * _decay(ts - since) + points, ts
+    else:   # an older event closed late: decay the award, not the total
+        player['weight'], player['weight_ts'] = weight + points * _decay(since - ts), since
+
+
+def lottery_weight(player, now: float) -> float:
+    """The player's weight in a draw at `now` — their points, or the decayed sum of them."""
+    if not LOTTERY_HALF_LIFE_DAYS:
+        return player['points']
+    weight, since = _weight_state(player)
+    return weight * _decay(now - since)
+
+
+def _weight_order(player) -> float:
+    """A value that orders players the same way lottery_weight() does at every moment.
+
+    log2(weight at now) = log2(weight) - (now - weight_ts) / half-life, and the `now` term is
+    the same for everyone, so dropping it leaves a key that only changes on an award.
+    """
+    weight, since = _weight_state(player)
+    if weight <= 0:
+        return -math.inf
+    return math.log2(weight) + since / (LOTTERY_HALF_LIFE_DAYS * 86400)
+
+
+class Lottery(Record):
+    __slots__ = ('name', 'prizes', 'status', 'winners')
+
+    def _coerce(self, key, value):
+        return _interned(value) if key == 'status' else value
+
+
+def _load_model(data: dict) -> dict:
+    """Turn the JSON dicts of a freshly loaded data file into model records, in place."""
+    data['events']    = Section({sys.intern(k): Event(v) for k, v in data['events'].items()})
+    data['players']   = Section({sys.intern(k): Player(v) for k, v in data['players'].items()})
+    data['lotteries'] = Section({k: Lottery(v) for k, v in data['lotteries'].items()})
+    _seed_lottery_weights(data['players'])
+    return data
+
+
+def _json_default(obj):
+    if isinstance(obj, (Record, MappingProxyType, SnapshotSection)):
+        return dict(obj)
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
 # ---------------------------------------------------------------------------
 # Data layer
 # ---------------------------------------------------------------------------
+_section('Data layer')
 
 def _empty_data() -> dict:
     """Return a fresh, empty data structure."""
     return {
         'next_event_id': 1,
         'next_lottery_id': 1,
+        'next_series_id': 1,
         'events': {},
         'players': {},
         'lotteries': {},
+        'series': {},
+    }
+
+
+# On-disk format. Version 1 was pretty-printed JSON with one dict per participant.
+# Version 2 is minified JSON with each event's roster stored column-wise
+# ({"uid": [...], "name": [...], "role": [...], ...}), optionally zlib/lzma-compressed;
+# the compression is detected from the file's magic bytes, so any setting reads any file.
+
+DATA_FORMAT_VERSION = 2
+PARTICIPANT_COLUMNS = ('name', 'role', 'boon', 'special_role')   # always present on a roster entry
+_LZMA_MAGIC         = b'\xfd7zXZ\x00'
+
+
+def _encode_participants(participants: dict) -> dict:
+    columns = {'uid': list(participants)}
+    keys    = list(PARTICIPANT_COLUMNS)
+    for p in participants.values():
+        keys += [k for k in p if k not in keys]
+    for key in keys:
+        columns[key] = [p.get(key) for p in participants.values()]
+    return columns
+
+
+def _decode_participants(columns: dict) -> dict:
+    uids     = columns.pop('uid')
+    keys     = list(columns)
+    rows     = [dict(zip(keys, values)) for values in zip(*columns.values())]
+    optional = [k for k in keys if k not in PARTICIPANT_COLUMNS]
+    for row in rows:
+        for key in optional:
+            # optional keys (e.g. 'flex') are written as null where a row didn't have them
+            if row[key] is None:
+                del row[key]
+    return dict(zip(uids, rows))
+
+
+def _encode_state(data: dict, compression: str = DATA_COMPRESSION) -> bytes:
+    state = dict(data, format_version=DATA_FORMAT_VERSION)
+    state['events'] = {
+        eid: dict(event, participants=_encode_participants(event.get('participants', {})))
+        for eid, event in data['events'].items()
     }
+    raw = json.dumps(state, separators=(',', ':'), ensure_ascii=False, default=_json_default).encode('utf-8')
+    if compression == 'zlib':
+        return zlib.compress(raw, 6)
+    if compression == 'lzma':
+        return lzma.compress(raw)
+    return raw
+
+
+def _decode_state(raw: bytes) -> dict:
+    if raw.startswith(_LZMA_MAGIC):
+        raw = lzma.decompress(raw)
+    elif raw[:1] == b'x':          # zlib header; JSON never starts with 'x'
+        raw = zlib.decompress(raw)
+    data = json.loads(raw)
+    if data.pop('format_version', 1) >= 2:
+        for event in data.get('events', {}).values():
+            event['participants'] = _decode_participants(event['participants'])
+    return data
+
+
+def _freeze(value):
+    """Deep read-only copy: mappings become mappingproxies, lists become tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    """Plain mutable copy of a frozen value: the inverse of _freeze."""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+RECORD_SECTIONS = ('events', 'players', 'lotteries')   # Sections of Records, republished by dirty key
+SNAPSHOT_COMPACT_MIN = 64   # changes a SnapshotSection layers over its base before folding them in
+
+_GONE = object()   # a SnapshotSection change: the key was deleted
+
+
+class SnapshotSection(Mapping):
+    """One section of a Snapshot: frozen records, read-only.
+
+    A shared `base` dict plus the entries changed since it was built, so publishing copies
+    the changes rather than the whole section. Once they outgrow
+    max(SNAPSHOT_COMPACT_MIN, sqrt(len(base))) they're folded into a new base; a save then
+    costs O(changes + sqrt(n)) amortised, and usually just O(changes), since the same few
+    open events change again and again. Lookups are at most two dict probes.
+    """
+    __slots__ = ('_base', '_changes', '_len')
+
+    def __init__(self, base: dict, changes: dict = None):
+        self._base    = base
+        self._changes = changes or {}
+        self._len     = len(base) + sum((v is not _GONE) - (k in base) for k, v in self._changes.items())
+
+    def updated(self, changes: dict) -> 'SnapshotSection':
+        """A new section with `changes` ({key: frozen record, or _GONE}) applied; this one is untouched."""
+        merged = {**self._changes, **changes}
+        if len(merged) <= max(SNAPSHOT_COMPACT_MIN, math.isqrt(len(self._base))):
+            return SnapshotSection(self._base, merged)
+        base = dict(self._base)
+        for key, value in merged.items():
+            if value is _GONE:
+                base.pop(key, None)
+            else:
+                base[key] = value
+        return SnapshotSection(base)
+
+    def __getitem__(self, key):
+        if key in self._changes:
+            value = self._changes[key]
+            if value is _GONE:
+                raise KeyError(key)
+            return value
+        return self._base[key]
+
+    def __contains__(self, key):
+        if key in self._changes:
+            return self._changes[key] is not _GONE
+        return key in self._base
+
+    def __iter__(self):
+        changes = self._changes
+        for key in self._base:
+            if changes.get(key) is not _GONE:
+                yield key
+        for key, value in changes.items():
+            if value is not _GONE and key not in self._base:
+                yield key
+
+    def __len__(self):
+        return self._len
+
+
+class Snapshot:
+    """The committed state as of one save, deeply read-only.
+
+    Published by Store.publish() after every save. Only records their Section marked dirty
+    are re-frozen; everything else is shared with the previous snapshot. Readers hold a
+    reference and never lock.
+    """
+    __slots__ = ('version', 'events', 'players', 'lotteries', 'series', 'counters')
+
+    def __init__(self, version: int, events, players, lotteries, series, counters):
+        self.version   = version
+        self.events    = events
+        self.players   = players
+        self.lotteries = lotteries
+        self.series    = series
+        self.counters  = counters
+
+
+class Store:
+    """One guild's state held in memory, read from disk once and written through on save."""
+    def __init__(self, path: str):
+        self.path           = path
+        self._data          = None
+        self.event_index    = EventIndex()
+        self.lottery_search = TokenIndex()
+        self.player_rank    = SortedIndex()   # players by points (or lottery weight), for /leaderboard
+        self._lock          = asyncio.Lock()
+        self._load_lock     = asyncio.Lock()
+        self._snapshot      = None
+        self._published     = {}              # section name -> the live Section the snapshot tracks
+        self.backups        = BackupChain(os.path.join(os.path.dirname(path), 'backups'))
+        self.analytics      = AttendanceAnalytics()   # attendance figures, cached per snapshot
+        self.on_save        = None            # called with the store after every save
+        self.last_used      = time.monotonic()
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            self._load()
+        return self._data
+
+    def _load(self) -> None:
+        self._data = self._read()
+        self._rebuild_indexes()
+        self.publish()
+
+    async def load_async(self) -> None:
+        """Load in a worker thread, so a big guild's first use doesn't stall every other guild.
+
+        Nothing reads a store before StoreRegistry.enter() has awaited this.
+        """
+        if self._data is not None:
+            return
+        async with self._load_lock:
+            if self._data is None:
+                await asyncio.to_thread(self._load)
+
+    def wake_at(self):
+        """Unix time the reminder loop next has work here (an hour before the first open event),
+        0 if an active series has nothing posted yet, or None if there's nothing scheduled."""
+        timeline = self.event_index.open_by_time
+        if len(timeline):
+            return timeline.value(timeline.page(0, 1)[0]) - 3600
+        if any(series['status'] == 'active' for series in self._data['series'].values()):
+            return 0
+        return None
+
+    def _read(self) -> dict:
+        """Load data from disk. Returns empty structure if file doesn't exist yet."""
+        if not os.path.exists(self.path):
+            return _empty_data()
+        try:
+            with open(self.path, 'rb') as f:
+                data = _decode_state(f.read())
+        except (ValueError, OSError, zlib.error, lzma.LZMAError) as e:
+            log.warning("Could not load data file, starting fresh", extra={'path': self.path, 'reason': str(e)})
+            return _empty_data()
+        # Files written before a section existed get it filled in empty
+        for key, default in _empty_data().items():
+            data.setdefault(key, default)
+        return _load_model(data)
+
+    @property
+    def view(self) -> Snapshot:
+        """Latest published snapshot, for read-only commands and anything running off the loop."""
+        if self._snapshot is None:
+            if self._data is None:
+                self._load()
+            else:
+                self.publish()
+        return self._snapshot
+
+    def publish(self) -> None:
+        """Swap in a new Snapshot of the current state, re-freezing only the records that changed."""
+        prev     = self._snapshot
+        sections = {}
+        for name in RECORD_SECTIONS:
+            live = self._section(name)
+            if prev is None or self._published.get(name) is not live:   # a whole new section (load, restore)
+                sections[name] = SnapshotSection({key: _freeze(record) for key, record in live.items()})
+            else:
+                sections[name] = getattr(prev, name).updated(
+                    {key: _freeze(live[key]) if key in live else _GONE for key in live.dirty}
+                )
+            live.dirty.clear()
+            self._published[name] = live
+        self._snapshot = Snapshot(
+            version=(prev.version + 1) if prev else 1,
+            series=_freeze(self._data['series']),   # a handful of plain dicts: cheaper to copy than track
+            counters=MappingProxyType({k: v for k, v in self._data.items() if not isinstance(v, dict)}),
+            **sections,
+        )
+
+    def _section(self, name: str) -> Section:
+        """data[name], made a Section if something swapped in a plain dict."""
+        live = self._data[name]
+        if not isinstance(live, Section):
+            live = self._data[name] = Section(live)
+        return live
+
+    def _rebuild_indexes(self) -> None:
+        self.event_index.rebuild(self._data['events'])
+        self.lottery_search = TokenIndex()
+        for lid, lottery in self._data['lotteries'].items():
+            self.lottery_search.add(lid, lottery['name'])
+        self.rebuild_player_rank()
+
+    def index_player(self, uid: str) -> None:
+        player = self._data['players'][uid]
+        if LOTTERY_HALF_LIFE_DAYS:
+            self.player_rank.upsert(uid, (-_weight_order(player), player['name'].lower()))
+        else:
+            self.player_rank.upsert(uid, (-player['points'], player['name'].lower()))
+
+    def rebuild_player_rank(self) -> None:
+        self.player_rank = SortedIndex()
+        for uid in self._data['players']:
+            self.index_player(uid)
+
+    def replace(self, data: dict) -> None:
+        """Swap in a whole new state (e.g. a restored backup), re-index it and persist it."""
+        for key, default in _empty_data().items():
+            data.setdefault(key, default)
+        self._data = _load_model(data)
+        self._rebuild_indexes()
+        self.save()
+
+    def save(self) -> None:
+        """Persist data to disk and publish it as the new read snapshot."""
+        if not leader.is_leader:
+            raise NotLeader(f"not writing {self.path}: this replica doesn't hold the leader lease")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        raw = _encode_state(self._data)
+        with open(self.path + '.tmp', 'wb') as f:   # a crash mid-write leaves the old file intact
+            f.write(raw)
+        os.replace(self.path + '.tmp', self.path)
+        self.publish()
+        if self.on_save:
+            self.on_save(self)
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """Apply a batch of changes under the store lock and persist them with one save.
+
+        If the block (or the save) raises, everything it changed is put back and re-indexed
+        before the exception propagates, so a later save can't write half of it. The block
+        must not await: nothing else may change the store while it runs.
+        """
+        async with self._lock:
+            checkpoint = self._checkpoint()
+            try:
+                yield self.data
+                self.save()
+                self._end_journal()
+            except BaseException:
+                self._rollback(checkpoint)
+                raise
+
+    def _checkpoint(self) -> dict:
+        """What _rollback needs to restore the state as it is now.
+
+        Counters and series are copied (they're small). Records without unsaved changes are
+        already in the snapshot, so only the dirty ones are copied here; from now on each
+        section journals which records the transaction touches.
+        """
+        snapshot = self.view
+        records  = {}
+        for name in RECORD_SECTIONS:
+            live         = self._section(name)
+            live.journal = {}
+            records[name] = {key: _freeze(live[key]) for key in live.dirty if key in live}
+        return {
+            'counters':  {k: v for k, v in self._data.items() if not isinstance(v, dict)},
+            'series':    _freeze(self._data['series']),
+            'records':   records,
+            'published': {name: getattr(snapshot, name) for name in RECORD_SECTIONS},
+        }
+
+    def _end_journal(self) -> None:
+        for name in RECORD_SECTIONS:
+            self._section(name).journal = None
+
+    def _rollback(self, checkpoint: dict) -> None:
+        """Undo every change since `checkpoint`, in place, so references held elsewhere stay valid."""
+        self._data.update(checkpoint['counters'])
+        self._data['series'] = _thaw(checkpoint['series'])
+        for name, unsaved in checkpoint['records'].items():
+            live, published = self._section(name), checkpoint['published'][name]
+            journal, live.journal = live.journal or {}, None
+            for key, record in journal.items():
+                if record is None:
+                    live.pop(key, None)
+                else:
+                    record.clear()
+                    record.update(_thaw(unsaved[key] if key in unsaved else published[key]))
+                    live[key] = record
+                self._reindex(name, key)
+        log.warning("Transaction rolled back", extra={'path': self.path})
+
+    def _reindex(self, section: str, key: str) -> None:
+        """Bring the indexes in line with one record after it was restored or dropped."""
+        record = self._data[section].get(key)
+        if section == 'events':
+            if record is None:
+                self.event_index.remove(key)
+            else:
+                self.event_index.update(key, record)
+        elif section == 'players':
+            if record is None:
+                self.player_rank.discard(key)
+            else:
+                self.index_player(key)
+        elif record is None:
+            self.lottery_search.remove(key)
+        else:
+            self.lottery_search.add(key, record['name'])
+
+
+# --- Per-guild stores ---
+#
+# Every guild gets its own Store under GUILDS_DIR/<guild_id>/ — its own file, ID counters,
+# lock, read snapshot and backup chain — loaded the first time something in that guild needs
+# it. The guild being served lives in a context variable set once per interaction (by
+# GuildCommandTree, GuildView and GuildModal) or per reminder pass. asyncio tasks copy it when
+# they're created, so everything a handler awaits or spawns sees the same guild, and the
+# module-level `store` resolves to that guild's Store at each use.
+#
+# GUILDS_DIR/schedule.json records, per guild, when the reminder loop next has work there, so
+# guilds nobody is using stay unloaded until an hour before their next event.
+
+STORE_IDLE_MINUTES = 180   # unload a guild untouched this long with nothing due soon
+
+_current_guild = contextvars.ContextVar('current_guild', default=None)
+
+
+class StoreRegistry:
+    """Lazily created per-guild Stores, plus the reminder wake-up time of every guild on disk."""
+    def __init__(self, root: str):
+        self.root    = root
+        self._stores = {}     # guild_id -> Store
+        self._wakes  = None   # guild_id -> unix ts, loaded from schedule.json on first use
+
+    def get(self, guild_id: int) -> Store:
+        st = self._stores.get(guild_id)
+        if st is None:
+            st = self._stores[guild_id] = Store(os.path.join(self.root, str(guild_id), 'kds_bot_data.json'))
+            st.on_save = lambda saved, gid=guild_id: self.schedule(gid, saved.wake_at())
+        return st
+
+    def current(self) -> Store:
+        guild_id = _current_guild.get()
+        if guild_id is None:
+            raise RuntimeError("no guild in context — state is per guild")
+        return self.get(guild_id)
+
+    async def enter(self, guild_id: int) -> Store:
+        """Make `guild_id` the current guild for this task and have its store loaded."""
+        _current_guild.set(guild_id)
+        st = self.get(guild_id)
+        st.last_used = time.monotonic()
+        await st.load_async()
+        return st
+
+    def loaded(self) -> list:
+        """[(guild_id, Store)] of every store in memory."""
+        return [(gid, st) for gid, st in self._stores.items() if st._data is not None]
+
+    def forget(self, guild_id: int) -> None:
+        self._stores.pop(guild_id, None)
+
+    def reset(self) -> None:
+        """Drop every cached store and the wake schedule; they're re-read from disk on next use."""
+        self._stores = {}
+        self._wakes  = None
+
+    def _schedule_path(self) -> str:
+        return os.path.join(self.root, 'schedule.json')
+
+    def _wake_times(self) -> dict:
+        if self._wakes is None:
+            try:
+                with open(self._schedule_path()) as f:
+                    self._wakes = {int(gid): ts for gid, ts in json.load(f).items()}
+            except (OSError, ValueError):
+                self._wakes = {}
+        return self._wakes
+
+    def schedule(self, guild_id: int, wake_ts) -> None:
+        """Record when a guild next needs the reminder loop (None: nothing scheduled)."""
+        wakes = self._wake_times()
+        if wakes.get(guild_id) == wake_ts:
+            return
+        if wake_ts is None:
+            wakes.pop(guild_id, None)
+        else:
+            wakes[guild_id] = wake_ts
+        os.makedirs(self.root, exist_ok=True)
+        path = self._schedule_path()
+        with open(path + '.tmp', 'w') as f:
+            json.dump({str(gid): ts for gid, ts in wakes.items()}, f)
+        os.replace(path + '.tmp', path)
+
+    def due(self, now: float) -> list:
+        """Guilds the reminder loop should visit: every loaded one, plus unloaded ones whose wake time has come."""
+        due = [gid for gid, _ in self.loaded()]
+        due += [gid for gid, ts in self._wake_times().items() if ts <= now and gid not in self._stores]
+        return due
+
+    def evict_idle(self, now: float) -> list:
+        """Drop stores nobody has touched in STORE_IDLE_MINUTES whose next wake isn't within the hour."""
+        idle_since = time.monotonic() - STORE_IDLE_MINUTES * 60
+        evicted    = []
+        for gid, st in self.loaded():
+            wake = st.wake_at()
+            if st.last_used < idle_since and not st._lock.locked() and (wake is None or wake > now + 3600):
+                del self._stores[gid]
+                evicted.append(gid)
+        return evicted
+
+
+class _CurrentStore:
+    """Stands in for the current guild's Store, so module code can keep saying `store.x`."""
+    def __getattr__(self, name):
+        return getattr(stores.current(), name)
+
+
+stores = StoreRegistry(GUILDS_DIR)
+store  = _CurrentStore()
+
+
+async def _in_guild(guild_id: int, fn, *args):
+    """Await fn(*args) with `guild_id` as the current guild. Call through a task (e.g. gather)
+    so the guild doesn't leak into the caller's context."""
+    log_context(guild_id=guild_id)
+    await stores.enter(guild_id)
+    return await fn(*args)
+
+
+async def _run_in_due_guilds(fn, what: str) -> None:
+    """Await fn() for every guild with something due, concurrently, each in its own guild context."""
+    due     = stores.due(time.time())
+    results = await asyncio.gather(*(_in_guild(gid, fn) for gid in due), return_exceptions=True)
+    for gid, result in zip(due, results):
+        if isinstance(result, Exception):
+            log.error("%s failed", what, extra={'guild_id': gid}, exc_info=result)
+
+
+def _bind_interaction(interaction: discord.Interaction, **fields) -> None:
+    """Start this interaction's log context, unless an earlier check already did."""
+    if (_log_context.get() or {}).get('interaction_id') == interaction.id:
+        return
+    command = interaction.command.qualified_name if interaction.command else interaction.data.get('custom_id')
+    _log_context.set({
+        'interaction_id': interaction.id, 'command': command, 'user_id': interaction.user.id,
+        'guild_id': interaction.guild_id, 'started': time.monotonic(), **fields,
+    })
+
+
+async def _enter_interaction(interaction: discord.Interaction, guild_id, **fields) -> bool:
+    """Gate for every interaction: only the lease holder answers, and only for a guild."""
+    _bind_interaction(interaction, **fields)
+    if not leader.is_leader or guild_id is None:
+        return False   # the leader replica answers this one
+    await stores.enter(guild_id)
+    return True
+
+
+class GuildView(discord.ui.View):
+    """View whose interactions run against the guild it was created in — including clicks
+    in DMs (attendance checks), where the interaction itself carries no guild."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.guild_id = _current_guild.get()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await _enter_interaction(interaction, interaction.guild_id or self.guild_id,
+                                        view=type(self).__name__, event_id=getattr(self, 'event_id', None))
+
+
+class GuildModal(discord.ui.Modal):
+    """Modal counterpart of GuildView."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.guild_id = _current_guild.get()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await _enter_interaction(interaction, interaction.guild_id or self.guild_id,
+                                        view=type(self).__name__, event_id=getattr(self, 'event_id', None))
+
+
+# --- Leader lease ---
+#
+# During a redeploy the old and new containers are connected at the same time. Only the
+# replica holding the lease answers interactions, runs the reminder and backup loops and
+# writes state. The other stays connected as a standby and retries every
+# LEADER_HEARTBEAT_SECONDS, so it takes over one heartbeat after the leader lets go on
+# shutdown, or LEADER_LEASE_SECONDS after a leader that crashed or hung stops renewing.
+#
+# FileLease keeps {holder, expires, term} in a heartbeat file on the data volume and makes
+# every read-modify-write of it under an fcntl lock on a sibling file. LocalLease is an
+# in-memory stand-in with the same rules, for tests and single-replica setups.
+# LEADER_BACKEND picks one. A leader stops writing a heartbeat before its lease can run out,
+# and drops its cached stores whenever it starts a new term.
+
+LEADER_BACKEND           = os.getenv('LEADER_BACKEND', 'file')   # 'file' | 'local'
+LEADER_FILE              = os.path.join(os.path.dirname(DATA_FILE), 'leader.json')
+LEADER_LEASE_SECONDS     = 15
+LEADER_HEARTBEAT_SECONDS = 3
+
+
+class NotLeader(RuntimeError):
+    """Raised instead of writing state from a replica that doesn't hold the lease."""
+
+
+def _claim_lease(current, holder: str, now: float) -> dict:
+    """The lease after `holder` asks for it, or None if someone else still holds it."""
+    if current and current['holder'] != holder and current['expires'] > now:
+        return None
+    renewing = bool(current) and current['holder'] == holder and current['expires'] > now
+    term     = current['term'] if renewing else (current or {}).get('term', 0) + 1
+    return {'holder': holder, 'expires': now + LEADER_LEASE_SECONDS, 'term': term}
+
+
+class LocalLease:
+    """Lease backend kept in memory; Leaders sharing one `table` contend like replicas on a volume."""
+    def __init__(self, table: dict = None):
+        self.table = {} if table is None else table
+
+    def claim(self, holder: str, now: float):
+        lease = _claim_lease(self.table.get('lease'), holder, now)
+        if lease:
+            self.table['lease'] = lease
+        return lease
+
+    def release(self, holder: str) -> None:
+        lease = self.table.get('lease')
+        if lease and lease['holder'] == holder:
+            lease['expires'] = 0
+
+
+class FileLease:
+    """Lease backend in a heartbeat file, every update made under an fcntl lock."""
+    def __init__(self, path: str):
+        self.path = path
+
+    @contextlib.contextmanager
+    def _locked(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, lease: dict) -> None:
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(lease, f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def claim(self, holder: str, now: float):
+        with self._locked():
+            lease = _claim_lease(self._read(), holder, now)
+            if lease:
+                self._write(lease)
+            return lease
+
+    def release(self, holder: str) -> None:
+        with self._locked():
+            lease = self._read()
+            if lease and lease['holder'] == holder:
+                self._write({**lease, 'expires': 0})   # keep the term so the next one is distinct
+
+
+class Leader:
+    """This replica's hold on the lease."""
+    def __init__(self, backend, holder: str = None):
+        self.backend      = backend
+        self.holder       = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self.term         = None
+        self._valid_until = 0.0   # monotonic time our last renewal stops covering us
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    def renew(self) -> bool:
+        """Claim or extend the lease. Returns True if this starts a new term. Blocking: run in a thread."""
+        started = time.monotonic()
+        try:
+            lease = self.backend.claim(self.holder, time.time())
+        except OSError as e:
+            log.warning("Leader lease check failed", extra={'reason': str(e)})
+            lease = None
+        if not lease:
+            self._valid_until = 0.0
+            return False
+        # Counted from before the claim and a heartbeat short of expiry, so a slow renewal
+        # stops our writes before a standby is allowed to start its own
+        self._valid_until = started + LEADER_LEASE_SECONDS - LEADER_HEARTBEAT_SECONDS
+        new_term, self.term = lease['term'] != self.term, lease['term']
+        return new_term
+
+    def release(self) -> None:
+        self._valid_until = 0.0
+        try:
+            self.backend.release(self.holder)
+        except OSError as e:
+            log.warning("Could not release the leader lease", extra={'reason': str(e)})
+
+
+leader = Leader(LocalLease() if LEADER_BACKEND == 'local' else FileLease(LEADER_FILE))
+
+
+@tasks.loop(seconds=LEADER_HEARTBEAT_SECONDS)
+async def leader_loop():
+    was_leader = leader.is_leader
+    if await asyncio.to_thread(leader.renew):
+        stores.reset()   # another replica may have written while we weren't leading
+        log.info("Took the leader lease", extra={'holder': leader.holder, 'term': leader.term})
+        if bot.is_ready():
+            _adopt_legacy_data()
+    elif was_leader and not leader.is_leader:
+        log.warning("Lost the leader lease, standing by", extra={'holder': leader.holder})
+
 
 def load_data() -> dict:
-    """Load data from disk. Returns empty structure if file doesn't exist yet."""
-    if not os.path.exists(DATA_FILE):
-        return _empty_data()
-    try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, OSError) as e:
-        print(f"Warning: could not load data file ({e}). Starting fresh.")
-        return _empty_data()
+    """Return the current guild's in-memory state (read from disk on first use only)."""
+    return store.data
+
+class StaleData(RuntimeError):
+    """Raised by save_data when the guild's store was reloaded after the caller read its data."""
+
 
 def save_data(data: dict) -> None:
-    """Persist data to disk."""
-    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+    """Persist the current guild's data to disk.
+
+    `data` must be what load_data() returned for this guild. If the store was evicted or
+    dropped for a new leader term while the caller awaited, it has been re-read from disk
+    since, and writing the caller's copy over it would lose whatever that picked up.
+    """
+    st = stores.current()
+    if st._data is not data:
+        raise StaleData(f"not writing {st.path}: the store was reloaded after this data was read")
+    st.save()
 
 def next_event_id(data: dict) -> str:
     """Claim and return the next event ID as a string, then increment the counter."""
@@ -134,6 +1496,12 @@ def next_lottery_id(data: dict) -> str:
     data['next_lottery_id'] += 1
     return lid
 
+def next_series_id(data: dict) -> str:
+    """Claim and return the next recurring-series ID as a string, then increment the counter."""
+    sid = str(data['next_series_id'])
+    data['next_series_id'] += 1
+    return sid
+
 # Datetimes are stored as UTC Unix timestamps (int) in JSON.
 # Discord's <t:unix:F> format renders automatically in each viewer's local timezone.
 
@@ -160,6 +1528,10 @@ def dt_to_unix(dt: datetime) -> int:
     """Convert a UTC-aware datetime to a Unix timestamp for storage."""
     return int(dt.timestamp())
 
+def _parse_date_utc(value: str) -> int:
+    """'YYYY-MM-DD' -> Unix timestamp of that day's 00:00 UTC. Raises ValueError."""
+    return dt_to_unix(datetime.strptime(value.strip(), "%Y-%m-%d").replace(tzinfo=timezone.utc))
+
 def unix_to_discord_ts(unix: int, style: str = 'F') -> str:
     """Return a Discord timestamp string that renders in the viewer's local timezone.
     Styles: F=full, f=short, D=date, T=time, R=relative, d=short date, t=short time.
@@ -173,6 +1545,7 @@ def unix_to_discord_ts(unix: int, style: str = 'F') -> str:
 # ---------------------------------------------------------------------------
 # Event embed + signup views
 # ---------------------------------------------------------------------------
+_section('Event embed + signup views')
 
 ROLE_EMOJIS = {'Tank': '🛡️', 'Heal': '💚', 'DPS': '⚔️'}
 
@@ -212,7 +1585,8 @@ def create_event_embed(event: dict, event_id: str) -> discord.Embed:
             lines   = []
             for p in role_ps:
                 boon_tag = f" [{p['boon']}]" if p.get('boon') else ""
-                lines.append(f"{p['name']}{boon_tag}")
+                flex_tag = " 🔀" if p.get('flex') else ""
+                lines.append(f"{p['name']}{boon_tag}{flex_tag}")
             embed.add_field(
                 name=f"{ROLE_EMOJIS[role]} {role} ({count}/{limit})",
                 value="\n".join(lines) if lines else "*(empty)*",
@@ -232,29 +1606,572 @@ def create_event_embed(event: dict, event_id: str) -> discord.Embed:
                 special_lines.append(f"**{role}** ({i+1}/{limit})  {name}")
         embed.add_field(name="🎯 Special Roles", value="\n".join(special_lines), inline=False)
 
+    unplaced = [f['name'] for u, f in event.get('flex', {}).items() if u not in participants]
+    if unplaced:
+        more = f" …and {len(unplaced) - 20} more" if len(unplaced) > 20 else ""
+        embed.add_field(name=f"🔀 Flexible — not yet placed ({len(unplaced)})",
+                        value=", ".join(unplaced[:20]) + more, inline=False)
+
+    waiting = _waitlist_entries(event)
+    if waiting:
+        lines = []
+        for i, (_, w) in enumerate(waiting[:10], start=1):
+            boon_tag = f" [{w['boon']}]" if w.get('boon') else ""
+            lines.append(f"{i}. {w['name']} — {w['role']}{boon_tag}")
+        if len(waiting) > 10:
+            lines.append(f"…and {len(waiting) - 10} more")
+        embed.add_field(name=f"⏳ Waitlist ({len(waiting)})", value="\n".join(lines), inline=False)
+
     point_val = POINT_VALUES.get(event['type'], 0)
     pts_text  = f"{point_val} points on attendance" if point_val > 0 else "No points"
-    embed.set_footer(text=f"Event ID: {event_id}  •  {pts_text}")
+    series_txt = f"  •  Weekly series {event['series_id']}" if event.get('series_id') else ""
+    if event.get('group_id'):
+        series_txt += f"  •  Wing night {event['group_id']}"
+    embed.set_footer(text=f"Event ID: {event_id}{series_txt}  •  {pts_text}")
     return embed
 
 
+_background_tasks = set()   # strong refs so fire-and-forget tasks aren't GC'd
+
+
+def _spawn(coro) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference until it finishes."""
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+class RateLimiter:
+    """Async token bucket: at most `rate` acquisitions per `per` seconds."""
+    def __init__(self, rate: int, per: float):
+        self.capacity  = rate
+        self.tokens    = float(rate)
+        self.fill_rate = rate / per
+        self.updated   = time.monotonic()
+        self._lock     = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now          = time.monotonic()
+        self.tokens  = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now; never waits."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def __aenter__(self):
+        async with self._lock:
+            while not self.try_acquire():
+                await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+            return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+# Discord allows about 5 messages per 5s per channel; stay under it instead of eating 429s
+_channel_limiters = {}
+
+def _channel_limiter(channel_id: int) -> RateLimiter:
+    limiter = _channel_limiters.get(channel_id)
+    if limiter is None:
+        limiter = _channel_limiters[channel_id] = RateLimiter(rate=5, per=5.0)
+    return limiter
+
+
 async def _refresh_event_embed(event: dict, event_id: str) -> None:
-    """Fetch the public message and edit it with the current embed."""
-    channel = bot.get_channel(event['channel_id'])
-    if not channel or not event.get('message_id'):
+    """Edit the public message with the current embed (one REST call — no fetch first)."""
+    if not event.get('channel_id') or not event.get('message_id'):
         return
+    message = bot.get_partial_messageable(event['channel_id']).get_partial_message(event['message_id'])
     try:
-        message = await channel.fetch_message(event['message_id'])
         await message.edit(embed=create_event_embed(event, event_id))
     except discord.NotFound:
         pass  # message was deleted — nothing to update
 
 
-class EventView(discord.ui.View):
+# Signup-button throttling: each user gets a small token bucket per event, checked in
+# EventView.interaction_check once the leader/guild gate has passed (a standby must not
+# spend tokens or answer for clicks it won't handle) and before the handler runs; an
+# identical click (same button, same user, same event) within CLICK_DEDUPE_SECONDS is
+# absorbed outright.
+CLICK_BURST          = 4      # clicks a user can make on one event in quick succession...
+CLICK_REFILL_SECONDS = 3.0    # ...then one more every this many seconds
+CLICK_DEDUPE_SECONDS = 2.0
+CLICK_TRACK_MAX      = 5000   # prune idle buckets once this many are tracked
+
+_click_buckets = {}   # (uid, guild_id, event_id) -> RateLimiter
+_last_click    = {}   # (uid, guild_id, event_id) -> (custom_id, monotonic time)
+click_stats    = {'throttled': 0, 'deduped': 0}
+
+
+def _click_verdict(uid: int, guild_id: int, event_id: str, action: str) -> str:
+    """'ok', 'dedupe' (same click again, too soon) or 'throttle' (out of tokens)."""
+    key  = (uid, guild_id, event_id)
+    now  = time.monotonic()
+    last = _last_click.get(key)
+    if last and last[0] == action and now - last[1] < CLICK_DEDUPE_SECONDS:
+        click_stats['deduped'] += 1
+        return 'dedupe'
+    if len(_click_buckets) >= CLICK_TRACK_MAX:
+        idle = [k for k, (_, t) in _last_click.items() if now - t > CLICK_BURST * CLICK_REFILL_SECONDS]
+        for k in idle:
+            _click_buckets.pop(k, None)
+            _last_click.pop(k, None)
+    bucket = _click_buckets.get(key)
+    if bucket is None:
+        bucket = _click_buckets[key] = RateLimiter(rate=CLICK_BURST, per=CLICK_BURST * CLICK_REFILL_SECONDS)
+    if not bucket.try_acquire():
+        click_stats['throttled'] += 1
+        return 'throttle'
+    _last_click[key] = (action, now)
+    return 'ok'
+
+
+EMBED_REFRESH_DELAY = 1.5   # seconds to gather changes before editing a message
+_pending_refresh    = set()   # (guild_id, event_id)
+
+
+def _schedule_embed_refresh(event_id: str) -> None:
+    """Queue one embed edit for this event; further calls before it runs are absorbed."""
+    key = (_current_guild.get(), event_id)
+    if key in _pending_refresh:
+        return
+    _pending_refresh.add(key)
+    _spawn(_flush_embed_refresh(event_id))   # the task inherits the current guild
+
+
+async def _flush_embed_refresh(event_id: str) -> None:
+    await asyncio.sleep(EMBED_REFRESH_DELAY)
+    # Clear first: a change landing while we edit schedules a fresh refresh
+    _pending_refresh.discard((_current_guild.get(), event_id))
+    event = load_data()['events'].get(event_id)
+    if event:
+        await _refresh_event_embed(event, event_id)
+
+
+# --- Flexible signups: composition solver ---
+#
+# A flexible signup ranks up to FLEX_MAX_CHOICES role/boon combos plus any special roles the
+# player would take. Fixed signups (the normal Register flow) keep their slot; flexible players
+# are placed into whatever is left by a min-cost max-flow over
+#     source → player → (role, boon) → role → sink
+# so role limits hold by construction. Boon limits span roles, which one flow network can't
+# express, so every way of splitting each boon's remaining cap between roles is solved and
+# the cheapest kept — at most a few dozen tiny networks for the templates in BOSS_TEMPLATES.
+# Special roles are then matched among the placed players as a second, independent flow.
+
+FLEX_MAX_CHOICES = 3
+
+
+def _min_cost_flow(n: int, edges: list, source: int, sink: int) -> list:
+    """Unit-augmenting min-cost flow; keeps pushing while the cheapest path has negative cost.
+
+    edges are (u, v, capacity, cost); costs may be negative. Returns the flow on each edge.
+    """
+    graph = [[] for _ in range(n)]
+    to, cap, cost = [], [], []
+    for u, v, c, w in edges:
+        graph[u].append(len(to)); to.append(v); cap.append(c);  cost.append(w)
+        graph[v].append(len(to)); to.append(u); cap.append(0);  cost.append(-w)
+
+    while True:
+        # SPFA: residual edges can be negative, and these graphs are far too small for potentials to pay off
+        dist, prev, queued = [float('inf')] * n, [-1] * n, [False] * n
+        dist[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            queued[u] = False
+            for e in graph[u]:
+                v = to[e]
+                if cap[e] > 0 and dist[u] + cost[e] < dist[v]:
+                    dist[v], prev[v] = dist[u] + cost[e], e
+                    if not queued[v]:
+                        queued[v] = True
+                        queue.append(v)
+        if dist[sink] >= 0:
+            break
+        v = sink
+        while v != source:
+            e = prev[v]
+            cap[e]     -= 1
+            cap[e ^ 1] += 1
+            v = to[e ^ 1]
+    return [cap[2 * i + 1] for i in range(len(edges))]
+
+
+def _splits(total: int, parts: int):
+    """Every way to share `total` slots between `parts` buckets (unused slots go to the last)."""
+    if parts == 1:
+        yield (total,)
+        return
+    for first in range(total + 1):
+        for rest in _splits(total - first, parts - 1):
+            yield (first,) + rest
+
+
+def _assign_flex(players: list, role_caps: dict, boon_caps: dict) -> dict:
+    """Place players [(uid, [(role, boon), ...], seated)] into the remaining caps.
+
+    Maximises placed players first, then keeps already-seated players on the roster, then
+    minimises the total preference rank. Returns {uid: (role, boon)}.
+    """
+    slots = sum(role_caps.values())
+    if not players or slots <= 0:
+        return {}
+    keep = FLEX_MAX_CHOICES * slots + 1        # outweighs any total of ranks
+    fill = keep * (slots + 1)                  # outweighs any number of kept seats
+
+    pairs      = sorted({c for _, choices, _ in players for c in choices if role_caps.get(c[0], 0) > 0},
+                        key=lambda c: (c[0], c[1] or ''))
+    boon_roles = {}
+    for role, boon in pairs:
+        if boon:
+            boon_roles.setdefault(boon, []).append(role)
+    boons = list(boon_roles)
+
+    roles   = sorted({role for role, _ in pairs})
+    n_p     = len(players)
+    pair_id = {c: 1 + n_p + i for i, c in enumerate(pairs)}
+    role_id = {r: 1 + n_p + len(pairs) + i for i, r in enumerate(roles)}
+    sink    = 1 + n_p + len(pairs) + len(roles)
+
+    base = [(0, 1 + i, 1, 0) for i in range(n_p)]
+    choice_edges = []
+    for i, (uid, choices, seated) in enumerate(players):
+        for rank, c in enumerate(choices):
+            if c in pair_id:
+                choice_edges.append((i, c))
+                base.append((1 + i, pair_id[c], 1, rank - fill - (keep if seated else 0)))
+    tail = [(role_id[r], sink, role_caps[r], 0) for r in roles]
+
+    best, seen = None, set()
+    for split in _product_splits(boons, boon_roles, boon_caps):
+        caps = {}
+        for boon, shares in zip(boons, split):
+            for role, share in zip(boon_roles[boon], shares):
+                caps[(role, boon)] = min(share, role_caps[role])
+        key = tuple(sorted(caps.items()))
+        if key in seen:
+            continue
+        seen.add(key)
+        mid   = [(pair_id[c], role_id[c[0]], caps.get(c, slots), 0) for c in pairs]
+        edges = base + mid + tail
+        flow  = _min_cost_flow(sink + 1, edges, 0, sink)
+        total = sum(f * e[3] for f, e in zip(flow, edges))
+        if best is None or total < best[0]:
+            picked = {players[i][0]: c for (i, c), f in zip(choice_edges, flow[n_p:]) if f}
+            best = (total, picked)
+    return best[1]
+
+
+def _product_splits(boons: list, boon_roles: dict, boon_caps: dict):
+    if not boons:
+        yield ()
+        return
+    boon, rest = boons[0], boons[1:]
+    for shares in _splits(max(boon_caps.get(boon, 0), 0), len(boon_roles[boon])):
+        for tail in _product_splits(rest, boon_roles, boon_caps):
+            yield (shares,) + tail
+
+
+def _assign_specials(players: list, caps: dict) -> dict:
+    """Match placed players [(uid, [special, ...], current)] to special slots. Returns {uid: special}."""
+    specials = [s for s, c in caps.items() if c > 0]
+    if not players or not specials:
+        return {}
+    slots = sum(caps[s] for s in specials)
+    keep  = len(specials) * slots + 1
+    fill  = keep * (slots + 1)
+    sid   = {s: 1 + len(players) + i for i, s in enumerate(specials)}
+    sink  = 1 + len(players) + len(specials)
+    edges, picks = [], []
+    for i, (uid, wanted, current) in enumerate(players):
+        edges.append((0, 1 + i, 1, 0))
+        for rank, s in enumerate(w for w in wanted if w in sid):
+            picks.append((len(edges), uid, s))
+            edges.append((1 + i, sid[s], 1, rank - fill - (keep if s == current else 0)))
+    edges += [(sid[s], sink, caps[s], 0) for s in specials]
+    flow = _min_cost_flow(sink + 1, edges, 0, sink)
+    return {uid: s for e, uid, s in picks if flow[e]}
+
+
+_flex_signatures = {}   # (guild_id, event_id) -> inputs of the last solve, so unrelated clicks skip it
+
+
+def _flex_signature(caps: tuple, flex: dict, participants: dict) -> str:
+    return repr((caps,
+                 sorted((u, f['choices'], f['specials']) for u, f in flex.items()),
+                 sorted((u, p['role'], p['boon'], p['special_role'])
+                        for u, p in participants.items() if p.get('flex'))))
+
+
+def _place_flex(event_id: str, event: dict) -> list:
+    """Re-solve where flexible signups sit on the roster. Returns the uids newly placed.
+
+    Incremental in two ways: the solve is skipped when none of its inputs changed since the
+    last one, and players already seated are only moved off the roster if that fills more slots.
+    """
+    participants = event['participants']
+    flex         = event.get('flex', {})
+    fixed        = [p for p in participants.values() if not p.get('flex')]
+    if not flex and len(fixed) == len(participants):
+        return []
+
+    def remaining(limits: dict, field: str) -> dict:
+        return {k: max(v - sum(1 for p in fixed if p.get(field) == k), 0) for k, v in limits.items()}
+
+    role_caps = remaining(event['role_limits'], 'role')
+    boon_caps = remaining(event.get('boon_limits', {}), 'boon')
+    spec_caps = remaining(event.get('special_role_limits', {}), 'special_role')
+    caps      = (sorted(role_caps.items()), sorted(boon_caps.items()), sorted(spec_caps.items()))
+    key = (_current_guild.get(), event_id)
+    if _flex_signatures.get(key) == _flex_signature(caps, flex, participants):
+        return []
+
+    seated   = {u: p for u, p in participants.items() if p.get('flex')}
+    players  = [(u, [tuple(c) for c in f['choices']], u in seated)
+                for u, f in sorted(flex.items(), key=lambda item: item[1]['joined'])
+                if u in seated or u not in participants]
+    placed   = _assign_flex(players, role_caps, boon_caps)
+    specials = _assign_specials(
+        [(u, flex[u]['specials'], seated.get(u, {}).get('special_role')) for u in placed], spec_caps
+    )
+
+    for uid in seated:
+        del participants[uid]
+    for uid, (role, boon) in placed.items():
+        participants[uid] = Participant(name=flex[uid]['name'], role=role, boon=boon,
+                                        special_role=specials.get(uid), flex=True)
+    _flex_signatures[key] = _flex_signature(caps, flex, participants)
+    return [uid for uid in placed if uid not in seated]
+
+
+# --- Roster changes + waitlist ---
+#
+# Waitlists live on the event as event['waitlist'] = {"<role>/<boon or ->": {uid: entry}}.
+# Each queue is an insertion-ordered dict, so its head is next(iter(queue)) and removal
+# is O(1). Everyone in one queue wants the same role/boon, so only the heads need checking
+# when a slot frees up.
+
+def _waitlist_key(role: str, boon) -> str:
+    return f"{role}/{boon or '-'}"
+
+
+def _join_waitlist(event: dict, uid: str, name: str, role: str, boon, ahead: bool = False) -> int:
+    """Queue uid for role/boon (replacing any earlier place). Returns their 1-based position.
+
+    `ahead` puts them at the head of the queue instead, for someone who just lost a slot.
+    """
+    _leave_waitlist(event, uid)
+    queue = event.setdefault('waitlist', {}).setdefault(_waitlist_key(role, boon), {})
+    entry = {'name': name, 'role': role, 'boon': boon, 'joined': time.time()}
+    if ahead and queue:
+        entry['joined'] = min(entry['joined'], next(iter(queue.values()))['joined'])
+        rest = list(queue.items())
+        queue.clear()
+        queue[uid] = entry
+        queue.update(rest)
+    else:
+        queue[uid] = entry
+    signup_log.info("Joined waitlist", extra={'target_user': uid, 'role': role, 'boon': boon, 'position': len(queue)})
+    return len(queue)
+
+
+def _leave_waitlist(event: dict, uid: str) -> bool:
+    waitlist = event.get('waitlist', {})
+    for key, queue in waitlist.items():
+        if queue.pop(uid, None) is not None:
+            if not queue:
+                del waitlist[key]
+            return True
+    return False
+
+
+def _waitlist_entries(event: dict) -> list:
+    """All (uid, entry) waiting on this event, oldest first."""
+    entries = [item for queue in event.get('waitlist', {}).values() for item in queue.items()]
+    return sorted(entries, key=lambda item: item[1]['joined'])
+
+
+def _promote_waitlist(event: dict) -> list:
+    """Move waiters onto the roster while their role/boon has room. Returns promoted uids.
+
+    Among the queue heads that fit, the one who has waited longest goes first.
+    """
+    waitlist = event.get('waitlist', {})
+    promoted = []
+    while waitlist:
+        best = None
+        for key, queue in waitlist.items():
+            uid, entry = next(iter(queue.items()))
+            if _slot_problem(event, uid, entry['role'], entry['boon']) is not None:
+                continue
+            if best is None or entry['joined'] < best[2]['joined']:
+                best = (key, uid, entry)
+        if best is None:
+            break
+        key, uid, entry = best
+        del waitlist[key][uid]
+        if not waitlist[key]:
+            del waitlist[key]
+        event['participants'][uid] = Participant(
+            name=entry['name'], role=entry['role'], boon=entry['boon'], special_role=None
+        )
+        promoted.append(uid)
+    return promoted
+
+
+signup_log = logging.getLogger('kds.signup')   # one record per roster change: sampled (LOG_SAMPLING)
+
+
+def _set_participant(event_id: str, event: dict, uid: str, name: str, role: str,
+                     boon=None, special_role=None) -> list:
+    """Put uid on the roster (replacing an earlier signup) and fill any slot that freed up.
+
+    Returns the uids moved onto the roster; pass them to _announce_promotions once saved.
+    """
+    event['participants'][uid] = Participant(name=name, role=role, boon=boon, special_role=special_role)
+    signup_log.info("Signed up", extra={'event_id': event_id, 'target_user': uid, 'role': role,
+                                        'boon': boon, 'special_role': special_role})
+    _leave_waitlist(event, uid)
+    event.get('flex', {}).pop(uid, None)
+    return _rebalance(event_id, event)
+
+
+def _remove_participant(event_id: str, event: dict, uid: str) -> list:
+    """Take uid off the roster and promote waiters into the freed slot. Returns promoted uids."""
+    del event['participants'][uid]
+    signup_log.info("Left roster", extra={'event_id': event_id, 'target_user': uid})
+    event.get('flex', {}).pop(uid, None)
+    return _rebalance(event_id, event)
+
+
+def _rebalance(event_id: str, event: dict) -> list:
+    """Re-place flexible signups, then fill what's left from the waitlist. Returns uids moved onto the roster."""
+    moved = _place_flex(event_id, event) + _promote_waitlist(event)
+    store.event_index.update(event_id, event)
+    return moved
+
+
+def _refit_roster(event_id: str, event: dict) -> tuple:
+    """Bring the roster back within the event's limits after they (or open signup) changed.
+
+    With open signup nobody is capped, so everyone waiting or flexible joins as an Attendee.
+    Otherwise fixed signups are kept in roster order up to each role and boon limit and the
+    rest go to the head of their waitlist; Attendees have no role to wait for and are taken
+    off; special roles over their new cap are cleared. Officer-added Fillers stay.
+    Returns (promoted uids, {uid: what happened to them}), for _announce_promotions and
+    _announce_roster_changes once saved.
+    """
+    participants = event['participants']
+    changed      = {}
+    if event.get('open_signup'):
+        joining = _waitlist_entries(event) + [(u, f) for u, f in event.get('flex', {}).items() if u not in participants]
+        for uid, entry in joining:
+            participants[uid] = Participant(name=entry['name'], role='Attendee', boon=None, special_role=None)
+        for p in participants.values():
+            p.pop('flex', None)   # no solver runs for an open signup; the seat is theirs
+        event['waitlist'], event['flex'] = {}, {}
+        store.event_index.update(event_id, event)
+        return [uid for uid, _ in joining], changed
+
+    seated_flex = {u for u, p in participants.items() if p.get('flex')}
+    roles, boons, specials = {}, {}, {}
+    for uid, p in list(participants.items()):
+        role, boon = p['role'], p.get('boon')
+        if p.get('flex') or role == 'Filler':
+            continue
+        if role not in event['role_limits']:
+            del participants[uid]
+            changed[uid] = "taken off the roster: it now signs up by role, so please register again"
+            continue
+        if (roles.get(role, 0) >= event['role_limits'][role]
+                or boon and boons.get(boon, 0) >= event.get('boon_limits', {}).get(boon, 0)):
+            del participants[uid]
+            _join_waitlist(event, uid, p['name'], role, boon, ahead=True)
+            changed[uid] = f"moved to the front of the {role}{f' [{boon}]' if boon else ''} waitlist"
+            continue
+        roles[role] = roles.get(role, 0) + 1
+        if boon:
+            boons[boon] = boons.get(boon, 0) + 1
+        special = p.get('special_role')
+        if special:
+            if specials.get(special, 0) >= event.get('special_role_limits', {}).get(special, 0):
+                p['special_role'] = None
+                changed[uid] = f"kept on the roster, but no longer on {special}"
+            else:
+                specials[special] = specials.get(special, 0) + 1
+    if changed:
+        signup_log.info("Roster refitted", extra={'event_id': event_id, 'changed': len(changed)})
+
+    promoted = _rebalance(event_id, event)
+    for uid in seated_flex - set(participants):
+        changed[uid] = "moved back to the flexible pool until one of your choices has room"
+    return [u for u in promoted if u not in changed], changed
+
+
+def _announce_roster_changes(event_id: str, event: dict, changed: dict) -> None:
+    for uid, what in changed.items():
+        _spawn(_dm_roster_change(event_id, event, uid, what))
+
+
+async def _dm_roster_change(event_id: str, event: dict, uid: str, what: str) -> None:
+    try:
+        user = await bot.fetch_user(int(uid))
+        await user.send(
+            f"⚠️ The slots for **{event['name']}** (ID: {event_id}) on "
+            f"{unix_to_discord_ts(event['unix_ts'], 'F')} changed, and you were {what}."
+        )
+    except discord.HTTPException as e:
+        log.warning("Could not DM roster change", extra={'target_user': uid, 'event_id': event_id, 'reason': str(e)})
+
+
+def _announce_promotions(event_id: str, event: dict, promoted: list) -> None:
+    for uid in promoted:
+        _spawn(_dm_promoted(event_id, event, uid))
+
+
+async def _dm_promoted(event_id: str, event: dict, uid: str) -> None:
+    p        = event['participants'].get(uid)
+    boon_txt = f" [{p['boon']}]" if p and p.get('boon') else ""
+    try:
+        user = await bot.fetch_user(int(uid))
+        await user.send(
+            f"🎉 A slot opened up! You're now on the roster for **{event['name']}** "
+            f"(ID: {event_id}) as **{p['role'] if p else '?'}{boon_txt}** — "
+            f"{unix_to_discord_ts(event['unix_ts'], 'F')}."
+        )
+    except discord.HTTPException as e:
+        log.warning("Could not DM promoted player", extra={'target_user': uid, 'event_id': event_id, 'reason': str(e)})
+
+
+class EventView(GuildView):
     """Persistent public signup view attached to the event embed."""
-    def __init__(self, event_id: str):
+    def __init__(self, event_id: str, grouped: bool = False):
         super().__init__(timeout=None)
         self.event_id = event_id
+        if not grouped:
+            self.remove_item(self.register_night)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if not await super().interaction_check(interaction):
+            return False
+        verdict = _click_verdict(interaction.user.id, interaction.guild_id, self.event_id,
+                                 interaction.data.get('custom_id', ''))
+        if verdict == 'dedupe':
+            await interaction.response.send_message("⏳ Already on it — that click was just handled.", ephemeral=True)
+        elif verdict == 'throttle':
+            await interaction.response.send_message("🐢 Slow down — try again in a few seconds.", ephemeral=True)
+        if verdict != 'ok':
+            signup_log.info("Click absorbed", extra={'verdict': verdict})
+        return verdict == 'ok'
 
     @discord.ui.button(label="Register", style=discord.ButtonStyle.green, emoji="✅")
     async def register(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -268,13 +2185,10 @@ class EventView(discord.ui.View):
             return
         if event.get('open_signup'):
             uid = str(interaction.user.id)
-            event['participants'][uid] = {
-                'name': interaction.user.display_name,
-                'role': 'Attendee', 'boon': None, 'special_role': None
-            }
+            _set_participant(self.event_id, event, uid, interaction.user.display_name, 'Attendee')
             save_data(data)
             await interaction.response.send_message("✅ You're signed up!", ephemeral=True)
-            await _refresh_event_embed(event, self.event_id)
+            _schedule_embed_refresh(self.event_id)
             return
         await interaction.response.send_message(
             "**Select your role:**",
@@ -290,18 +2204,63 @@ class EventView(discord.ui.View):
             await interaction.response.send_message("❌ Event not found.", ephemeral=True)
             return
         uid = str(interaction.user.id)
-        if uid not in event.get('participants', {}):
+        if uid in event.get('participants', {}):
+            promoted = _remove_participant(self.event_id, event, uid)
+            save_data(data)
+            await interaction.response.send_message("✅ You've left the event.", ephemeral=True)
+            _announce_promotions(self.event_id, event, promoted)
+        elif event.get('flex', {}).pop(uid, None):
+            signup_log.info("Withdrew flexible signup", extra={'event_id': self.event_id, 'target_user': uid})
+            promoted = _rebalance(self.event_id, event)
+            save_data(data)
+            await interaction.response.send_message("✅ Your flexible signup was withdrawn.", ephemeral=True)
+            _announce_promotions(self.event_id, event, promoted)
+        elif _leave_waitlist(event, uid):
+            save_data(data)
+            await interaction.response.send_message("✅ You've left the waitlist.", ephemeral=True)
+        else:
             await interaction.response.send_message("You're not signed up for this event.", ephemeral=True)
             return
-        del event['participants'][uid]
-        save_data(data)
-        await interaction.response.send_message("✅ You've left the event.", ephemeral=True)
-        await _refresh_event_embed(event, self.event_id)
+        _schedule_embed_refresh(self.event_id)
+
+    @discord.ui.button(label="Flexible", style=discord.ButtonStyle.grey, emoji="🔀")
+    async def register_flex(self, interaction: discord.Interaction, button: discord.ui.Button):
+        data  = load_data()
+        event = data['events'].get(self.event_id)
+        if not event or event['status'] != 'open':
+            await interaction.response.send_message("❌ This event is closed.", ephemeral=True)
+            return
+        if event.get('open_signup'):
+            await interaction.response.send_message("This event has open signup — just click **Register**.", ephemeral=True)
+            return
+        await interaction.response.send_message(
+            "**Rank the roles you can play.** You'll be placed wherever the group needs you most, "
+            "as close to your 1st choice as possible:",
+            view=FlexSignupView(self.event_id, event, str(interaction.user.id)),
+            ephemeral=True
+        )
+
+    @discord.ui.button(label="Sign up for whole night", style=discord.ButtonStyle.blurple, emoji="🌙")
+    async def register_night(self, interaction: discord.Interaction, button: discord.ui.Button):
+        data  = load_data()
+        event = data['events'].get(self.event_id)
+        if not event or not event.get('group_id'):
+            await interaction.response.send_message("❌ This event isn't part of a wing night.", ephemeral=True)
+            return
+        events = _night_events(data, event['group_id'])
+        if not events:
+            await interaction.response.send_message("❌ This wing night is closed.", ephemeral=True)
+            return
+        await interaction.response.send_message(
+            f"**Select your role for all {len(events)} events tonight:**",
+            view=NightRoleSelectView(event['group_id'], events),
+            ephemeral=True
+        )
 
 
 # --- Role select ---
 
-class RoleSelectView(discord.ui.View):
+class RoleSelectView(GuildView):
     def __init__(self, event_id: str, event: dict):
         super().__init__(timeout=120)
         self.add_item(RoleSelect(event_id, event))
@@ -318,59 +2277,77 @@ class RoleSelect(discord.ui.Select):
                 continue
             count     = sum(1 for p in participants.values() if p['role'] == role)
             available = limit - count
-            options.append(discord.SelectOption(
-                label=f"{role} ({available} left)",
-                value=role,
-                emoji=ROLE_EMOJIS[role]
-            ))
+            if available > 0:
+                options.append(discord.SelectOption(
+                    label=f"{role} ({available} left)",
+                    value=role,
+                    emoji=ROLE_EMOJIS[role]
+                ))
+            else:
+                waiting = sum(len(q) for k, q in event.get('waitlist', {}).items() if k.startswith(f"{role}/"))
+                options.append(discord.SelectOption(
+                    label=f"{role} (FULL — join waitlist)",
+                    value=f"WAIT_{role}",
+                    emoji=ROLE_EMOJIS[role],
+                    description=f"You'll be moved in automatically when a slot frees up ({waiting} waiting)"
+                ))
         super().__init__(placeholder="Choose your role...", options=options)
 
     async def callback(self, interaction: discord.Interaction):
-        role = self.values[0]
+        value = self.values[0]
+        role  = value.removeprefix("WAIT_")
         data  = load_data()
         event = data['events'].get(self.event_id)
         if not event:
             await interaction.response.edit_message(content="❌ Event not found.", view=None)
             return
 
-        # Re-check slot availability (could have filled since view was shown)
-        count = sum(1 for p in event['participants'].values() if p['role'] == role)
-        if count >= event['role_limits'].get(role, 0):
+        # Re-check slot availability (could have filled — or freed — since view was shown)
+        uid  = str(interaction.user.id)
+        full = _slot_problem(event, uid, role, None) is not None
+        if full and not value.startswith("WAIT_"):
             await interaction.response.edit_message(
-                content=f"❌ **{role}** is now full. Please choose a different role.",
+                content=f"❌ **{role}** is now full. Choose a different role or join the waitlist.",
                 view=RoleSelectView(self.event_id, event)
             )
             return
 
         if role == 'Tank':
-            # Tanks have no boon — sign up immediately
-            uid = str(interaction.user.id)
-            event['participants'][uid] = {
-                'name': interaction.user.display_name,
-                'role': 'Tank', 'boon': None, 'special_role': None
-            }
+            # Tanks have no boon — sign up (or queue) immediately
+            if full:
+                pos = _join_waitlist(event, uid, interaction.user.display_name, 'Tank', None)
+                save_data(data)
+                await interaction.response.edit_message(
+                    content=f"⏳ **Tank** is full — you're #{pos} on the waitlist.", view=None
+                )
+                _schedule_embed_refresh(self.event_id)
+                return
+            promoted = _set_participant(self.event_id, event, uid, interaction.user.display_name, 'Tank')
             save_data(data)
             await interaction.response.edit_message(content="✅ Signed up as **Tank**!", view=None)
-            await _refresh_event_embed(event, self.event_id)
+            _announce_promotions(self.event_id, event, promoted)
+            _schedule_embed_refresh(self.event_id)
         else:
+            prompt = "Pick the boon you'd play when a slot frees up:" if full else "Now pick your boon:"
             await interaction.response.edit_message(
-                content=f"**{role}** selected. Now pick your boon:",
-                view=BoonSelectView(self.event_id, role, event)
+                content=f"**{role}** selected. {prompt}",
+                view=BoonSelectView(self.event_id, role, event, waitlist=full)
             )
 
 
 # --- Boon select ---
 
-class BoonSelectView(discord.ui.View):
-    def __init__(self, event_id: str, role: str, event: dict):
+class BoonSelectView(GuildView):
+    def __init__(self, event_id: str, role: str, event: dict, waitlist: bool = False):
         super().__init__(timeout=120)
-        self.add_item(BoonSelect(event_id, role, event))
+        self.add_item(BoonSelect(event_id, role, event, waitlist))
 
 
 class BoonSelect(discord.ui.Select):
-    def __init__(self, event_id: str, role: str, event: dict):
+    def __init__(self, event_id: str, role: str, event: dict, waitlist: bool = False):
         self.event_id = event_id
         self.role     = role
+        self.waitlist = waitlist   # the role itself is full: whatever is picked goes on the waitlist
         participants  = event.get('participants', {})
         boon_limits   = event.get('boon_limits', {})
 
@@ -383,37 +2360,41 @@ class BoonSelect(discord.ui.Select):
                 continue  # Condi is a DPS-only boon (Vale Guardian)
             filled    = sum(1 for p in participants.values() if p.get('boon') == boon)
             available = cap - filled
-            if available > 0:
-                options.append(discord.SelectOption(label=f"{boon} ({available} left)", value=boon))
+            if available > 0 or waitlist:
+                options.append(discord.SelectOption(label=f"{boon} ({max(available, 0)} left)", value=boon))
             else:
-                # Show as full so the player knows — selecting it triggers a soft error
+                # Full boon: picking it queues the player for that boon
                 options.append(discord.SelectOption(
-                    label=f"{boon} (FULL)", value=f"FULL_{boon}", description="This boon slot is full"
+                    label=f"{boon} (FULL — join waitlist)", value=f"FULL_{boon}",
+                    description="You'll be moved in automatically when this boon frees up"
                 ))
         options.append(discord.SelectOption(label="None", value="None", emoji="➖"))
         super().__init__(placeholder="Choose your boon...", options=options)
 
     async def callback(self, interaction: discord.Interaction):
         value = self.values[0]
-        if value.startswith("FULL_"):
-            data  = load_data()
-            event = data['events'].get(self.event_id)
-            await interaction.response.edit_message(
-                content="❌ That boon is full. Please choose a different one.",
-                view=BoonSelectView(self.event_id, self.role, event)
-            )
-            return
-
-        boon  = None if value == "None" else value
+        boon  = None if value == "None" else value.removeprefix("FULL_")
         data  = load_data()
         event = data['events'].get(self.event_id)
         if not event:
             await interaction.response.edit_message(content="❌ Event not found.", view=None)
             return
 
-        special_limits = event.get('special_role_limits', {})
-        has_special    = any(v > 0 for v in special_limits.values())
-
+        uid      = str(interaction.user.id)
+        boon_txt = f" [{boon}]" if boon else ""
+        if _slot_problem(event, uid, self.role, boon) is not None:
+            # Role or boon is (now) full — queue for exactly this combination
+            pos = _join_waitlist(event, uid, interaction.user.display_name, self.role, boon)
+            save_data(data)
+            await interaction.response.edit_message(
+                content=f"⏳ **{self.role}{boon_txt}** is full — you're #{pos} on the waitlist.", view=None
+            )
+            _schedule_embed_refresh(self.event_id)
+            return
+
+        special_limits = event.get('special_role_limits', {})
+        has_special    = any(v > 0 for v in special_limits.values())
+
         if has_special:
             boon_txt = f" [{boon}]" if boon else ""
             await interaction.response.edit_message(
@@ -421,22 +2402,18 @@ class BoonSelect(discord.ui.Select):
                 view=SpecialRoleSelectView(self.event_id, self.role, boon, event)
             )
         else:
-            uid = str(interaction.user.id)
-            event['participants'][uid] = {
-                'name': interaction.user.display_name,
-                'role': self.role, 'boon': boon, 'special_role': None
-            }
+            promoted = _set_participant(self.event_id, event, uid, interaction.user.display_name, self.role, boon)
             save_data(data)
-            boon_txt = f" [{boon}]" if boon else ""
             await interaction.response.edit_message(
                 content=f"✅ Signed up as **{self.role}{boon_txt}**!", view=None
             )
-            await _refresh_event_embed(event, self.event_id)
+            _announce_promotions(self.event_id, event, promoted)
+            _schedule_embed_refresh(self.event_id)
 
 
 # --- Special role select ---
 
-class SpecialRoleSelectView(discord.ui.View):
+class SpecialRoleSelectView(GuildView):
     def __init__(self, event_id: str, role: str, boon, event: dict):
         super().__init__(timeout=120)
         self.add_item(SpecialRoleSelect(event_id, role, boon, event))
@@ -482,11 +2459,10 @@ class SpecialRoleSelect(discord.ui.Select):
             await interaction.response.edit_message(content="❌ Event not found.", view=None)
             return
 
-        uid = str(interaction.user.id)
-        event['participants'][uid] = {
-            'name': interaction.user.display_name,
-            'role': self.role, 'boon': self.boon, 'special_role': special_role
-        }
+        uid      = str(interaction.user.id)
+        promoted = _set_participant(
+            self.event_id, event, uid, interaction.user.display_name, self.role, self.boon, special_role
+        )
         save_data(data)
 
         boon_txt    = f" [{self.boon}]" if self.boon else ""
@@ -494,252 +2470,376 @@ class SpecialRoleSelect(discord.ui.Select):
         await interaction.response.edit_message(
             content=f"✅ Signed up as **{self.role}{boon_txt}{special_txt}**!", view=None
         )
-        await _refresh_event_embed(event, self.event_id)
+        _announce_promotions(self.event_id, event, promoted)
+        _schedule_embed_refresh(self.event_id)
 
-# ---------------------------------------------------------------------------
-# Bot setup
-# ---------------------------------------------------------------------------
 
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+# --- Flexible signup: ranked choices placed by the composition solver ---
 
-# ---------------------------------------------------------------------------
-# Event creation — /create_event
-# ---------------------------------------------------------------------------
+ORDINALS = ["1st", "2nd", "3rd"]
 
-@bot.tree.command(name="create_event", description="Create a new event (officers only)")
-async def create_event(interaction: discord.Interaction):
-    await interaction.response.send_modal(EventSetupModal())
 
+def _flex_combos(event: dict) -> list:
+    """(role, boon) combos this event has slots for, in display order."""
+    combos = []
+    for role in ['Tank', 'Heal', 'DPS']:
+        if event['role_limits'].get(role, 0) == 0:
+            continue
+        for boon in _night_boons([(None, event)], role):
+            if event.get('boon_limits', {}).get(boon, 0):
+                combos.append((role, boon))
+        combos.append((role, None))
+    return combos
 
-class EventSetupModal(discord.ui.Modal, title='Create Event'):
-    event_name = discord.ui.TextInput(
-        label='Event Name',
-        placeholder='e.g. Tuesday Raid Night',
-        max_length=100
-    )
-    description = discord.ui.TextInput(
-        label='Description',
-        placeholder='Optional details...',
-        style=discord.TextStyle.paragraph,
-        required=False,
-        max_length=500
-    )
-    event_time = discord.ui.TextInput(
-        label='Date & Time (your local time)',
-        placeholder='YYYY-MM-DD HH:MM  (e.g. 2026-03-20 20:00)',
-        max_length=16
-    )
-    timezone = discord.ui.TextInput(
-        label='Your UTC offset',
-        placeholder='e.g. UTC+1  UTC-5  UTC+5:30  UTC (for no offset)',
-        default='UTC',
-        max_length=10
-    )
 
-    async def on_submit(self, interaction: discord.Interaction):
-        try:
-            local_dt = datetime.strptime(self.event_time.value.strip(), "%Y-%m-%d %H:%M")
-        except ValueError:
-            await interaction.response.send_message(
-                "❌ Invalid time format. Use: YYYY-MM-DD HH:MM", ephemeral=True
-            )
+class FlexSignupView(GuildView):
+    """Ephemeral form: up to FLEX_MAX_CHOICES ranked role/boon picks, any special roles, then submit."""
+    def __init__(self, event_id: str, event: dict, uid: str):
+        super().__init__(timeout=300)
+        self.event_id = event_id
+        previous      = event.get('flex', {}).get(uid, {})
+        self.choices  = [tuple(c) for c in previous.get('choices', [])]
+        self.choices += [None] * (FLEX_MAX_CHOICES - len(self.choices))
+        self.specials = list(previous.get('specials', []))
+
+        combos = _flex_combos(event)
+        for rank in range(FLEX_MAX_CHOICES):
+            self.add_item(FlexChoiceSelect(rank, combos, self.choices[rank]))
+        specials = [s for s, limit in event.get('special_role_limits', {}).items() if limit > 0]
+        if specials:
+            self.add_item(FlexSpecialSelect(specials, self.specials))
+
+    @discord.ui.button(label="Submit", style=discord.ButtonStyle.green, emoji="🔀", row=4)
+    async def submit(self, interaction: discord.Interaction, button: discord.ui.Button):
+        choices = []
+        for c in self.choices:
+            if c and c not in choices:
+                choices.append(c)
+        if not choices:
+            await interaction.response.send_message("❌ Pick at least your 1st choice.", ephemeral=True)
             return
 
-        try:
-            offset  = parse_utc_offset(self.timezone.value)
-            # Convert local time to UTC by subtracting the offset
-            # e.g. 20:00 UTC+1 → 19:00 UTC
-            utc_dt  = local_dt - offset
-            unix_ts = dt_to_unix(utc_dt)
-        except ValueError:
-            await interaction.response.send_message(
-                "❌ Invalid UTC offset. Use format: UTC+1, UTC-5, UTC+5:30, or UTC.", ephemeral=True
-            )
+        data  = load_data()
+        event = data['events'].get(self.event_id)
+        if not event or event['status'] != 'open':
+            await interaction.response.edit_message(content="❌ This event is closed.", view=None)
             return
 
-        temp = {
-            'name':        self.event_name.value.strip(),
-            'description': self.description.value.strip(),
-            'unix_ts':     unix_ts,     # stored as UTC Unix timestamp
-            'channel_id':  interaction.channel.id,
+        uid = str(interaction.user.id)
+        event['participants'].pop(uid, None)          # a flexible signup replaces a fixed one
+        _leave_waitlist(event, uid)
+        previous = event.setdefault('flex', {}).get(uid, {})
+        event['flex'][uid] = {
+            'name':     interaction.user.display_name,
+            'choices':  [list(c) for c in choices],
+            'specials': self.specials,
+            'joined':   previous.get('joined', time.time()),
         }
-        embed = _creation_embed(temp, "Step 2 of 4: Select Wing")
-        await interaction.response.send_message(embed=embed, view=WingSelectView(temp), ephemeral=True)
-
+        signup_log.info("Flexible signup", extra={'event_id': self.event_id, 'target_user': uid,
+                                                  'choices': len(choices), 'specials': self.specials})
+        promoted = [u for u in _rebalance(self.event_id, event) if u != uid]
+        save_data(data)
 
-class WingSelectView(discord.ui.View):
-    def __init__(self, temp: dict):
-        super().__init__(timeout=300)
-        self.add_item(WingSelect(temp))
+        p = event['participants'].get(uid)
+        if p:
+            boon_txt    = f" [{p['boon']}]" if p.get('boon') else ""
+            special_txt = f" — {p['special_role']}" if p.get('special_role') else ""
+            content = (f"✅ Flexible signup saved — you're currently placed as **{p['role']}{boon_txt}{special_txt}**. "
+                       f"This may change as others sign up.")
+        else:
+            content = ("⏳ Flexible signup saved. None of your choices has room right now — "
+                       "you'll be placed automatically when one does.")
+        await interaction.response.edit_message(content=content, view=None)
+        _announce_promotions(self.event_id, event, promoted)
+        _schedule_embed_refresh(self.event_id)
 
 
-class WingSelect(discord.ui.Select):
-    def __init__(self, temp: dict):
-        self.temp = temp
+class FlexChoiceSelect(discord.ui.Select):
+    def __init__(self, rank: int, combos: list, current):
+        self.rank = rank
         options = [
-            discord.SelectOption(label="W1 - Spirit Vale",                emoji="⚔️"),
-            discord.SelectOption(label="W2 - Salvation Pass",             emoji="⚔️"),
-            discord.SelectOption(label="W3 - Stronghold of the Faithful", emoji="⚔️"),
-            discord.SelectOption(label="W4 - Bastion of the Penitent",    emoji="⚔️"),
-            discord.SelectOption(label="W5 - Hall of Chains",             emoji="⚔️"),
-            discord.SelectOption(label="W6 - Mythwright Gambit",          emoji="⚔️"),
-            discord.SelectOption(label="W7 - Key of Ahdashim",            emoji="⚔️"),
-            discord.SelectOption(label="Fractals",                        emoji="🌀"),
-            discord.SelectOption(label="Guild Missions",                  emoji="🏰"),
-            discord.SelectOption(label="Hang Out / Other Games",          emoji="🎉"),
-            discord.SelectOption(label="Other",                           emoji="🎮"),
+            discord.SelectOption(
+                label=f"{role} — {boon}" if boon else role,
+                value=_waitlist_key(role, boon),
+                emoji=ROLE_EMOJIS[role],
+                default=(role, boon) == current,
+            )
+            for role, boon in combos
         ]
-        super().__init__(placeholder="Select event type...", options=options)
+        optional = "" if rank == 0 else " (optional)"
+        super().__init__(placeholder=f"{ORDINALS[rank]} choice{optional}...", options=options,
+                         min_values=0 if rank else 1, row=rank)
 
     async def callback(self, interaction: discord.Interaction):
-        selected = self.values[0]
-        self.temp['wing'] = selected
-
-        if selected == "Fractals":
-            self.temp['type'] = 'fractal'
-            self.temp['boss'] = 'Fractals'
-            self.temp['role_limits'] = {'Tank': 0, 'Heal': 1, 'DPS': 4}
-            self.temp['boon_limits'] = {'Alacrity': 1, 'Quickness': 1}
-            self.temp['special_role_limits'] = {}
-            embed = _role_review_embed(self.temp)
-            await interaction.response.edit_message(embed=embed, view=RoleReviewView(self.temp))
-        elif selected in ("Guild Missions", "Hang Out / Other Games"):
-            self.temp['type'] = 'guild_mission' if selected == "Guild Missions" else 'social'
-            self.temp['boss'] = None
-            self.temp['open_signup'] = True
-            self.temp['role_limits'] = {}
-            self.temp['boon_limits'] = {}
-            self.temp['special_role_limits'] = {}
-            embed = _creation_embed(self.temp, "Step 3 of 3: Confirm & Post")
-            await interaction.response.edit_message(embed=embed, view=RoleReviewView(self.temp))
-        elif selected == "Other":
-            self.temp['type'] = 'normal'
-            self.temp['boss'] = None
-            embed = _creation_embed(self.temp, "Step 3 of 4: Set Role Slots")
-            await interaction.response.edit_message(embed=embed, view=OtherRolesView(self.temp))
+        if self.values:
+            role, boon = self.values[0].split("/")
+            self.view.choices[self.rank] = (role, None if boon == '-' else boon)
         else:
-            self.temp['type'] = 'raid'
-            bosses = WING_BOSSES[selected]
-            embed = _creation_embed(self.temp, f"Step 3 of 4: Select Boss ({selected})")
-            await interaction.response.edit_message(embed=embed, view=BossSelectView(self.temp, bosses))
+            self.view.choices[self.rank] = None
+        await interaction.response.defer()
 
 
-class BossSelectView(discord.ui.View):
-    def __init__(self, temp: dict, bosses: list):
-        super().__init__(timeout=300)
-        self.add_item(BossSelect(temp, bosses))
+class FlexSpecialSelect(discord.ui.Select):
+    def __init__(self, specials: list, current: list):
+        options = [discord.SelectOption(label=s, value=s, default=s in current) for s in specials]
+        super().__init__(placeholder="Special roles you'd take (optional)...", options=options,
+                         min_values=0, max_values=len(options), row=3)
 
+    async def callback(self, interaction: discord.Interaction):
+        self.view.specials = list(self.values)
+        await interaction.response.defer()
 
-class BossSelect(discord.ui.Select):
-    def __init__(self, temp: dict, bosses: list):
-        self.temp = temp
-        options = [discord.SelectOption(label=b) for b in bosses]
-        super().__init__(placeholder="Select a boss...", options=options)
 
-    async def callback(self, interaction: discord.Interaction):
-        boss = self.values[0]
-        self.temp['boss'] = boss
-        tmpl = BOSS_TEMPLATES[boss]
+# --- Whole-night signup: one role/boon choice applied to every event in a wing night ---
 
-        # Pull slot counts and boon limits directly from the template
-        self.temp['role_limits'] = {
-            'Tank': tmpl['Tank'],
-            'Heal': tmpl['Heal'],
-            'DPS':  tmpl['DPS'],
-        }
-        self.temp['boon_limits']        = dict(tmpl['boon_limits'])
-        self.temp['special_role_limits'] = dict(tmpl['special'])
+def _night_events(data: dict, group_id: str) -> list:
+    """Open (eid, event) pairs of a wing night, in start order."""
+    eids = store.event_index.by_group.get(group_id, ())
+    pairs = [(eid, data['events'][eid]) for eid in eids if data['events'][eid]['status'] == 'open']
+    return sorted(pairs, key=lambda p: p[1]['unix_ts'])
 
-        embed = _role_review_embed(self.temp)
-        await interaction.response.edit_message(embed=embed, view=RoleReviewView(self.temp))
 
+def _slot_problem(event: dict, uid: str, role: str, boon) -> str:
+    """Why uid can't take role/boon in this event, or None if there's room.
 
-# ---------------------------------------------------------------------------
-# Other (non-raid) path — manual role slot entry
-# ---------------------------------------------------------------------------
+    The user's own current signup doesn't count against the limits, so re-registering
+    with a different role works.
+    """
+    others = [p for u, p in event['participants'].items() if u != uid]
+    limit  = event['role_limits'].get(role, 0)
+    if limit == 0:
+        return f"no {role} slots"
+    if sum(1 for p in others if p['role'] == role) >= limit:
+        return f"{role} full"
+    if boon:
+        cap = event.get('boon_limits', {}).get(boon, 0)
+        if sum(1 for p in others if p.get('boon') == boon) >= cap:
+            return f"{boon} full"
+    return None
+
+
+class NightRoleSelectView(GuildView):
+    def __init__(self, group_id: str, events: list):
+        super().__init__(timeout=120)
+        self.add_item(NightRoleSelect(group_id, events))
 
-class OtherRolesView(discord.ui.View):
-    def __init__(self, temp: dict):
-        super().__init__(timeout=300)
-        self.temp = temp
 
-    @discord.ui.button(label="Set Role Slots", style=discord.ButtonStyle.blurple)
-    async def set_roles(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(OtherRolesModal(self.temp, self))
+class NightRoleSelect(discord.ui.Select):
+    def __init__(self, group_id: str, events: list):
+        self.group_id = group_id
+        options = []
+        for role in ['Tank', 'Heal', 'DPS']:
+            if not any(e['role_limits'].get(role, 0) for _, e in events):
+                continue
+            open_in = sum(1 for _, e in events if _slot_problem(e, None, role, None) is None)
+            options.append(discord.SelectOption(
+                label=f"{role} (open in {open_in}/{len(events)} events)", value=role, emoji=ROLE_EMOJIS[role]
+            ))
+        super().__init__(placeholder="Choose your role...", options=options)
 
-    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.red)
-    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.edit_message(content="❌ Cancelled.", embed=None, view=None)
+    async def callback(self, interaction: discord.Interaction):
+        role   = self.values[0]
+        events = _night_events(load_data(), self.group_id)
+        boons  = _night_boons(events, role)
+        if not boons:
+            await _signup_whole_night(interaction, self.group_id, role, None)
+            return
+        await interaction.response.edit_message(
+            content=f"**{role}** selected. Now pick your boon for the night:",
+            view=NightBoonSelectView(self.group_id, role, boons)
+        )
 
 
-class OtherRolesModal(discord.ui.Modal, title='Set Role Slots'):
-    def __init__(self, temp: dict, parent_view: OtherRolesView):
-        super().__init__()
-        self.temp = temp
-        self.parent_view = parent_view
+def _night_boons(events: list, role: str) -> list:
+    """Boons offered by any event of the night for this role (Condi is DPS-only, Tanks get none)."""
+    if role == 'Tank':
+        return []
+    boons = []
+    for boon in ['Alacrity', 'Quickness', 'Condi']:
+        if boon == 'Condi' and role != 'DPS':
+            continue
+        if any(e.get('boon_limits', {}).get(boon, 0) for _, e in events):
+            boons.append(boon)
+    return boons
 
-    tank_count = discord.ui.TextInput(label='Tank slots (0–2)',  default='0', max_length=1)
-    heal_count = discord.ui.TextInput(label='Heal slots (1–5)',  default='2', max_length=1)
-    dps_count  = discord.ui.TextInput(label='DPS slots (1–20)', default='8', max_length=2)
 
-    async def on_submit(self, interaction: discord.Interaction):
-        try:
-            tank = int(self.tank_count.value)
-            heal = int(self.heal_count.value)
-            dps  = int(self.dps_count.value)
-            if any(v < 0 for v in [tank, heal, dps]) or (heal + dps) == 0:
-                raise ValueError
-        except ValueError:
-            await interaction.response.send_message(
-                "❌ Invalid slot counts. Heal + DPS must be at least 1.", ephemeral=True
-            )
-            return
+class NightBoonSelectView(GuildView):
+    def __init__(self, group_id: str, role: str, boons: list):
+        super().__init__(timeout=120)
+        self.add_item(NightBoonSelect(group_id, role, boons))
 
-        self.temp['role_limits']         = {'Tank': tank, 'Heal': heal, 'DPS': dps}
-        self.temp['boon_limits']         = {'Alacrity': 2, 'Quickness': 2}
-        self.temp['special_role_limits'] = {}
 
-        embed = _role_review_embed(self.temp)
-        await interaction.response.edit_message(embed=embed, view=RoleReviewView(self.temp))
+class NightBoonSelect(discord.ui.Select):
+    def __init__(self, group_id: str, role: str, boons: list):
+        self.group_id = group_id
+        self.role     = role
+        options = [discord.SelectOption(label=b, value=b) for b in boons]
+        options.append(discord.SelectOption(label="None", value="None", emoji="➖"))
+        super().__init__(placeholder="Choose your boon...", options=options)
 
+    async def callback(self, interaction: discord.Interaction):
+        boon = None if self.values[0] == "None" else self.values[0]
+        await _signup_whole_night(interaction, self.group_id, self.role, boon)
+
+
+async def _signup_whole_night(interaction: discord.Interaction, group_id: str, role: str, boon) -> None:
+    """Validate every event of the night against one consistent state and write all signups at once."""
+    uid  = str(interaction.user.id)
+    name = interaction.user.display_name
+    joined, skipped, promoted = [], [], []
+    async with store.transaction() as data:
+        for eid, event in _night_events(data, group_id):
+            problem = _slot_problem(event, uid, role, boon)
+            if problem:
+                skipped.append(f"{event['name']} — {problem}")
+                continue
+            previous = event['participants'].get(uid, {})
+            # keep a special role picked earlier on this event if the role is unchanged
+            special  = previous.get('special_role') if previous.get('role') == role else None
+            promoted.append((eid, event, _set_participant(eid, event, uid, name, role, boon, special)))
+            joined.append(eid)
+
+    for eid, event, uids in promoted:
+        _announce_promotions(eid, event, uids)
+    for eid in joined:
+        _schedule_embed_refresh(eid)
+
+    boon_txt = f" [{boon}]" if boon else ""
+    lines    = [f"✅ Signed up as **{role}{boon_txt}** for {len(joined)} event(s)."]
+    if skipped:
+        lines.append("Skipped:\n" + "\n".join(f"• {s}" for s in skipped))
+    await interaction.response.edit_message(content="\n".join(lines), view=None)
 
 # ---------------------------------------------------------------------------
-# Role review — shared final step before posting
+# Bot setup
 # ---------------------------------------------------------------------------
+_section('Bot setup')
+
+GUILDLESS_COMMANDS = {'help', 'pizza'}   # usable in DMs: they don't touch guild state
+
+
+class GuildCommandTree(app_commands.CommandTree):
+    """Runs every slash command and autocomplete against the invoking guild's store."""
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.guild_id is not None:
+            return await _enter_interaction(interaction, interaction.guild_id,
+                                            event_id=getattr(interaction.namespace, 'event_id', None))
+        _bind_interaction(interaction)
+        if not leader.is_leader:
+            return False
+        if interaction.command and interaction.command.name in GUILDLESS_COMMANDS:
+            return True
+        if interaction.type is discord.InteractionType.application_command:
+            await interaction.response.send_message("❌ Use this command in a server.", ephemeral=True)
+        return False
+
+
+HTTP_POOL_SIZE = 20   # max open connections in the shared session
+
+# Subsystems loaded as discord.py extensions from extensions/. Each imports what it shares
+# from this module (the stores, the lease, the signup views, the bot), so /reload swaps one
+# subsystem's code in place while the gateway connection, the loaded guild stores and every
+# view already on screen stay as they are. An extension adds its commands to the tree in
+# setup(), not on import: when a reload fails, discord.py has already dropped them and only
+# calls the old setup() again to put them back.
+EXTENSIONS = ['wizard', 'admin', 'attendance', 'lottery', 'series', 'backups', 'export', 'utility', 'pizza']
+
+
+class KDSBot(commands.Bot):
+    """Bot with a shared, pooled HTTP session for outbound API calls."""
+    http_session: aiohttp.ClientSession = None
+
+    async def setup_hook(self):
+        # One long-lived session: pooled keep-alive connections and cached DNS
+        # instead of a fresh connector + TLS handshake per command.
+        self.http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, ttl_dns_cache=300),
+            headers={"User-Agent": "KDS-Bot/1.0"},
+        )
+        for name in EXTENSIONS:
+            await self.load_extension(f"extensions.{name}")
+        leader_loop.start()
+
+    async def close(self):
+        leader_loop.cancel()
+        await asyncio.to_thread(leader.release)   # hand over now rather than when the lease expires
+        if self.http_session and not self.http_session.closed:
+            await self.http_session.close()
+        await super().close()
+
+
+# Gateway cache policy. The bot acts on interactions only: it looks up channels with
+# bot.get_channel (the guilds intent), fetches users over HTTP to DM them and never reads
+# messages, so by default it subscribes to guild events alone and caches no messages or members.
+GATEWAY_INTENTS = os.getenv('GATEWAY_INTENTS', 'minimal')   # 'minimal' | 'default'
+MAX_MESSAGES    = int(os.getenv('MAX_MESSAGES') or 0)        # message cache size; 0 = no cache
+MEMBER_CACHE    = os.getenv('MEMBER_CACHE', 'none')          # 'none' | 'intents' (discord.py's default)
+
+
+def _gateway_options() -> dict:
+    """Keyword arguments for the bot's intents and caches, from the settings above."""
+    if GATEWAY_INTENTS == 'default':
+        intents = discord.Intents.default()
+    else:
+        intents = discord.Intents.none()
+        intents.guilds = True
+    members = (discord.MemberCacheFlags.from_intents(intents) if MEMBER_CACHE == 'intents'
+               else discord.MemberCacheFlags.none())
+    return {'intents': intents, 'max_messages': MAX_MESSAGES or None, 'member_cache_flags': members}
 
-class RoleReviewView(discord.ui.View):
-    def __init__(self, temp: dict):
-        super().__init__(timeout=300)
-        self.temp = temp
 
-    @discord.ui.button(label="✅ Confirm & Post", style=discord.ButtonStyle.green)
-    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await _post_event(interaction, self.temp)
+bot = KDSBot(command_prefix='!', tree_cls=GuildCommandTree, **_gateway_options())
 
-    @discord.ui.button(label="❌ Cancel", style=discord.ButtonStyle.red)
-    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.edit_message(content="❌ Cancelled.", embed=None, view=None)
+# ---------------------------------------------------------------------------
+# Event building — shared by the creation wizard and recurring series
+# ---------------------------------------------------------------------------
+_section('Event building')
+
+# Categories with fixed slot layouts (everything else is a boss or "Other")
+TEMPLATE_CATEGORIES = ["Fractals", "Guild Missions", "Hang Out / Other Games"]
 
 
-async def _post_event(interaction: discord.Interaction, temp: dict):
-    """Finalise the event, save it, and post the embed to the channel."""
-    data = load_data()
-    eid  = next_event_id(data)
+def _template_fields(selection: str) -> dict:
+    """Type, boss/wing and slot limits for a boss name or one of TEMPLATE_CATEGORIES."""
+    if selection == "Fractals":
+        return {
+            'type': 'fractal', 'boss': 'Fractals', 'wing': selection,
+            'role_limits': {'Tank': 0, 'Heal': 1, 'DPS': 4},
+            'boon_limits': {'Alacrity': 1, 'Quickness': 1},
+            'special_role_limits': {},
+        }
+    if selection in ("Guild Missions", "Hang Out / Other Games"):
+        return {
+            'type': 'guild_mission' if selection == "Guild Missions" else 'social',
+            'boss': None, 'wing': selection, 'open_signup': True,
+            'role_limits': {}, 'boon_limits': {}, 'special_role_limits': {},
+        }
+    tmpl = BOSS_TEMPLATES[selection]
+    wing = next(w for w, bosses in WING_BOSSES.items() if selection in bosses)
+    return {
+        'type': 'raid', 'boss': selection, 'wing': wing,
+        # Pull slot counts and boon limits directly from the template
+        'role_limits': {'Tank': tmpl['Tank'], 'Heal': tmpl['Heal'], 'DPS': tmpl['DPS']},
+        'boon_limits': dict(tmpl['boon_limits']),
+        'special_role_limits': dict(tmpl['special']),
+    }
+
 
-    event = {
+def _add_event(data: dict, temp: dict, creator_id: int) -> tuple:
+    """Create an event from wizard/template fields in data and index it. Returns (eid, event)."""
+    eid = next_event_id(data)
+    event = Event({
         'name':                temp['name'],
         'description':         temp['description'],
         'unix_ts':             temp['unix_ts'],        # UTC Unix timestamp
         'type':                temp['type'],           # 'raid' | 'normal'
         'boss':                temp.get('boss'),
         'wing':                temp.get('wing'),
-        'role_limits':         temp['role_limits'],
-        'boon_limits':         temp['boon_limits'],
-        'special_role_limits': temp['special_role_limits'],
+        'role_limits':         dict(temp['role_limits']),
+        'boon_limits':         dict(temp['boon_limits']),
+        'special_role_limits': dict(temp['special_role_limits']),
         'open_signup':         temp.get('open_signup', False),
-        'creator_id':          interaction.user.id,
+        'creator_id':          creator_id,
         'participants':        {},
         'channel_id':          temp['channel_id'],
         'message_id':          None,
@@ -748,744 +2848,1059 @@ async def _post_event(interaction: discord.Interaction, temp: dict):
         'reminded_1h':         False,
         'reminded_30m':        False,
         'point_value':         POINT_VALUES[temp['type']],
-    }
+    })
+    if temp.get('series_id'):
+        event['series_id'] = temp['series_id']
     data['events'][eid] = event
-    save_data(data)
-
-    embed   = create_event_embed(event, eid)
-    view    = EventView(eid)
-    channel = interaction.channel
-    message = await channel.send(embed=embed, view=view)
+    store.event_index.update(eid, event)
+    return eid, event
 
-    # Store message ID so we can edit the embed later
-    data['events'][eid]['message_id'] = message.id
-    save_data(data)
-
-    await interaction.response.edit_message(
-        content=f"✅ Event **{event['name']}** posted! (ID: {eid})",
-        embed=None, view=None
-    )
 
+async def _publish_event(channel, eid: str, event: dict) -> None:
+    """Post the public embed + signup view and remember the message ID for later edits."""
+    view    = EventView(eid, grouped=bool(event.get('group_id')))
+    message = await channel.send(embed=create_event_embed(event, eid), view=view)
+    event['message_id'] = message.id
 
 # ---------------------------------------------------------------------------
-# Creation flow helper embeds
+# Startup
 # ---------------------------------------------------------------------------
+_section('Startup')
 
-def _creation_embed(temp: dict, step_title: str) -> discord.Embed:
-    """Ephemeral status embed shown during the creation wizard."""
-    if 'unix_ts' in temp:
-        time_display = unix_to_discord_ts(temp['unix_ts'], 'F')
+def _adopt_legacy_data() -> None:
+    """Move a pre-partitioning DATA_FILE (and its backups) into the guild that owns it:
+    PRIMARY_GUILD_ID if set, otherwise the only guild the bot is in."""
+    if not os.path.exists(DATA_FILE):
+        return
+    if PRIMARY_GUILD_ID:
+        guild_id = int(PRIMARY_GUILD_ID)
+    elif len(bot.guilds) == 1:
+        guild_id = bot.guilds[0].id
     else:
-        time_display = "*(not set)*"
-    lines = [
-        f"**Name:** {temp['name']}",
-        f"**Time:** {time_display}",
-    ]
-    if temp.get('description'):
-        lines.append(f"**Description:** {temp['description']}")
-    if temp.get('wing'):
-        lines.append(f"**Wing:** {temp['wing']}")
-    if temp.get('boss'):
-        lines.append(f"**Boss:** {temp['boss']}")
-    return discord.Embed(title=step_title, description="\n".join(lines), color=0x0099ff)
-
-
-def _role_review_embed(temp: dict) -> discord.Embed:
-    """Show the pre-filled role slots for officer review before posting."""
-    embed = _creation_embed(temp, "Step 4 of 4: Review & Confirm")
-
-    role_emojis = {'Tank': '🛡️', 'Heal': '💚', 'DPS': '⚔️'}
-    slots_lines = []
-    for role, count in temp['role_limits'].items():
-        if count > 0:
-            slots_lines.append(f"{role_emojis[role]} {role}: {count} slot{'s' if count != 1 else ''}")
-
-    boon_lines = [f"{boon} ×{cap}" for boon, cap in temp['boon_limits'].items()]
-
-    special_lines = [
-        f"• {role}: {count}" for role, count in temp['special_role_limits'].items() if count > 0
-    ]
-
-    embed.add_field(name="Role Slots", value="\n".join(slots_lines) or "None", inline=True)
-    embed.add_field(name="Boon Limits", value="\n".join(boon_lines), inline=True)
-    if special_lines:
-        embed.add_field(name="Special Roles", value="\n".join(special_lines), inline=False)
+        log.warning("Legacy data file needs PRIMARY_GUILD_ID to say which guild owns it",
+                    extra={'path': DATA_FILE, 'guilds': len(bot.guilds)})
+        return
 
-    ticket_val = POINT_VALUES[temp['type']]
-    embed.set_footer(text=f"Attendance reward: {ticket_val} points")
-    return embed
+    st = stores.get(guild_id)
+    if os.path.exists(st.path):
+        log.warning("Not adopting legacy data file: guild already has its own",
+                    extra={'path': DATA_FILE, 'guild_id': guild_id})
+        return
+    stores.forget(guild_id)   # drop any empty store loaded before the move
+    os.makedirs(os.path.dirname(st.path), exist_ok=True)
+    os.replace(DATA_FILE, st.path)
+    legacy_backups = os.path.join(os.path.dirname(DATA_FILE), 'backups')
+    if os.path.isdir(legacy_backups) and not os.path.exists(st.backups.directory):
+        os.replace(legacy_backups, st.backups.directory)
+    stores.schedule(guild_id, 0)   # let the reminder loop load it and work out the real wake time
+    log.info("Moved legacy data file into guild storage", extra={'path': DATA_FILE, 'guild_id': guild_id})
 
 @bot.event
 async def on_ready():
     bot.start_time = datetime.now()
-    print(f'{bot.user} is online!')
+    log.info("Online", extra={'bot_user': str(bot.user), 'guilds': len(bot.guilds)})
 
-    if not check_events.is_running():
-        check_events.start()
+    if leader.is_leader:
+        _adopt_legacy_data()
 
     local_commands = bot.tree.get_commands()
-    print(f"Commands in tree before sync ({len(local_commands)}): {[c.name for c in local_commands]}")
-
-    print("Syncing commands...")
+    log.info("Syncing commands", extra={'commands': [c.name for c in local_commands]})
     try:
         synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} command(s): {[c.name for c in synced]}")
-    except Exception as e:
-        print(f"Failed to sync commands: {e}")
+        log.info("Synced commands", extra={'count': len(synced)})
+    except Exception:
+        log.exception("Failed to sync commands")
+
+
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    # Dispatched from the command's own context, so this carries its fields and elapsed_ms
+    log.info("Command completed")
 
 # ---------------------------------------------------------------------------
-# Admin commands
+# Permissions
 # ---------------------------------------------------------------------------
+_section('Permissions')
 
 def _is_officer(interaction: discord.Interaction) -> bool:
     """True if the user has Manage Events or Administrator permission."""
-    perms = interaction.user.guild_permissions
-    return perms.manage_events or perms.administrator
+    perms = getattr(interaction.user, 'guild_permissions', None)   # None in DMs
+    return bool(perms) and (perms.manage_events or perms.administrator)
 
+# ---------------------------------------------------------------------------
+# Backup chains — periodic base + delta snapshots of one store
+# ---------------------------------------------------------------------------
+#
+# Each snapshot is one zlib-compressed JSON file in the store's backups/ directory named "<unix_ts>.base" or
+# "<unix_ts>.delta". A base is the whole state. A delta holds only the top-level counters
+# and the events/players/lotteries/series entries that changed since the previous snapshot
+# ({section: {key: item, or None if deleted}}). A new base is cut every BACKUP_REBASE_EVERY
+# snapshots and on every restart, so a restore never replays a long chain.
+# Thinning old snapshots for retention merges a dropped delta into the next one (or folds a
+# dropped base forward), so every snapshot that's kept still restores exactly.
+# The backups extension takes the snapshots and restores them.
+_section('Backup chains')
+
+BACKUP_REBASE_EVERY     = 24
+# (keep snapshots up to this age, one per this interval) — anything older than the last tier is dropped
+BACKUP_RETENTION        = (
+    (timedelta(days=1),  timedelta(hours=1)),
+    (timedelta(days=7),  timedelta(days=1)),
+    (timedelta(days=56), timedelta(weeks=1)),
+)
+
+
+class BackupChain:
+    """The snapshot files of one store, plus what's needed to diff the next snapshot against the last."""
+    def __init__(self, directory: str):
+        self.directory  = directory
+        self.digests    = None   # {section: {key: digest of item JSON}} as of the last snapshot this run
+        self.since_base = 0
+        self.lock       = asyncio.Lock()   # one snapshot at a time: each delta is against the previous one
+
+    def points(self) -> list:
+        """[(unix_ts, 'base' | 'delta')] of every snapshot on disk, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        points = []
+        for name in os.listdir(self.directory):
+            ts, _, kind = name.partition('.')
+            if ts.isdigit() and kind in ('base', 'delta'):
+                points.append((int(ts), kind))
+        return sorted(points)
+
+    def read(self, ts: int, kind: str) -> dict:
+        with open(os.path.join(self.directory, f"{ts}.{kind}"), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def write(self, ts: int, kind: str, payload: dict) -> None:
+        path = os.path.join(self.directory, f"{ts}.{kind}")
+        with open(path + '.tmp', 'wb') as f:
+            f.write(zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'), 6))
+        os.replace(path + '.tmp', path)
+
+    def remove(self, ts: int, kind: str) -> None:
+        os.remove(os.path.join(self.directory, f"{ts}.{kind}"))
+
+    def write_snapshot(self, snap: Snapshot, now: int) -> str:
+        """Store a read snapshot as a base or a delta. Runs in a worker thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        state   = json.loads(json.dumps(
+            {**snap.counters, 'events': snap.events, 'players': snap.players,
+             'lotteries': snap.lotteries, 'series': snap.series},
+            separators=(',', ':'), default=_json_default
+        ))
+        digests = _digests(state)
+        if self.digests is None or self.since_base >= BACKUP_REBASE_EVERY:
+            self.write(now, 'base', state)
+            kind, self.since_base = 'base', 0
+        else:
+            delta = _state_delta(state, self.digests, digests)
+            if not delta:
+                return 'unchanged'
+            self.write(now, 'delta', delta)
+            kind = 'delta'
+            self.since_base += 1
+        self.digests = digests
+        self.prune(now)
+        return kind
+
+    def prune(self, now: int) -> None:
+        points = self.points()
+        keep   = _kept_points(points, now)
+        for i, (ts, kind) in enumerate(points):
+            if ts in keep:
+                continue
+            nxt = points[i + 1] if i + 1 < len(points) else None
+            if nxt and nxt[1] == 'delta':
+                # the next snapshot depends on this one: fold this one into it
+                later = self.read(*nxt)
+                if kind == 'base':
+                    self.write(nxt[0], 'base', _apply_delta(self.read(ts, kind), later))
+                    self.remove(*nxt)
+                    points[i + 1] = (nxt[0], 'base')
+                else:
+                    self.write(nxt[0], 'delta', _compose_deltas(self.read(ts, kind), later))
+            self.remove(ts, kind)
+
+    def state_at(self, when: int) -> tuple:
+        """Rebuild the state as of the newest snapshot at or before `when`. Returns (snapshot_ts, state)."""
+        points = [p for p in self.points() if p[0] <= when]
+        if not points:
+            raise LookupError("no backup at or before that time")
+        start = max(i for i, (_, kind) in enumerate(points) if kind == 'base')
+        state = self.read(*points[start])
+        for point in points[start + 1:]:
+            _apply_delta(state, self.read(*point))
+        return points[-1][0], state
+
+
+def _digests(state: dict) -> dict:
+    # hashlib rather than hash(): str hashes are salted per process, so these would only be
+    # comparable within one run
+    return {
+        key: ({k: hashlib.blake2b(json.dumps(v, sort_keys=True).encode('utf-8'), digest_size=16).digest()
+               for k, v in value.items()}
+              if isinstance(value, dict) else value)
+        for key, value in state.items()
+    }
 
-@bot.tree.command(name="delete_event", description="Delete an event and remove its Discord message (officers only)")
-async def delete_event(interaction: discord.Interaction, event_id: str):
-    if not _is_officer(interaction):
-        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
-        return
 
-    data  = load_data()
-    event = data['events'].get(event_id)
-    if not event:
-        await interaction.response.send_message(f"❌ Event `{event_id}` not found.", ephemeral=True)
-        return
+def _state_delta(state: dict, old: dict, new: dict) -> dict:
+    delta = {}
+    for key, value in state.items():
+        if not isinstance(value, dict):
+            if old.get(key) != value:
+                delta[key] = value
+            continue
+        before  = old.get(key, {})
+        changes = {k: value[k] for k, h in new[key].items() if before.get(k) != h}
+        changes.update({k: None for k in before if k not in value})
+        if changes:
+            delta[key] = {'changed': changes}
+    return delta
+
+
+def _apply_delta(state: dict, delta: dict) -> dict:
+    for key, value in delta.items():
+        if isinstance(value, dict) and 'changed' in value:
+            section = state.setdefault(key, {})
+            for k, item in value['changed'].items():
+                if item is None:
+                    section.pop(k, None)
+                else:
+                    section[k] = item
+        else:
+            state[key] = value
+    return state
 
-    # Delete the public Discord message if we can find it
-    channel = bot.get_channel(event['channel_id'])
-    if channel and event.get('message_id'):
-        try:
-            message = await channel.fetch_message(event['message_id'])
-            await message.delete()
-        except discord.NotFound:
-            pass
 
-    del data['events'][event_id]
-    save_data(data)
-    await interaction.response.send_message(f"✅ Event `{event_id}` deleted.", ephemeral=True)
+def _compose_deltas(first: dict, second: dict) -> dict:
+    """One delta with the effect of applying first, then second."""
+    merged = dict(first)
+    for key, value in second.items():
+        if isinstance(value, dict) and 'changed' in value and key in first:
+            merged[key] = {'changed': {**first[key]['changed'], **value['changed']}}
+        else:
+            merged[key] = value
+    return merged
 
 
-@bot.tree.command(name="edit_event", description="Edit event name, description, or time (officers only)")
-async def edit_event(interaction: discord.Interaction, event_id: str):
-    if not _is_officer(interaction):
-        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
-        return
+def _kept_points(points: list, now: int) -> set:
+    """Timestamps that survive BACKUP_RETENTION: the newest snapshot in each bucket of each tier."""
+    keep = {points[-1][0]} if points else set()
+    buckets = {}
+    for ts, _ in points:
+        age = timedelta(seconds=now - ts)
+        for tier, (horizon, step) in enumerate(BACKUP_RETENTION):
+            if age <= horizon:
+                buckets[(tier, ts // int(step.total_seconds()))] = ts
+                break
+    return keep | set(buckets.values())
 
-    data  = load_data()
-    event = data['events'].get(event_id)
-    if not event:
-        await interaction.response.send_message(f"❌ Event `{event_id}` not found.", ephemeral=True)
-        return
 
-    await interaction.response.send_modal(EditEventModal(event_id, event))
+# ---------------------------------------------------------------------------
+# Attendance analytics — player × event matrix over every recorded close
+# ---------------------------------------------------------------------------
+_section('Attendance analytics')
+
+RELIABILITY_PRIOR        = 0.9   # rate assumed for a player with no history...
+RELIABILITY_PRIOR_WEIGHT = 3     # ...worth this many signups, so one no-show doesn't sink a newcomer
+
+NOT_SIGNED, ATTENDED, NO_SHOW = 0, 1, 2
+
+
+class AttendanceStats:
+    """Per-player attendance figures for one snapshot. Row i of every array is uids[i]."""
+    def __init__(self, uids: list, names: list, event_ids: list, roles: list, bosses: list,
+                 matrix, by_role, by_boss):
+        self.uids      = uids
+        self.names     = names
+        self.event_ids = event_ids        # matrix columns, oldest first
+        self.roles     = roles            # by_role columns
+        self.bosses    = bosses           # by_boss columns
+        self.matrix    = matrix           # int8: NOT_SIGNED / ATTENDED / NO_SHOW
+        self.by_role   = by_role          # attended count per player and role
+        self.by_boss   = by_boss          # attended count per player and boss (or event type)
+        self._row      = {uid: i for i, uid in enumerate(uids)}
+
+        came    = matrix == ATTENDED
+        missed  = matrix == NO_SHOW
+        columns = np.arange(matrix.shape[1])
+        self.attended = came.sum(axis=1)
+        self.no_shows = missed.sum(axis=1)
+        self.signups  = self.attended + self.no_shows
+        self.attendance_rate = np.divide(self.attended, self.signups, out=np.zeros(len(uids)),
+                                         where=self.signups > 0)
+        self.no_show_rate    = np.divide(self.no_shows, self.signups, out=np.zeros(len(uids)),
+                                         where=self.signups > 0)
+        self.reliability     = 100 * (self.attended + RELIABILITY_PRIOR * RELIABILITY_PRIOR_WEIGHT) \
+                                   / (self.signups + RELIABILITY_PRIOR_WEIGHT)
+
+        # Streaks count attended signups in a row; events a player didn't sign up for don't break one.
+        # `since_miss` is the running attended count minus its value at the latest no-show so far.
+        running    = came.cumsum(axis=1)
+        at_miss    = np.maximum.accumulate(np.where(missed, running, 0), axis=1)
+        since_miss = running - at_miss
+        self.longest_streak = since_miss.max(axis=1, initial=0)
+        last_miss           = np.where(missed, columns, -1).max(axis=1, initial=-1)
+        self.current_streak = (came & (columns > last_miss[:, None])).sum(axis=1)
+
+    def __len__(self):
+        return len(self.uids)
+
+    def player(self, uid: str):
+        """One player's figures as plain Python values, or None if they never signed up for a
+        closed event."""
+        i = self._row.get(uid)
+        if i is None:
+            return None
+        return {
+            'signups':         int(self.signups[i]),
+            'attended':        int(self.attended[i]),
+            'no_shows':        int(self.no_shows[i]),
+            'attendance_rate': float(self.attendance_rate[i]),
+            'no_show_rate':    float(self.no_show_rate[i]),
+            'current_streak':  int(self.current_streak[i]),
+            'longest_streak':  int(self.longest_streak[i]),
+            'reliability':     float(self.reliability[i]),
+            'by_role':         {r: int(n) for r, n in zip(self.roles, self.by_role[i]) if n},
+            'by_boss':         {b: int(n) for b, n in zip(self.bosses, self.by_boss[i]) if n},
+        }
 
 
-class EditEventModal(discord.ui.Modal, title='Edit Event'):
-    event_name = discord.ui.TextInput(label='Event Name', max_length=100)
-    description = discord.ui.TextInput(
-        label='Description',
-        style=discord.TextStyle.paragraph,
-        required=False,
-        max_length=500
+def _recorded_closes(view: Snapshot) -> list:
+    """(eid, event) for every closed event that recorded who attended, in snapshot order."""
+    return [(eid, e) for eid, e in view.events.items()
+            if e['status'] != 'open' and e.get('attended') is not None]
+
+
+def _attendance_stats(recorded: list, players) -> AttendanceStats:
+    """Build the matrix from _recorded_closes() in one pass over the signups; all per-player
+    figures are then whole-array operations."""
+    closed = sorted(((e['unix_ts'], eid, e) for eid, e in recorded), key=lambda t: (t[0], t[1]))
+    uids, names, rows, cols, codes = {}, {}, [], [], []
+    roles, role_of, bosses, boss_of = {}, [], {}, []
+    for col, (_, eid, event) in enumerate(closed):
+        came   = set(event['attended'])
+        roster = event.get('participants', {})
+        boss   = event.get('boss') or EVENT_TYPE_LABELS.get(event.get('type'), event.get('type') or 'Other')
+        boss_of.append(bosses.setdefault(boss, len(bosses)))
+        for uid in itertools.chain(event['attended'], event.get('no_shows', ())):
+            row = uids.setdefault(uid, len(uids))
+            p   = roster.get(uid)
+            if p is not None:
+                names[uid] = p['name']
+            rows.append(row)
+            cols.append(col)
+            codes.append(ATTENDED if uid in came else NO_SHOW)
+            role_of.append(roles.setdefault(p.get('role') if p else None, len(roles)))
+
+    n_players, n_events = len(uids), len(closed)
+    rows, cols, codes = (np.asarray(a, dtype=np.intp) for a in (rows, cols, codes))
+    matrix = np.zeros((n_players, n_events), dtype=np.int8)
+    matrix[rows, cols] = codes
+
+    came    = codes == ATTENDED
+    role_of = np.asarray(role_of, dtype=np.intp)[came]
+    boss_of = np.asarray(boss_of, dtype=np.intp)[cols[came]]
+    by_role = np.bincount(rows[came] * len(roles) + role_of,
+                          minlength=n_players * len(roles)).reshape(n_players, len(roles))
+    by_boss = np.bincount(rows[came] * len(bosses) + boss_of,
+                          minlength=n_players * len(bosses)).reshape(n_players, len(bosses))
+
+    uid_list = list(uids)
+    return AttendanceStats(
+        uids      = uid_list,
+        names     = [names.get(uid) or players.get(uid, {}).get('name') or uid for uid in uid_list],
+        event_ids = [eid for _, eid, _ in closed],
+        roles     = [str(r) if r is not None else 'Unknown' for r in roles],
+        bosses    = list(bosses),
+        matrix    = matrix,
+        by_role   = by_role,
+        by_boss   = by_boss,
     )
-    event_time = discord.ui.TextInput(
-        label='New Date & Time (your local time)',
-        placeholder='YYYY-MM-DD HH:MM',
-        max_length=16
-    )
-    timezone = discord.ui.TextInput(
-        label='Your UTC offset',
-        placeholder='e.g. UTC+1  UTC-5  UTC (leave as UTC if unchanged)',
-        default='UTC',
-        max_length=10
-    )
-
-    def __init__(self, event_id: str, event: dict):
-        super().__init__()
-        self.event_id = event_id
-        # Pre-fill time as UTC so officer knows the current stored value
-        utc_dt = datetime.utcfromtimestamp(event['unix_ts'])
-        self.event_name.default  = event['name']
-        self.description.default = event.get('description', '')
-        self.event_time.default  = utc_dt.strftime('%Y-%m-%d %H:%M')
-
-    async def on_submit(self, interaction: discord.Interaction):
-        try:
-            local_dt = datetime.strptime(self.event_time.value.strip(), "%Y-%m-%d %H:%M")
-        except ValueError:
-            await interaction.response.send_message(
-                "❌ Invalid time format. Use: YYYY-MM-DD HH:MM", ephemeral=True
-            )
-            return
-
-        try:
-            offset  = parse_utc_offset(self.timezone.value)
-            unix_ts = dt_to_unix(local_dt - offset)
-        except ValueError:
-            await interaction.response.send_message(
-                "❌ Invalid UTC offset. Use format: UTC+1, UTC-5, or UTC.", ephemeral=True
-            )
-            return
 
-        data  = load_data()
-        event = data['events'].get(self.event_id)
-        if not event:
-            await interaction.response.send_message("❌ Event no longer exists.", ephemeral=True)
-            return
 
-        event['name']        = self.event_name.value.strip()
-        event['description'] = self.description.value.strip()
-        event['unix_ts']     = unix_ts
-        # Reset reminder flags so they fire again at the new time
-        event['reminded_1h']  = False
-        event['reminded_30m'] = False
-        save_data(data)
-
-        await _refresh_event_embed(event, self.event_id)
-        await interaction.response.send_message(f"✅ Event `{self.event_id}` updated.", ephemeral=True)
-
-
-@bot.tree.command(name="add_attendee", description="Add a filler who attended but didn't sign up (officers only)")
-async def add_attendee(interaction: discord.Interaction, event_id: str, user: discord.Member):
-    if not _is_officer(interaction):
-        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
-        return
+class AttendanceAnalytics:
+    """One store's AttendanceStats, cached per snapshot.
 
-    data  = load_data()
-    event = data['events'].get(event_id)
-    if not event:
-        await interaction.response.send_message(f"❌ Event `{event_id}` not found.", ephemeral=True)
-        return
+    Most new snapshots come from signups on open events. Records that didn't change are the
+    same objects in the next snapshot, so when every recorded close is identical to last
+    time the stats are reused and only the cheap scan for closes is paid.
+    """
+    def __init__(self):
+        self._view     = None
+        self._recorded = None
+        self._stats    = None
+
+    def stats(self, view: Snapshot) -> AttendanceStats:
+        if view is self._view:
+            return self._stats
+        recorded = _recorded_closes(view)
+        previous = self._recorded
+        if (previous is None or len(recorded) != len(previous)
+                or any(a[1] is not b[1] or a[0] != b[0] for a, b in zip(recorded, previous))):
+            self._stats = _attendance_stats(recorded, view.players)
+        self._view, self._recorded = view, recorded
+        return self._stats
 
-    uid = str(user.id)
-    if uid in event['participants']:
-        await interaction.response.send_message(
-            f"❌ {user.display_name} is already on the roster.", ephemeral=True
-        )
-        return
 
-    event['participants'][uid] = {
-        'name': interaction.guild.get_member(user.id).display_name if interaction.guild else user.display_name,
-        'role': 'Filler', 'boon': None, 'special_role': None,
-    }
-    save_data(data)
-    await _refresh_event_embed(event, event_id)
-    await interaction.response.send_message(
-        f"✅ Added **{user.display_name}** as a filler to event `{event_id}`.", ephemeral=True
-    )
+# ---------------------------------------------------------------------------
+# Autocomplete for event / lottery IDs
+# ---------------------------------------------------------------------------
+_section('Autocomplete for event / lottery IDs')
 
+MAX_CHOICES = 25  # Discord's cap on autocomplete suggestions
 
-@bot.tree.command(name="close_event", description="Close event and confirm who attended (officers only)")
-async def close_event(interaction: discord.Interaction, event_id: str):
-    if not _is_officer(interaction):
-        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
-        return
 
-    data  = load_data()
-    event = data['events'].get(event_id)
-    if not event:
-        await interaction.response.send_message(f"❌ Event `{event_id}` not found.", ephemeral=True)
-        return
-    if event['status'] != 'open':
-        await interaction.response.send_message(f"❌ Event `{event_id}` is already closed.", ephemeral=True)
-        return
+def _choice_label(*parts) -> str:
+    return "  ·  ".join(p for p in parts if p)[:100]
 
-    participants = event.get('participants', {})
-    if not participants:
-        event['status'] = 'closed'
-        save_data(data)
-        await interaction.response.send_message(
-            f"✅ Event `{event_id}` closed. No participants — no points awarded.", ephemeral=True
-        )
-        return
 
-    embed = discord.Embed(
-        title=f"Close: {event['name']}",
-        description=(
-            "Select everyone who **actually attended**.\n"
-            f"Each confirmed player receives **{event['point_value']} points**."
-        ),
-        color=0xf39c12
+def _event_choices(current: str, open_only: bool) -> list:
+    """Match events on ID, name, boss and wing from the in-memory index."""
+    events = load_data()['events']
+    keys   = store.event_index.search.search(current)
+    if keys is None:
+        keys = events.keys()
+    matches = (
+        (eid, events[eid]) for eid in keys
+        if eid in events and (not open_only or events[eid].get('status') == 'open')
     )
-    await interaction.response.send_message(
-        embed=embed, view=AttendanceConfirmView(event_id, event), ephemeral=True
+    # Open events first, then soonest — without sorting every match
+    best = heapq.nsmallest(
+        MAX_CHOICES, matches, key=lambda m: (m[1].get('status') != 'open', m[1]['unix_ts'])
     )
-
-
-class AttendanceConfirmView(discord.ui.View):
-    def __init__(self, event_id: str, event: dict):
-        super().__init__(timeout=300)
-        self.event_id      = event_id
-        self.confirmed_uids = []           # populated by AttendanceSelect.callback
-        self.add_item(AttendanceSelect(event_id, event))
-
-    @discord.ui.button(label="Confirm & Award Points", style=discord.ButtonStyle.green, emoji="✅", row=1)
-    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-        confirmed_uids = self.confirmed_uids
-
-        data  = load_data()
-        event = data['events'].get(self.event_id)
-        if not event:
-            await interaction.response.edit_message(content="❌ Event not found.", embed=None, view=None)
-            return
-
-        point_value = event['point_value']
-        awarded = []
-        for uid in confirmed_uids:
-            participant = event['participants'].get(uid)
-            if not participant:
-                continue
-            name = participant['name']
-            if uid not in data['players']:
-                data['players'][uid] = {'name': name, 'points': 0, 'events_attended': 0}
-            data['players'][uid]['name']            = name   # keep display name current
-            data['players'][uid]['points']          += point_value
-            data['players'][uid]['events_attended'] += 1
-            awarded.append(name)
-
-        event['status'] = 'closed'
-        save_data(data)
-
-        if awarded:
-            names_text  = "\n".join(f"• {n}" for n in awarded)
-            result_text = f"✅ **Event closed.** {point_value} points awarded to:\n{names_text}"
-        else:
-            result_text = "✅ **Event closed.** No attendance confirmed — no points awarded."
-
-        await interaction.response.edit_message(content=result_text, embed=None, view=None)
-
-    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.grey, emoji="❌", row=1)
-    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.edit_message(content="Cancelled.", embed=None, view=None)
-
-
-class AttendanceSelect(discord.ui.Select):
-    def __init__(self, event_id: str, event: dict):
-        self.event_id    = event_id
-        participants     = event.get('participants', {})
-        point_value     = event['point_value']
-
-        options = [
-            discord.SelectOption(
-                label=p['name'][:100],
-                value=uid,
-                description=p['role'] + (f" [{p['boon']}]" if p.get('boon') else "")
-            )
-            for uid, p in participants.items()
-        ]
-        super().__init__(
-            placeholder="Select who attended...",
-            options=options,
-            min_values=0,
-            max_values=len(options),
-            row=0
+    return [
+        app_commands.Choice(
+            name=_choice_label(
+                f"#{eid}", e['name'], e.get('boss') or e.get('wing'),
+                datetime.fromtimestamp(e['unix_ts'], timezone.utc).strftime('%a %d %b %H:%M UTC'),
+                None if e.get('status') == 'open' else e.get('status'),
+            ),
+            value=eid,
         )
-        self.point_value = point_value
-
-    async def callback(self, interaction: discord.Interaction):
-        # Store selected UIDs on the parent view for the Confirm button to read
-        self.view.confirmed_uids = self.values
+        for eid, e in best
+    ]
 
-        # Show a live preview of who will receive points
-        if self.values:
-            data  = load_data()
-            event = data['events'].get(self.event_id)
-            names = [
-                event['participants'][uid]['name']
-                for uid in self.values
-                if uid in event.get('participants', {})
-            ]
-            preview = "\n".join(f"• {n}" for n in names)
-        else:
-            preview = "*(none selected)*"
 
-        embed = discord.Embed(
-            title="Attendance Preview",
-            description=(
-                f"**Will receive {self.point_value} points:**\n{preview}\n\n"
-                "Click **Confirm & Award Points** when ready."
-            ),
-            color=0xf39c12
-        )
-        await interaction.response.edit_message(embed=embed)
+def _lottery_choices(current: str, open_only: bool) -> list:
+    lotteries = load_data()['lotteries']
+    keys      = store.lottery_search.search(current)
+    if keys is None:
+        keys = lotteries.keys()
+    matches = [
+        lid for lid in keys
+        if lid in lotteries and (not open_only or lotteries[lid].get('status') == 'open')
+    ]
+    # Newest lotteries first (IDs are sequential)
+    best = heapq.nlargest(MAX_CHOICES, matches, key=int)
+    return [
+        app_commands.Choice(name=_choice_label(f"#{lid}", lotteries[lid]['name']), value=lid)
+        for lid in best
+    ]
 
 
 # ---------------------------------------------------------------------------
-# Reminder loop
+# Extension reload
 # ---------------------------------------------------------------------------
+_section('Extension reload')
 
-@tasks.loop(minutes=1)
-async def check_events():
-    """Send 1h and 30m reminders for upcoming events."""
-    data = load_data()
-    now = datetime.now()
-
-    changed = False
-    for eid, event in data['events'].items():
-        if event.get('status') != 'open':
-            continue
-
-        event_unix = event['unix_ts']
-        now_unix   = int(now.timestamp())
-        channel    = bot.get_channel(event['channel_id'])
-        if not channel:
-            continue
-
-        if not event.get('reminded_1h') and now_unix >= event_unix - 3600:
-            await _send_reminder(channel, event, "1 hour")
-            event['reminded_1h'] = True
-            changed = True
-
-        if not event.get('reminded_30m') and now_unix >= event_unix - 1800:
-            await _send_reminder(channel, event, "30 minutes")
-            event['reminded_30m'] = True
-            changed = True
-
-        if (not event.get('dm_sent')
-                and event.get('point_value', 0) > 0
-                and event.get('participants')
-                and now_unix >= event_unix + 7200):
-            await _send_attendance_dm(eid, event)
-            event['dm_sent'] = True
-            changed = True
+async def _is_operator(interaction: discord.Interaction) -> bool:
+    """Bot owner, or officer of PRIMARY_GUILD_ID: may run commands that affect every guild."""
+    return await bot.is_owner(interaction.user) or bool(
+        PRIMARY_GUILD_ID and interaction.guild_id == int(PRIMARY_GUILD_ID) and _is_officer(interaction)
+    )
 
-    if changed:
-        save_data(data)
 
-async def _send_reminder(channel, event: dict, time_left: str):
-    participants = event.get('participants', {})
-    if not participants:
-        return
-    mentions = " ".join(f"<@{uid}>" for uid in participants)
-    embed = discord.Embed(
-        title=f"⏰ Reminder: {event['name']}",
-        description=f"Starting in {time_left}!",
-        color=0xff9900
-    )
-    await channel.send(mentions, embed=embed)
 
-async def _send_attendance_dm(eid: str, event: dict):
-    """DM the event creator 2 hours after start to confirm attendance and award points."""
-    creator_id = event.get('creator_id')
-    if not creator_id:
+@bot.tree.command(name="reload", description="Reload one part of the bot in place (bot owner / primary-guild officers)")
+@app_commands.choices(extension=[app_commands.Choice(name=name, value=name) for name in EXTENSIONS])
+async def reload_extension(interaction: discord.Interaction, extension: app_commands.Choice[str], sync: bool = False):
+    # Reloading changes the bot for every guild, not just this one
+    if not await _is_operator(interaction):
+        await interaction.response.send_message("❌ Only the bot owner or primary-guild officers can reload.", ephemeral=True)
         return
+    await interaction.response.defer(ephemeral=True)
+    started = time.perf_counter()
     try:
-        user = await bot.fetch_user(creator_id)
-        embed = discord.Embed(
-            title=f"📋 Attendance Check: {event['name']}",
-            description=(
-                f"This event started 2 hours ago.\n"
-                f"Select who attended to award **{event['point_value']} points** each."
-            ),
-            color=0xf39c12
-        )
-        await user.send(embed=embed, view=AttendanceConfirmView(eid, event))
-    except discord.Forbidden:
-        print(f"Could not DM creator for event {eid} — DMs likely disabled.")
-    except Exception as e:
-        print(f"Failed to send attendance DM for event {eid}: {e}")
+        # Atomic: if the new code fails to import or set up, the old version stays loaded
+        await bot.reload_extension(f"extensions.{extension.value}")
+    except commands.ExtensionError as e:
+        await interaction.followup.send(f"❌ Reload of `{extension.value}` failed: {e}", ephemeral=True)
+        return
+    took = (time.perf_counter() - started) * 1000
+    synced = ""
+    if sync:   # only needed when a command's name, options or description changed
+        synced = f", synced {len(await bot.tree.sync())} commands"
+    log.info("Reloaded extension", extra={'extension': extension.value, 'duration_ms': round(took, 1)})
+    await interaction.followup.send(f"🔄 Reloaded `{extension.value}` in {took:.0f} ms{synced}.", ephemeral=True)
 
 
 # ---------------------------------------------------------------------------
-# Lottery system
+# Memory report — resident size, and Python allocations by subsystem
 # ---------------------------------------------------------------------------
+#
+# Start the process with PYTHONTRACEMALLOC=<frames> (e.g. 10) to trace allocations from the
+# first import; tracing roughly doubles the cost of each allocation, so it stays off by default.
+# Each traced block is charged to the innermost frame in our code or a known library, so a
+# dict that json builds while a store loads counts against the core section that loaded it. Core
+# sections are the spans between the _section() markers under this file's banners.
+_section('Memory report')
 
-@bot.tree.command(name="create_lottery", description="Create a new points lottery (officers only)")
-async def create_lottery(interaction: discord.Interaction):
-    if not _is_officer(interaction):
-        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
-        return
-    await interaction.response.send_modal(CreateLotteryModal())
+MEMORY_REPORT_TOP = 12
+_LIBRARIES = {'discord': 'discord.py', 'aiohttp': 'aiohttp', 'yarl': 'aiohttp', 'multidict': 'aiohttp',
+              'numpy': 'numpy'}
 
 
-class CreateLotteryModal(discord.ui.Modal, title='Create Lottery'):
-    lottery_name = discord.ui.TextInput(
-        label='Lottery Name',
-        placeholder='e.g. March 2026 Lottery',
-        max_length=100
-    )
-    prizes = discord.ui.TextInput(
-        label='Prizes (one per line, best prize first)',
-        placeholder='500g\n250g\nLegendary weapon skin',
-        style=discord.TextStyle.paragraph,
-        max_length=1000
-    )
-
-    async def on_submit(self, interaction: discord.Interaction):
-        prize_list = [p.strip() for p in self.prizes.value.strip().splitlines() if p.strip()]
-        if not prize_list:
-            await interaction.response.send_message("❌ At least one prize is required.", ephemeral=True)
-            return
+def _rss_bytes():
+    """Current resident set size, or None where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _subsystem(filename: str, lineno: int):
+    """Name of the part of the bot a source line belongs to, or None for the stdlib."""
+    if filename == __file__:
+        starts, titles = _SECTIONS
+        return "core: " + titles[bisect.bisect_right(starts, lineno) - 1]
+    parts = filename.replace('\\', '/').split('/')
+    if 'extensions' in parts[:-1] and parts[-1].endswith('.py'):
+        return "extensions." + parts[-1][:-3]
+    for part in parts:
+        if part in _LIBRARIES:
+            return _LIBRARIES[part]
+    return None
+
+
+def memory_report() -> dict:
+    """Resident size plus, when tracing, traced bytes per subsystem. Takes seconds on a heap
+    of a million blocks: run it in a thread."""
+    report = {'rss': _rss_bytes(), 'traced': None, 'subsystems': []}
+    if not tracemalloc.is_tracing():
+        return report
+    charged, owners = {}, {}
+    for stat in tracemalloc.take_snapshot().statistics('traceback'):   # one entry per distinct call stack
+        owner = 'Python stdlib / interpreter'
+        for frame in reversed(stat.traceback):      # innermost first
+            where = (frame.filename, frame.lineno)
+            if where not in owners:
+                owners[where] = _subsystem(frame.filename, frame.lineno)
+            if owners[where]:
+                owner = owners[where]
+                break
+        charged[owner] = charged.get(owner, 0) + stat.size
+    report['traced']     = sum(charged.values())
+    report['subsystems'] = sorted(charged.items(), key=lambda kv: -kv[1])
+    return report
+
+
+def _mb(n) -> str:
+    return "n/a" if n is None else f"{n / 1e6:.1f} MB"
+
+
+@bot.tree.command(name="memory", description="Show the bot's memory use by subsystem (bot owner / primary-guild officers)")
+async def memory_command(interaction: discord.Interaction):
+    if not await _is_operator(interaction):
+        await interaction.response.send_message("❌ Only the bot owner or primary-guild officers can see this.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
+    report = await asyncio.to_thread(memory_report)
+
+    embed = discord.Embed(title="🧠 Memory", color=0x0099ff, description=(
+        f"**Resident:** {_mb(report['rss'])}  •  **Traced Python allocations:** {_mb(report['traced'])}"
+    ))
+    if report['subsystems']:
+        top  = report['subsystems'][:MEMORY_REPORT_TOP]
+        rest = sum(size for _, size in report['subsystems'][MEMORY_REPORT_TOP:])
+        lines = [f"{name} — {_mb(size)}" for name, size in top] + ([f"everything else — {_mb(rest)}"] if rest else [])
+        embed.add_field(name="By subsystem", value="\n".join(lines), inline=False)
+    else:
+        embed.add_field(name="By subsystem",
+                        value="Start the bot with `PYTHONTRACEMALLOC=10` for a breakdown.", inline=False)
+    loaded = stores.loaded()
+    embed.add_field(name="Gateway cache", inline=False, value=(
+        f"Intents: {GATEWAY_INTENTS}  •  members: {MEMBER_CACHE}  •  messages: {MAX_MESSAGES or 'off'}\n"
+        f"{len(bot.guilds)} guilds, {len(bot.users)} users, "
+        f"{sum(len(g.members) for g in bot.guilds)} members, {len(bot.cached_messages)} messages cached"
+    ))
+    embed.add_field(name="Guild stores", inline=False, value=(
+        f"{len(loaded)} loaded, {sum(len(st.view.events) for _, st in loaded)} events, "
+        f"{sum(len(st.view.players) for _, st in loaded)} players"
+    ))
+    await interaction.followup.send(embed=embed, ephemeral=True)
 
-        data = load_data()
-        lid  = next_lottery_id(data)
-        data['lotteries'][lid] = {
-            'name':    self.lottery_name.value.strip(),
-            'prizes':  prize_list,
-            'status':  'open',
-            'winners': []
-        }
-        save_data(data)
 
-        prizes_display = "\n".join(f"{i+1}. {p}" for i, p in enumerate(prize_list))
-        await interaction.response.send_message(
-            f"✅ Lottery **{self.lottery_name.value.strip()}** created (ID: `{lid}`).\n\n**Prizes:**\n{prizes_display}",
-            ephemeral=True
-        )
+# ---------------------------------------------------------------------------
+# Calendar feeds — open events as iCalendar, re-rendered only when they change
+# ---------------------------------------------------------------------------
+#
+# Calendar apps poll a subscribed URL every few minutes. Each feed keeps its rendered body with
+# the inputs it was rendered from; a poll re-renders only if those inputs changed, and a client
+# that already has this version (If-None-Match / If-Modified-Since) gets an empty 304.
+# Only the leader serves feeds and the API: a standby's cached stores go stale as soon as the
+# leader saves, so it answers 503 and the client retries against whichever replica leads.
+_section('Calendar feeds')
+
+PUBLIC_URL           = os.getenv('PUBLIC_URL') or (
+    f"https://{os.environ['RAILWAY_PUBLIC_DOMAIN']}" if os.getenv('RAILWAY_PUBLIC_DOMAIN') else None
+)
+CALENDAR_SECRET      = os.getenv('CALENDAR_SECRET') or os.getenv('BOT_TOKEN') or ''   # signs feed and API URLs; none: both off
+CALENDAR_EVENT_HOURS = 2      # events store only a start time; calendars need an end
+CALENDAR_REFRESH     = 'PT15M'
+MAX_CACHED_FEEDS     = 1000
+_STANDBY_HEADERS     = {'Retry-After': str(LEADER_HEARTBEAT_SECONDS)}
+
+
+def _url_token(guild_id: int, scope: str = None) -> str:
+    """Secret part of a feed or API URL, so a guild or user id alone doesn't expose the schedule.
+    `scope` is the member id of a personal feed, or 'api'."""
+    message = f"{guild_id}:{scope or ''}".encode()
+    return hmac.new(CALENDAR_SECRET.encode(), message, hashlib.sha256).hexdigest()[:24]
+
+
+def _token_ok(token: str, guild_id: int, scope: str = None) -> bool:
+    """Constant-time check of a URL token. Compared as bytes: compare_digest rejects non-ASCII str."""
+    return hmac.compare_digest(token.encode(), _url_token(guild_id, scope).encode())
+
+
+def calendar_url(guild_id: int, user_id: str = None):
+    """Subscribable URL of a guild's feed (or one member's signups), or None without PUBLIC_URL
+    or a CALENDAR_SECRET to sign it with."""
+    if not PUBLIC_URL or not CALENDAR_SECRET:
+        return None
+    path = f"/calendar/{guild_id}/{user_id}.ics" if user_id else f"/calendar/{guild_id}.ics"
+    return f"{PUBLIC_URL.rstrip('/')}{path}?token={_url_token(guild_id, user_id)}"
+
+
+def _ics_text(value: str) -> str:
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+                 .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _ics_fold(line: str) -> str:
+    """Split a content line into 75-octet pieces joined by CRLF + space (RFC 5545 §3.1)."""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line
+    pieces, start, limit = [], 0, 75
+    while start < len(raw):
+        end = min(start + limit, len(raw))
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:   # don't split a UTF-8 sequence
+            end -= 1
+        pieces.append(raw[start:end].decode())
+        start, limit = end, 74                                 # continuation lines start with a space
+    return "\r\n ".join(pieces)
+
+
+def _ics_time(unix: int) -> str:
+    return datetime.fromtimestamp(unix, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _feed_inputs(st: Store, guild_id: int, user_id: str = None) -> tuple:
+    """Everything a feed renders, as a hashable tuple. Equal inputs mean an identical feed."""
+    events = st.view.events
+    if user_id:
+        timeline = st.event_index.open_by_time
+        eids     = sorted((eid for eid in st.event_index.by_user.get(user_id, ()) if eid in timeline),
+                          key=timeline.value)
+    else:
+        eids = st.event_index.open_by_time.range()
+    inputs = []
+    for eid in eids:
+        e = events.get(eid)
+        if e is None or e['status'] != 'open':
+            continue
+        p = e['participants'].get(user_id) if user_id else None
+        if user_id and p is None:
+            continue
+        inputs.append((
+            eid, e['name'], e['unix_ts'], e.get('description') or '', e.get('boss'), e.get('type'),
+            e.get('channel_id'), e.get('message_id'),
+            (p['role'], p.get('boon'), p.get('special_role')) if p else None,
+        ))
+    guild = bot.get_guild(guild_id)
+    return (guild.name if guild else None, tuple(inputs))
+
+
+def _render_calendar(guild_id: int, inputs: tuple, stamp: int) -> bytes:
+    guild_name, events = inputs
+    title = f"{guild_name or 'KDS'} events"
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//KDS Bot//Event calendar//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_ics_text(title)}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{CALENDAR_REFRESH}",
+        f"X-PUBLISHED-TTL:{CALENDAR_REFRESH}",
+    ]
+    for eid, name, unix_ts, description, boss, etype, channel_id, message_id, signup in events:
+        details = [d for d in (boss, EVENT_TYPE_LABELS.get(etype), description) if d]
+        if signup:
+            role, boon, special = signup
+            details.insert(0, "Signed up as " + str(role) + (f" [{boon}]" if boon else "")
+                           + (f" — {special}" if special else ""))
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{guild_id}-{eid}@kds-bot",
+            f"DTSTAMP:{_ics_time(stamp)}",
+            f"DTSTART:{_ics_time(unix_ts)}",
+            f"DTEND:{_ics_time(unix_ts + CALENDAR_EVENT_HOURS * 3600)}",
+            f"SUMMARY:{_ics_text(name)}",
+        ]
+        if details:
+            lines.append(f"DESCRIPTION:{_ics_text(chr(10).join(details))}")
+        if channel_id and message_id:
+            lines.append(f"URL:https://discord.com/channels/{guild_id}/{channel_id}/{message_id}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(_ics_fold(line) for line in lines) + "\r\n").encode()
+
+
+class CachedFeed:
+    """One rendered feed plus what it was rendered from."""
+    __slots__ = ('view', 'inputs', 'etag', 'last_modified', 'body')
+
+    def __init__(self, view, inputs: tuple, etag: str, last_modified: int, body: bytes):
+        self.view          = view
+        self.inputs        = inputs
+        self.etag          = etag
+        self.last_modified = last_modified
+        self.body          = body
+
+
+class LruCache:
+    """Dict capped at `size` entries, dropping the least recently used."""
+    def __init__(self, size: int):
+        self.size   = size
+        self._items = {}   # insertion order doubles as recency order
+
+    def get(self, key):
+        value = self._items.pop(key, None)
+        if value is not None:
+            self._items[key] = value
+        return value
+
+    def put(self, key, value) -> None:
+        self._items.pop(key, None)
+        self._items[key] = value
+        while len(self._items) > self.size:
+            del self._items[next(iter(self._items))]
+
+
+_feeds = LruCache(MAX_CACHED_FEEDS)   # (guild_id, user_id) -> CachedFeed
+
+
+def calendar_feed(st: Store, guild_id: int, user_id: str = None) -> CachedFeed:
+    """The current feed, reusing the cached render while the snapshot — or failing that, the
+    rendered inputs — are unchanged."""
+    key  = (guild_id, user_id)
+    feed = _feeds.get(key)
+    view = st.view
+    if feed is None or feed.view is not view:
+        inputs = _feed_inputs(st, guild_id, user_id)
+        if feed is None or feed.inputs != inputs:
+            # Hash of the inputs rather than the body, so the tag survives restarts and matches
+            # across replicas even though DTSTAMP doesn't
+            etag = '"' + hashlib.sha256(repr(inputs).encode()).hexdigest()[:32] + '"'
+            now  = int(time.time())
+            feed = CachedFeed(view, inputs, etag, now, _render_calendar(guild_id, inputs, now))
+            _feeds.put(key, feed)
+        else:
+            feed.view = view
+    return feed
+
+
+def _not_modified(request, etag: str, last_modified: int) -> bool:
+    """Whether the client's conditional headers match this version (If-None-Match wins)."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')} \
+            or if_none_match.strip() == '*'
+    since = request.if_modified_since
+    return since is not None and last_modified <= since.timestamp()
+
+
+async def calendar_handler(request):
+    guild_id = int(request.match_info['guild_id'])
+    user_id  = request.match_info.get('user_id')
+    if not CALENDAR_SECRET:
+        raise web.HTTPServiceUnavailable()   # unsigned tokens could be forged for any guild
+    if not _token_ok(request.query.get('token', ''), guild_id, user_id):
+        raise web.HTTPNotFound()
+    if not leader.is_leader:
+        raise web.HTTPServiceUnavailable(headers=_STANDBY_HEADERS)
+    st   = await stores.enter(guild_id)
+    feed = calendar_feed(st, guild_id, user_id)
+    headers = {
+        'ETag':          feed.etag,
+        'Last-Modified': email.utils.formatdate(feed.last_modified, usegmt=True),
+        'Cache-Control': 'private, max-age=300',
+    }
+    if _not_modified(request, feed.etag, feed.last_modified):
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=feed.body, content_type='text/calendar', charset='utf-8', headers=headers)
 
 
-@bot.tree.command(name="draw_lottery", description="Draw lottery winners and reset all points (officers only)")
-async def draw_lottery(interaction: discord.Interaction, lottery_id: str):
-    if not _is_officer(interaction):
-        await interaction.response.send_message("❌ Officers only.", ephemeral=True)
-        return
+# ---------------------------------------------------------------------------
+# JSON API — read-only views of one guild's state for websites
+# ---------------------------------------------------------------------------
+#
+# Everything is served from the published snapshot and the in-memory indexes, never from disk.
+# A response is rendered once per snapshot and kept with its gzipped copy; while the snapshot
+# stays the same, repeat requests are a cache lookup, and clients holding the current ETag get
+# an empty 304.
+_section('JSON API')
+
+API_PER_PAGE       = 20
+API_MAX_PER_PAGE   = 100
+API_GZIP_MIN_BYTES = 1024   # smaller bodies aren't worth compressing
+MAX_CACHED_API     = 2000
+API_STATUSES       = ('open', 'closed', 'all')
+API_CORS           = {   # website widgets call the API from the browser
+    'Access-Control-Allow-Origin':   '*',
+    'Access-Control-Expose-Headers': 'ETag, Last-Modified',
+}
 
-    data    = load_data()
-    lottery = data['lotteries'].get(lottery_id)
-    if not lottery:
-        await interaction.response.send_message(f"❌ Lottery `{lottery_id}` not found.", ephemeral=True)
-        return
-    if lottery['status'] == 'drawn':
-        await interaction.response.send_message(f"❌ Lottery `{lottery_id}` has already been drawn.", ephemeral=True)
-        return
 
-    # Build the weighted draw pool — more points = more chances
-    pool    = [(uid, p) for uid, p in data['players'].items() if p['points'] > 0]
-    if not pool:
-        await interaction.response.send_message("❌ No players have points yet — cannot draw.", ephemeral=True)
-        return
+class CachedResponse:
+    __slots__ = ('view', 'etag', 'last_modified', 'body', 'gzipped')
 
-    weights = [p['points'] for _, p in pool]
-    winners = []
+    def __init__(self, view, etag: str, last_modified: int, body: bytes):
+        self.view          = view
+        self.etag          = etag
+        self.last_modified = last_modified
+        self.body          = body
+        self.gzipped       = gzip.compress(body, 6) if len(body) >= API_GZIP_MIN_BYTES else None
 
-    for prize in lottery['prizes']:
-        if not pool:
-            break
-        # Pick one winner from the remaining pool, weighted by points
-        idx              = random.choices(range(len(pool)), weights=weights, k=1)[0]
-        winner_uid, winner_data = pool[idx]
-        winners.append({'uid': winner_uid, 'name': winner_data['name'], 'prize': prize})
-        # Remove winner so they can't win a second prize
-        pool.pop(idx)
-        weights.pop(idx)
-
-    # Persist results and reset all points
-    lottery['status']  = 'drawn'
-    lottery['winners'] = winners
-    for uid in data['players']:
-        data['players'][uid]['points'] = 0
-    save_data(data)
-
-    # Public announcement embed
-    medals = {1: '🥇', 2: '🥈', 3: '🥉'}
-    lines  = [
-        f"{medals.get(i, f'**{i}.**')} <@{w['uid']}> — **{w['prize']}**"
-        for i, w in enumerate(winners, start=1)
-    ]
-    embed = discord.Embed(
-        title=f"🎉 {lottery['name']} — Results!",
-        description="\n".join(lines) if lines else "No eligible players.",
-        color=0xf1c40f
-    )
-    embed.set_footer(text="All points have been reset to 0. Good luck next time!")
-    await interaction.response.send_message(embed=embed)
 
+_api_responses = LruCache(MAX_CACHED_API)   # (guild_id, path, query) -> CachedResponse
 
-# ---------------------------------------------------------------------------
-# Utility commands
-# ---------------------------------------------------------------------------
 
-@bot.tree.command(name="list_events", description="Show all open events")
-async def list_events(interaction: discord.Interaction):
-    data   = load_data()
-    now_ts = int(datetime.utcnow().timestamp())
-    open_events = {
-        eid: e for eid, e in data['events'].items()
-        if e.get('status') == 'open'
-    }
+def _api_page(params, total: int) -> tuple:
+    """(start, per_page, envelope) for ?page=&per_page=, 1-based. Raises ValueError."""
+    try:
+        page     = int(params.get('page', 1))
+        per_page = int(params.get('per_page', API_PER_PAGE))
+    except ValueError:
+        raise ValueError("page and per_page must be whole numbers") from None
+    if page < 1 or not 1 <= per_page <= API_MAX_PER_PAGE:
+        raise ValueError(f"page must be >= 1 and per_page between 1 and {API_MAX_PER_PAGE}")
+    envelope = {'page': page, 'per_page': per_page, 'total': total, 'pages': -(-total // per_page)}
+    return (page - 1) * per_page, per_page, envelope
 
-    if not open_events:
-        await interaction.response.send_message("No open events right now.", ephemeral=True)
-        return
 
-    embed = discord.Embed(title="📅 Open Events", color=0x0099ff)
-    for eid, e in open_events.items():
-        ts         = e['unix_ts']
-        signed_up  = len(e.get('participants', {}))
-        total_slots = sum(e['role_limits'].values())
-        boss_line  = f"**Boss:** {e['boss']}\n" if e.get('boss') else ""
-        embed.add_field(
-            name=f"{e['name']}  (ID: {eid})",
-            value=(
-                f"{boss_line}"
-                f"**When:** {unix_to_discord_ts(ts, 'F')}\n"
-                f"**Signed up:** {signed_up}/{total_slots}"
-            ),
-            inline=False
-        )
+def _event_url(guild_id: int, event) -> str:
+    if event.get('channel_id') and event.get('message_id'):
+        return f"https://discord.com/channels/{guild_id}/{event['channel_id']}/{event['message_id']}"
+    return None
 
-    await interaction.response.send_message(embed=embed, ephemeral=True)
 
+def _api_event_summary(guild_id: int, eid: str, e) -> dict:
+    return {
+        'id':        eid,
+        'name':      e['name'],
+        'start':     e['unix_ts'],
+        'start_utc': datetime.fromtimestamp(e['unix_ts'], timezone.utc).isoformat(),
+        'type':      e.get('type'),
+        'boss':      e.get('boss'),
+        'wing':      e.get('wing'),
+        'status':    e['status'],
+        'signed_up': len(e.get('participants', {})),
+        'capacity':  sum(e['role_limits'].values()) or None,
+        'waitlist':  sum(len(queue) for queue in e.get('waitlist', {}).values()),
+        'url':       _event_url(guild_id, e),
+    }
 
-@bot.tree.command(name="leaderboard", description="Show the points leaderboard")
-async def leaderboard(interaction: discord.Interaction):
-    data    = load_data()
-    players = data.get('players', {})
 
-    if not players:
-        await interaction.response.send_message("No points recorded yet.", ephemeral=True)
-        return
+async def _api_events(st: Store, guild_id: int, params, match) -> dict:
+    status = params.get('status', 'open')
+    if status not in API_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(API_STATUSES)}")
+    index = st.event_index
+    if status == 'open':
+        eids = index.open_by_time.range()
+    else:
+        eids = index.by_time.range()
+        if status == 'closed':
+            eids = [eid for eid in eids if eid not in index.open_by_time]
+    start, per_page, envelope = _api_page(params, len(eids))
+    events = st.view.events
+    envelope['items'] = [_api_event_summary(guild_id, eid, events[eid])
+                         for eid in eids[start:start + per_page] if eid in events]
+    return envelope
+
+
+async def _api_event(st: Store, guild_id: int, params, match) -> dict:
+    eid = match['event_id']
+    e   = st.view.events.get(eid)
+    if e is None:
+        raise LookupError(f"event {eid} not found")
+    return dict(
+        _api_event_summary(guild_id, eid, e),
+        description  = e.get('description') or '',
+        point_value  = e.get('point_value'),
+        role_limits  = dict(e['role_limits']),
+        boon_limits  = dict(e.get('boon_limits', {})),
+        participants = [
+            {'user_id': uid, 'name': p['name'], 'role': p['role'], 'boon': p.get('boon'),
+             'special_role': p.get('special_role')}
+            for uid, p in e.get('participants', {}).items()
+        ],
+    )
 
-    sorted_players = sorted(players.values(), key=lambda p: p['points'], reverse=True)
 
-    embed = discord.Embed(title="🏆 Points Leaderboard", color=0xf1c40f)
-    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
-    lines  = []
-    for i, p in enumerate(sorted_players[:15], start=1):
-        prefix = medals.get(i, f"`{i}.`")
-        lines.append(f"{prefix} **{p['name']}** — {p['points']} pts  *(attended {p['events_attended']})*")
+def _api_player_summary(rank: int, uid: str, p) -> dict:
+    return {'rank': rank, 'user_id': uid, 'name': p['name'], 'points': p['points'],
+            'lottery_weight': round(lottery_weight(p, time.time()), 2),
+            'events_attended': p['events_attended']}
+
+
+async def _api_leaderboard(st: Store, guild_id: int, params, match) -> dict:
+    index   = st.player_rank
+    players = st.view.players
+    start, per_page, envelope = _api_page(params, len(index))
+    envelope['items'] = [_api_player_summary(rank, uid, players[uid])
+                         for rank, uid in enumerate(index.page(start, per_page), start=start + 1)
+                         if uid in players]
+    return envelope
+
+
+async def _api_player(st: Store, guild_id: int, params, match) -> dict:
+    uid = match['user_id']
+    p   = st.view.players.get(uid)
+    if p is None or uid not in st.player_rank:
+        raise LookupError(f"player {uid} not found")
+    timeline = st.event_index.open_by_time
+    upcoming = sorted((eid for eid in st.event_index.by_user.get(uid, ()) if eid in timeline),
+                      key=timeline.value)
+    stats    = await asyncio.to_thread(st.analytics.stats, st.view)
+    return dict(
+        _api_player_summary(st.player_rank.position(uid) + 1, uid, p),
+        upcoming_events = upcoming,
+        attendance      = stats.player(uid),
+    )
 
-    embed.description = "\n".join(lines)
-    await interaction.response.send_message(embed=embed)
 
+def api_route(build):
+    """aiohttp handler for one endpoint: token check, per-snapshot cache, ETag, gzip."""
+    async def handler(request):
+        guild_id = int(request.match_info['guild_id'])
+        token    = request.query.get('token') or request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not CALENDAR_SECRET:   # unsigned tokens could be forged for any guild
+            return web.json_response({'error': 'API not configured'}, status=503, headers=API_CORS)
+        if not _token_ok(token, guild_id, 'api'):
+            return web.json_response({'error': 'not found'}, status=404, headers=API_CORS)
+        if not leader.is_leader:
+            return web.json_response({'error': 'standby replica, try again shortly'}, status=503,
+                                     headers=dict(API_CORS, **_STANDBY_HEADERS))
+        st     = await stores.enter(guild_id)
+        params = {k: v for k, v in request.query.items() if k != 'token'}
+        key    = (guild_id, request.path, tuple(sorted(params.items())))
+        cached = _api_responses.get(key)
+        if cached is None or cached.view is not st.view:
+            try:
+                payload = await build(st, guild_id, params, request.match_info)
+            except LookupError as e:
+                return web.json_response({'error': str(e)}, status=404, headers=API_CORS)
+            except ValueError as e:
+                return web.json_response({'error': str(e)}, status=400, headers=API_CORS)
+            body = json.dumps(payload, separators=(',', ':')).encode()
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            if cached is not None and cached.etag == etag:
+                cached.view = st.view   # a save that didn't touch this response
+            else:
+                cached = CachedResponse(st.view, etag, int(time.time()), body)
+                _api_responses.put(key, cached)
+
+        gzipped = cached.gzipped is not None and 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag    = cached.etag[:-1] + '-gz"' if gzipped else cached.etag   # each encoding is its own representation
+        headers = dict(API_CORS, **{
+            'ETag':          etag,
+            'Last-Modified': email.utils.formatdate(cached.last_modified, usegmt=True),
+            'Cache-Control': 'public, max-age=30',
+            'Vary':          'Accept-Encoding',
+        })
+        if _not_modified(request, etag, cached.last_modified):
+            return web.Response(status=304, headers=headers)
+        if gzipped:
+            headers['Content-Encoding'] = 'gzip'
+        return web.Response(body=cached.gzipped if gzipped else cached.body, content_type='application/json',
+                            headers=headers)
+    return handler
+
+
+def api_url(guild_id: int):
+    """Base URL of a guild's API with its token, or None without PUBLIC_URL or CALENDAR_SECRET."""
+    if not PUBLIC_URL or not CALENDAR_SECRET:
+        return None
+    return f"{PUBLIC_URL.rstrip('/')}/api/{guild_id}/events?token={_url_token(guild_id, 'api')}"
 
-@bot.tree.command(name="my_points", description="Check your own point total (private)")
-async def my_points(interaction: discord.Interaction):
-    data   = load_data()
-    uid    = str(interaction.user.id)
-    player = data['players'].get(uid)
 
-    if not player:
-        await interaction.response.send_message(
-            "You don't have any points yet — attend an event to earn some!", ephemeral=True
-        )
-        return
+# ---------------------------------------------------------------------------
+# HTTP server — Railway keepalive, calendar feeds and the JSON API, on the bot's event loop
+# ---------------------------------------------------------------------------
+_section('HTTP server')
 
-    embed = discord.Embed(
-        title="📊 Your Points",
-        description=(
-            f"**Points:** {player['points']}\n"
-            f"**Events attended:** {player['events_attended']}"
-        ),
-        color=0x2ecc71
-    )
-    await interaction.response.send_message(embed=embed, ephemeral=True)
-
-
-@bot.tree.command(name="status", description="Show bot status and uptime")
-async def status_command(interaction: discord.Interaction):
-    data     = load_data()
-    now      = datetime.utcnow()
-    now_unix = int(now.timestamp())
-    uptime   = now - bot.start_time
-    h, rem   = divmod(int(uptime.total_seconds()), 3600)
-    m, s     = divmod(rem, 60)
-
-    total_events    = len(data['events'])
-    upcoming_events = sum(
-        1 for e in data['events'].values()
-        if e.get('status') == 'open' and e['unix_ts'] > now_unix
-    )
-    total_players = len(data['players'])
+HTTP_PORT = int(os.environ.get('PORT', 8080))
 
-    embed = discord.Embed(title="📡 KDS Bot Status", color=0x00ff00)
-    embed.add_field(name="🟢 Status",   value="Online",                          inline=True)
-    embed.add_field(name="⏱ Uptime",   value=f"{h}h {m}m {s}s",                inline=True)
-    embed.add_field(name="📅 Events",   value=f"Upcoming: {upcoming_events}  •  Total: {total_events}", inline=False)
-    embed.add_field(name="👥 Players",  value=str(total_players),               inline=True)
-    embed.add_field(name="⏰ Reminders", value="Running ✅" if check_events.is_running() else "Stopped ❌", inline=True)
 
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+async def keepalive_handler(request):
+    return web.Response(text="KDS Bot is running!", content_type='text/html')
 
 
-@bot.tree.command(name="pizza", description="Sometimes motivational...sometimes funny and sometimes not.")
-async def pizza_command(interaction: discord.Interaction):
-    await interaction.response.defer()
-    if interaction.user.id == 271986635674091531:
-        category = random.randint(0, 1)  # dad joke or motivational only (no insults or despair)
-    else:
-        category = random.randint(0, 3)
-    try:
-        async with aiohttp.ClientSession() as session:
-            if category == 0:
-                async with session.get("https://icanhazdadjoke.com/", headers={"Accept": "application/json"}) as resp:
-                    data = await resp.json()
-                    content = data["joke"]
-            elif category == 1:
-                async with session.get("https://zenquotes.io/api/random") as resp:
-                    data = await resp.json()
-                    content = f'"{data[0]["q"]}" — {data[0]["a"]}'
-            elif category == 2:
-                async with session.get(
-                    "https://www.reddit.com/r/DepressingFacts/top.json?limit=25&t=week",
-                    headers={"User-Agent": "KDS-Bot/1.0"}
-                ) as resp:
-                    data = await resp.json()
-                    posts = data["data"]["children"]
-                    content = random.choice(posts)["data"]["title"]
-            else:
-                async with session.get("https://evilinsult.com/generate_insult.php?lang=en&type=json") as resp:
-                    data = await resp.json()
-                    content = data["insult"]
-    except Exception:
-        content = "Something went wrong. The universe is as broken as your build."
-    await interaction.followup.send(content)
+def web_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get('/', keepalive_handler)
+    app.router.add_get(r'/calendar/{guild_id:\d+}.ics', calendar_handler)
+    app.router.add_get(r'/calendar/{guild_id:\d+}/{user_id:\d+}.ics', calendar_handler)
+    app.router.add_get(r'/api/{guild_id:\d+}/events', api_route(_api_events))
+    app.router.add_get(r'/api/{guild_id:\d+}/events/{event_id}', api_route(_api_event))
+    app.router.add_get(r'/api/{guild_id:\d+}/leaderboard', api_route(_api_leaderboard))
+    app.router.add_get(r'/api/{guild_id:\d+}/players/{user_id:\d+}', api_route(_api_player))
+    return app
 
 
-@bot.tree.command(name="help", description="Show available commands")
-async def help_command(interaction: discord.Interaction):
-    embed = discord.Embed(
-        title="❓ KDS Bot Help",
-        description="Guild Wars 2 raid event management and points tracking.",
-        color=0x0099ff
-    )
-    embed.add_field(
-        name="📅 Events",
-        value=(
-            "**/create_event** — Create a new event (officers)\n"
-            "**/list_events** — Show all open events\n"
-            "**/edit_event `<id>`** — Edit name, description, or time (officers)\n"
-            "**/delete_event `<id>`** — Delete an event (officers)\n"
-            "**/close_event `<id>`** — Confirm attendance and award points (officers)\n"
-            "**/add_attendee `<id>` `<user>`** — Add a filler to the roster (officers)"
-        ),
-        inline=False
-    )
-    embed.add_field(
-        name="🎯 Signing Up",
-        value=(
-            "Click **Register** on an event embed to sign up\n"
-            "Select your role → boon → special role (if applicable)\n"
-            "Click **Leave Event** to remove yourself"
-        ),
-        inline=False
-    )
-    embed.add_field(
-        name="🏆 Points",
-        value=(
-            "**/leaderboard** — Show top players by points\n"
-            "**/my_points** — Check your own total (private)"
-        ),
-        inline=False
-    )
-    embed.add_field(
-        name="ℹ️ Other",
-        value="**/status** — Bot uptime and stats",
-        inline=False
-    )
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+async def start_web_server() -> web.AppRunner:
+    runner = web.AppRunner(web_app(), access_log=None)   # suppress noisy HTTP logs
+    await runner.setup()
+    await web.TCPSite(runner, port=HTTP_PORT).start()
+    log.info("HTTP server running", extra={'port': HTTP_PORT})
+    if not CALENDAR_SECRET:
+        log.warning("No CALENDAR_SECRET or BOT_TOKEN to sign links with: calendar feeds and the API are off")
+    return runner
 
 
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
+_section('Entry point')
+
+async def main():
+    # Redeploys stop the old container with SIGTERM: close cleanly so the lease is released
+    # and the new replica takes over within a heartbeat
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, lambda: _spawn(bot.close()))
+    runner = await start_web_server()   # up before the gateway login, for Railway's health check
+    try:
+        async with bot:
+            await bot.start(os.getenv('BOT_TOKEN'))
+    finally:
+        await runner.cleanup()
+
 
 if __name__ == "__main__":
-    print("Starting KDS Bot...")
-    start_server()
-    print("Starting Discord bot...")
-    bot.run(os.getenv('BOT_TOKEN'))
+    listener = setup_logging()
+    log.info("Starting KDS Bot")
+    try:
+        asyncio.run(main())
+    finally:
+        listener.stop()   # flush whatever is still queued
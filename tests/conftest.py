@@ -0,0 +1,61 @@
+"""Shared fixtures. Tests import raid_bot and the extensions straight from the repo root and
+keep all state in pytest's tmp_path; nothing touches /data or Discord."""
+import os
+import sys
+
+os.environ.setdefault('LEADER_BACKEND', 'local')   # before raid_bot reads them
+os.environ.setdefault('CALENDAR_SECRET', 'test-secret')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import raid_bot  # noqa: E402
+
+GUILD_ID = 1234
+
+
+@pytest.fixture
+def leading():
+    """This process holds the (in-memory) leader lease, so stores may save."""
+    raid_bot.leader.renew()
+    assert raid_bot.leader.is_leader
+    yield raid_bot.leader
+    raid_bot.leader.release()
+
+
+@pytest.fixture
+def guild_store(tmp_path, monkeypatch, leading):
+    """An empty store for GUILD_ID under tmp_path, made the current guild."""
+    registry = raid_bot.StoreRegistry(str(tmp_path / 'guilds'))
+    monkeypatch.setattr(raid_bot, 'stores', registry)
+    token = raid_bot._current_guild.set(GUILD_ID)
+    st = registry.get(GUILD_ID)
+    st.data   # loads (empty) and publishes the first snapshot
+    yield st
+    raid_bot._current_guild.reset(token)
+
+
+def make_event(**fields) -> dict:
+    """A raid event in the shape the data file holds, with an empty roster."""
+    event = {
+        'name': 'W1 - Vale Guardian', 'description': '', 'unix_ts': 1_900_000_000,
+        'type': 'raid', 'boss': 'W1 - Vale Guardian', 'wing': 'W1 - Spirit Vale',
+        'role_limits': {'Tank': 1, 'Heal': 2, 'DPS': 7},
+        'boon_limits': {'Alacrity': 2, 'Quickness': 2}, 'special_role_limits': {},
+        'open_signup': False, 'creator_id': 1, 'participants': {}, 'channel_id': None,
+        'message_id': None, 'status': 'open', 'dm_sent': False, 'reminded_1h': False,
+        'reminded_30m': False, 'point_value': 20,
+    }
+    event.update(fields)
+    return event
+
+
+def signup(name: str, role: str, boon=None, special_role=None) -> dict:
+    return {'name': name, 'role': role, 'boon': boon, 'special_role': special_role}
+
+
+def add_event(st, eid: str, **fields) -> raid_bot.Event:
+    """Put an event into the store's live data and indexes."""
+    event = st.data['events'][eid] = raid_bot.Event(make_event(**fields))
+    st.event_index.update(eid, event)
+    return event
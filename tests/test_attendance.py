@@ -0,0 +1,95 @@
+"""Wing-night attendance DMs: every signup is selectable, and confirming a closed night writes nothing."""
+import asyncio
+
+import pytest
+
+from conftest import add_event, signup
+from extensions import attendance
+
+
+class FakeResponse:
+    def __init__(self):
+        self.edits = []
+
+    async def edit_message(self, **kwargs):
+        self.edits.append(kwargs)
+
+
+class FakeInteraction:
+    def __init__(self):
+        self.response = FakeResponse()
+
+
+def _roster(n: int) -> dict:
+    return {f'u{i}': signup(f'Player {i}', 'DPS') for i in range(n)}
+
+
+def test_pages_cover_every_signup_up_to_the_message_limit():
+    event = {'participants': _roster(60)}
+    assert [len(p) for p in attendance._attendance_pages(event)] == [25, 25, 10]
+    event = {'participants': _roster(130)}
+    assert [len(p) for p in attendance._attendance_pages(event)] == [25, 25, 25, 25]
+
+
+def test_chunks_keep_an_event_in_one_message():
+    events = [('1', {'participants': _roster(10)}), ('2', {'participants': _roster(60)}),
+              ('3', {'participants': _roster(5)}), ('4', {'participants': _roster(30)})]
+    chunks = attendance._night_attendance_chunks(events)
+    assert [[eid for eid, _ in chunk] for chunk in chunks] == [['1', '2'], ['3', '4']]
+
+
+def test_night_view_lets_officers_deselect_past_the_25th(guild_store):
+    event = add_event(guild_store, '1', participants=_roster(30), group_id='1')
+
+    async def main():
+        view = attendance.NightAttendanceView([('1', event)])
+        selects = [item for item in view.children if isinstance(item, attendance.NightAttendanceSelect)]
+        assert [len(s.options) for s in selects] == [25, 5]
+        assert len(view.selected['1']) == 30
+
+        second = selects[1]
+        second._values = ['u25', 'u26']            # deselect u27..u29 on the second page
+        await second.callback(FakeInteraction())
+        return view
+
+    view = asyncio.run(main())
+    assert sorted(view.selected['1']) == sorted([f'u{i}' for i in range(27)])
+
+
+def test_confirming_a_closed_night_writes_nothing(guild_store):
+    add_event(guild_store, '1', participants=_roster(2), group_id='1', status='closed')
+    guild_store.save()
+    saved = []
+    guild_store.on_save = saved.append
+
+    async def main():
+        view = attendance.NightAttendanceView([('1', guild_store.data['events']['1'])])
+        interaction = FakeInteraction()
+        await view.confirm.callback(interaction)
+        return interaction
+
+    interaction = asyncio.run(main())
+    assert saved == []
+    assert 'already closed' in interaction.response.edits[0]['content']
+
+
+@pytest.mark.parametrize('status', ['open', 'closed'])
+def test_single_event_confirm_writes_only_when_open(guild_store, status):
+    event = add_event(guild_store, '1', participants=_roster(2), status=status)
+    guild_store.save()
+    saved = []
+    guild_store.on_save = saved.append
+
+    async def main():
+        view = attendance.AttendanceConfirmView('1', event)
+        view.confirmed_uids = ['u0']
+        await view.confirm.callback(FakeInteraction())
+
+    asyncio.run(main())
+    if status == 'open':
+        assert saved == [guild_store]
+        assert guild_store.data['players']['u0']['points'] == 20
+        assert guild_store.data['events']['1']['no_shows'] == ['u1']
+    else:
+        assert saved == []
+        assert 'u0' not in guild_store.data['players']
@@ -0,0 +1,95 @@
+"""Backup chains: after retention thins a base + delta chain, every kept snapshot restores exactly."""
+import json
+import random
+
+import raid_bot
+from conftest import add_event, signup
+
+HOUR = 3600
+DAY  = 24 * HOUR
+T0   = 1_800_000_000
+
+
+def _state(snap: raid_bot.Snapshot) -> dict:
+    """What write_snapshot stores for a snapshot, as plain JSON."""
+    return json.loads(json.dumps(
+        {**snap.counters, 'events': snap.events, 'players': snap.players,
+         'lotteries': snap.lotteries, 'series': snap.series},
+        default=raid_bot._json_default,
+    ))
+
+
+def _mutate(st, rng: random.Random, hour: int) -> None:
+    data = st.data
+    roll = rng.random()
+    if roll < 0.3 or not data['events']:
+        eid = str(data['next_event_id'])
+        data['next_event_id'] += 1
+        add_event(st, eid, unix_ts=T0 + hour * HOUR, participants={})
+    elif roll < 0.7:
+        eid = rng.choice(list(data['events']))
+        uid = f'u{rng.randrange(20)}'
+        raid_bot._set_participant(eid, data['events'][eid], uid, uid.upper(), rng.choice(['Tank', 'Heal', 'DPS']))
+    elif roll < 0.85:
+        uid = f'u{rng.randrange(20)}'
+        player = data['players'].setdefault(uid, raid_bot.Player(name=uid.upper(), points=0, events_attended=0))
+        player['points'] += 10
+    else:
+        eid = rng.choice(list(data['events']))
+        del data['events'][eid]
+        st.event_index.remove(eid)
+    st.save()
+
+
+def test_every_kept_point_restores_after_pruning(guild_store):
+    st       = guild_store
+    rng      = random.Random(38)
+    expected = {}
+    for hour in range(21 * 24):   # reaches the daily and weekly tiers
+        now = T0 + hour * HOUR
+        if hour % 24 == 0:
+            st.backups.digests = None   # a restart: the next snapshot is a new base
+        if rng.random() < 0.8:          # some hours nothing changes
+            _mutate(st, rng, hour)
+        if st.backups.write_snapshot(st.view, now) != 'unchanged':
+            expected[now] = _state(st.view)
+            pruned_at     = now
+
+    points = st.backups.points()
+    kinds  = dict(points)
+    assert len(points) < len(expected)                       # retention thinned the chain...
+    assert {ts for ts, _ in points} == raid_bot._kept_points(points, pruned_at)
+    assert any(kind == 'delta' for kind in kinds.values())   # ...and deltas survived it
+    for ts, _ in points:
+        restored_ts, state = st.backups.state_at(ts)
+        assert restored_ts == ts
+        assert state == expected[ts], f"snapshot at +{(ts - T0) // HOUR}h restored wrong"
+    # a time between snapshots restores the newest one before it
+    assert st.backups.state_at(points[-1][0] + 1) == (points[-1][0], expected[points[-1][0]])
+
+
+def test_dropped_deltas_compose_into_the_next(guild_store):
+    st    = guild_store
+    start = (T0 // DAY + 1) * DAY - HOUR     # the last hour of a day, so its daily bucket keeps it
+    add_event(st, '1', participants={'a': signup('A', 'Tank')})
+    add_event(st, '2', participants={})
+    st.save()
+    st.backups.write_snapshot(st.view, start)
+    expected = {start: _state(st.view)}
+    steps = [
+        lambda data: raid_bot._set_participant('1', data['events']['1'], 'b', 'B', 'DPS'),
+        lambda data: (data['events'].pop('2'), st.event_index.remove('2')),
+        lambda data: raid_bot._remove_participant('1', data['events']['1'], 'a'),
+    ]
+    for hour, step in enumerate(steps, 1):
+        step(st.data)
+        st.save()
+        assert st.backups.write_snapshot(st.view, start + hour * HOUR) == 'delta'
+        expected[start + hour * HOUR] = _state(st.view)
+
+    # two days on the next day's three deltas share one daily bucket: the first two are merged
+    # into the third, which must still carry the deleted event and the earlier signup
+    st.backups.prune(start + 2 * DAY)
+    assert st.backups.points() == [(start, 'base'), (start + 3 * HOUR, 'delta')]
+    for ts, _ in st.backups.points():
+        assert st.backups.state_at(ts) == (ts, expected[ts])
@@ -0,0 +1,85 @@
+"""Data file format: version 1 files still load, and version 2 round-trips under every compression."""
+import json
+
+import pytest
+
+import raid_bot
+from conftest import GUILD_ID, make_event, signup
+
+
+def _raw_data() -> dict:
+    """JSON-shaped data with the awkward cases: optional roster keys, empty rosters, non-ASCII."""
+    return {
+        'next_event_id': 3, 'next_lottery_id': 2, 'next_series_id': 1,
+        'events': {
+            '1': make_event(participants={
+                'a': signup('Ærin', 'Tank'),
+                'b': dict(signup('Bo', 'Heal', 'Alacrity', 'Kite'), flex=True),
+                'c': signup('Çé 🐉', 'DPS', 'Quickness'),
+            }, special_role_limits={'Kite': 1}),
+            '2': make_event(participants={}, status='closed', no_shows=[]),
+        },
+        'players':   {'a': {'name': 'Ærin', 'points': 20, 'events_attended': 1}},
+        'lotteries': {'1': {'name': 'Spring', 'prizes': ['x'], 'status': 'open', 'winners': []}},
+        'series':    {},
+    }
+
+
+@pytest.mark.parametrize('compression', ['none', 'zlib', 'lzma'])
+def test_v2_round_trip(compression):
+    raw     = _raw_data()
+    encoded = raid_bot._encode_state(raid_bot._load_model(json.loads(json.dumps(raw))), compression)
+    assert raid_bot._decode_state(encoded) == raw
+
+
+def test_v2_roster_is_column_wise():
+    encoded = json.loads(raid_bot._encode_state(_raw_data(), 'none'))
+    assert encoded['format_version'] == raid_bot.DATA_FORMAT_VERSION
+    columns = encoded['events']['1']['participants']
+    assert columns['uid'] == ['a', 'b', 'c']
+    assert columns['flex'] == [None, True, None]
+    assert encoded['events']['2']['participants']['uid'] == []
+
+
+def _write(root, content: bytes) -> None:
+    path = root / str(GUILD_ID) / 'kds_bot_data.json'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def _reload(root, monkeypatch) -> raid_bot.Store:
+    """The guild's store as a fresh start of the bot would load it."""
+    registry = raid_bot.StoreRegistry(str(root))
+    monkeypatch.setattr(raid_bot, 'stores', registry)
+    st = registry.get(GUILD_ID)
+    st.data
+    return st
+
+
+def test_v1_file_loads_and_saves_as_v2(guild_store, tmp_path, monkeypatch):
+    raw = _raw_data()
+    del raw['series']                         # written before series existed
+    _write(tmp_path / 'v1', json.dumps(raw, indent=2).encode())
+
+    st = _reload(tmp_path / 'v1', monkeypatch)
+    assert isinstance(st.data['events']['1'], raid_bot.Event)
+    assert st.data['events']['1']['participants']['b']['flex'] is True
+    assert 'flex' not in st.data['events']['1']['participants']['a']
+    assert st.data['series'] == {}
+    assert st.event_index.by_user['a'] == {'1'}
+    st.save()
+
+    with open(st.path, 'rb') as f:
+        saved = f.read()
+    assert json.loads(saved)['format_version'] == raid_bot.DATA_FORMAT_VERSION
+    assert raid_bot._decode_state(saved) == dict(raw, series={})
+    # and the version 2 file loads back to the same records
+    again = _reload(tmp_path / 'v1', monkeypatch)
+    assert json.loads(json.dumps(again.data, default=raid_bot._json_default)) == dict(raw, series={})
+
+
+@pytest.mark.parametrize('compression', ['zlib', 'lzma'])
+def test_compressed_file_loads_whatever_the_setting(guild_store, tmp_path, monkeypatch, compression):
+    _write(tmp_path / 'v2', raid_bot._encode_state(_raw_data(), compression))
+    st = _reload(tmp_path / 'v2', monkeypatch)
+    assert st.data['events']['1']['participants']['c']['name'] == 'Çé 🐉'
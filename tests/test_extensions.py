@@ -0,0 +1,41 @@
+"""/reload: a version that fails to load leaves the old one's commands registered."""
+import asyncio
+import importlib.util
+import sys
+
+import pytest
+from discord.ext import commands, tasks
+
+import raid_bot
+
+
+def _commands() -> set:
+    return {command.name for command in raid_bot.bot.tree.get_commands()}
+
+
+@pytest.mark.parametrize('name', raid_bot.EXTENSIONS)
+def test_failed_reload_keeps_commands(tmp_path, monkeypatch, name):
+    for module in list(sys.modules):
+        if module.startswith('extensions.'):
+            monkeypatch.setitem(sys.modules, module, sys.modules[module])   # put back afterwards
+    monkeypatch.setattr(tasks.Loop, 'start', lambda self, *args, **kwargs: None)   # no gateway here
+    monkeypatch.setattr(tasks.Loop, 'cancel', lambda self: None)
+    broken = tmp_path / f'{name}.py'
+    broken.write_text("raise RuntimeError('broken on purpose')\n")
+    spec = importlib.util.spec_from_file_location(f"extensions.{name}", broken)
+    core = _commands()
+
+    async def main():
+        for ext in raid_bot.EXTENSIONS:
+            await raid_bot.bot.load_extension(f"extensions.{ext}")
+        loaded = _commands()
+        assert loaded > core
+        with monkeypatch.context() as patch:
+            patch.setattr(importlib.util, 'find_spec', lambda *args, **kwargs: spec)
+            with pytest.raises(commands.ExtensionFailed):
+                await raid_bot.bot.reload_extension(f"extensions.{name}")
+        assert _commands() == loaded
+        for ext in raid_bot.EXTENSIONS:
+            await raid_bot.bot.unload_extension(f"extensions.{ext}")
+        assert _commands() == core
+    asyncio.run(main())
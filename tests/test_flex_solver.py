@@ -0,0 +1,139 @@
+"""Composition solver: caps hold, the objective matches brute force, seated players stay put."""
+import itertools
+import random
+
+import pytest
+
+import raid_bot
+from conftest import add_event, signup
+
+ROLES = ['Tank', 'Heal', 'DPS']
+BOONS = [None, 'Alacrity', 'Quickness']
+
+
+def _check_caps(placed: dict, role_caps: dict, boon_caps: dict) -> None:
+    for role, cap in role_caps.items():
+        assert sum(1 for r, _ in placed.values() if r == role) <= cap
+    for boon, cap in boon_caps.items():
+        assert sum(1 for _, b in placed.values() if b == boon) <= cap
+
+
+def _score(players: list, placed: dict) -> tuple:
+    """(placed, kept seated, -total rank): the solver's objective, best is largest."""
+    kept = sum(1 for uid, _, seated in players if seated and uid in placed)
+    rank = sum(choices.index(placed[uid]) for uid, choices, _ in players if uid in placed)
+    return len(placed), kept, -rank
+
+
+def _brute_force(players: list, role_caps: dict, boon_caps: dict) -> tuple:
+    best = None
+    for picks in itertools.product(*[[None] + choices for _, choices, _ in players]):
+        placed = {uid: c for (uid, _, _), c in zip(players, picks) if c}
+        try:
+            _check_caps(placed, role_caps, boon_caps)
+        except AssertionError:
+            continue
+        score = _score(players, placed)
+        best  = score if best is None else max(best, score)
+    return best
+
+
+def test_role_caps_hold():
+    players = [(f'p{i}', [('DPS', None)], False) for i in range(5)]
+    placed  = raid_bot._assign_flex(players, {'DPS': 3}, {})
+    assert len(placed) == 3
+    # earliest signups win a tie
+    assert set(placed) == {'p0', 'p1', 'p2'}
+
+
+def test_boon_cap_spans_roles():
+    players = [
+        ('a', [('Heal', 'Alacrity')], False),
+        ('b', [('DPS', 'Alacrity'), ('DPS', None)], False),
+    ]
+    placed = raid_bot._assign_flex(players, {'Heal': 1, 'DPS': 1}, {'Alacrity': 1})
+    assert placed == {'a': ('Heal', 'Alacrity'), 'b': ('DPS', None)}
+
+
+def test_prefers_filling_slots_over_first_choices():
+    players = [
+        ('a', [('DPS', None), ('Heal', None)], False),
+        ('b', [('DPS', None)], False),
+    ]
+    placed = raid_bot._assign_flex(players, {'DPS': 1, 'Heal': 1}, {})
+    assert placed == {'a': ('Heal', None), 'b': ('DPS', None)}
+
+
+def test_seated_player_keeps_seat_over_newcomer_preference():
+    # c would rank DPS first, but a is already seated there and c can go nowhere else:
+    # moving a off the roster doesn't fill more slots, so a stays
+    players = [('a', [('DPS', None)], True), ('c', [('DPS', None)], False)]
+    placed  = raid_bot._assign_flex(players, {'DPS': 1}, {})
+    assert placed == {'a': ('DPS', None)}
+
+
+def test_matches_brute_force_on_random_small_cases():
+    rng = random.Random(35)
+    combos = [(r, b) for r in ROLES for b in BOONS]
+    for _ in range(200):
+        role_caps = {r: rng.randint(0, 2) for r in ROLES}
+        boon_caps = {b: rng.randint(0, 2) for b in BOONS if b}
+        players   = [(f'p{i}', rng.sample(combos, rng.randint(1, 3)), rng.random() < 0.3)
+                     for i in range(rng.randint(1, 5))]
+        placed = raid_bot._assign_flex(players, role_caps, boon_caps)
+        _check_caps(placed, role_caps, boon_caps)
+        for uid, choices, _ in players:
+            assert uid not in placed or placed[uid] in choices
+        assert _score(players, placed) == _brute_force(players, role_caps, boon_caps)
+
+
+def test_specials_respect_caps_and_keep_current():
+    caps    = {'Kite': 1, 'Cannons': 1}
+    # b can only take Cannons, so a (not yet holding anything) takes Kite
+    picked  = raid_bot._assign_specials([('a', ['Cannons', 'Kite'], None), ('b', ['Cannons'], None)], caps)
+    assert picked == {'a': 'Kite', 'b': 'Cannons'}
+    # both slots fill either way, so a keeps the Cannons they already hold and b goes without
+    players = [('a', ['Kite', 'Cannons'], 'Cannons'), ('b', ['Cannons'], None), ('c', ['Kite'], None)]
+    assert raid_bot._assign_specials(players, caps) == {'a': 'Cannons', 'c': 'Kite'}
+
+
+def _flex(name: str, *choices, joined: float = 0.0, specials=()) -> dict:
+    return {'name': name, 'choices': [list(c) for c in choices], 'specials': list(specials), 'joined': joined}
+
+
+@pytest.fixture
+def event(guild_store):
+    raid_bot._flex_signatures.clear()
+    return add_event(guild_store, '1', role_limits={'Tank': 1, 'Heal': 2, 'DPS': 2},
+                     boon_limits={'Alacrity': 1, 'Quickness': 1},
+                     participants={'fixed': signup('F', 'Heal', 'Alacrity')})
+
+
+def test_place_flex_fills_around_fixed_signups(event):
+    event['flex'] = {
+        'a': _flex('A', ('Heal', 'Alacrity'), ('Heal', 'Quickness'), joined=1),
+        'b': _flex('B', ('Tank', None), joined=2),
+    }
+    placed = raid_bot._place_flex('1', event)
+    assert sorted(placed) == ['a', 'b']
+    roster = {u: (p['role'], p['boon']) for u, p in event['participants'].items()}
+    assert roster == {'fixed': ('Heal', 'Alacrity'), 'a': ('Heal', 'Quickness'), 'b': ('Tank', None)}
+    assert event['participants']['a']['flex']
+
+
+def test_place_flex_is_stable_across_unrelated_changes(event):
+    event['flex'] = {'a': _flex('A', ('DPS', None), joined=1), 'b': _flex('B', ('DPS', None), joined=2)}
+    raid_bot._place_flex('1', event)
+    seated = dict(event['participants'])
+    # nothing changed: the solve is skipped and nobody moves
+    assert raid_bot._place_flex('1', event) == []
+    assert event['participants'] == seated
+    # a new flexible signup for the same full role doesn't unseat anyone, even one whose
+    # 'joined' sorts first (e.g. re-submitted choices)
+    event['flex']['c'] = _flex('C', ('DPS', None), joined=0.5)
+    assert raid_bot._place_flex('1', event) == []
+    assert set(event['participants']) == {'fixed', 'a', 'b'}
+    # when a seat frees up, the waiting flexible player takes it
+    del event['flex']['a']
+    del event['participants']['a']
+    assert raid_bot._place_flex('1', event) == ['c']
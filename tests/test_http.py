@@ -0,0 +1,115 @@
+"""Calendar feeds and the JSON API over HTTP: the leader serves them, a standby answers 503."""
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import raid_bot
+from conftest import GUILD_ID, add_event, signup
+
+
+def _get(path: str, **params):
+    """(status, headers, body) of one GET against the bot's web app."""
+    async def main():
+        async with TestClient(TestServer(raid_bot.web_app())) as client:
+            resp = await client.get(path, params=params)
+            return resp.status, resp.headers, await resp.read()
+    return asyncio.run(main())
+
+
+def _paths():
+    return [
+        (f'/calendar/{GUILD_ID}.ics', raid_bot._url_token(GUILD_ID)),
+        (f'/api/{GUILD_ID}/events', raid_bot._url_token(GUILD_ID, 'api')),
+    ]
+
+
+@pytest.fixture
+def guild_with_event(guild_store):
+    add_event(guild_store, '1', participants={'a': signup('A', 'Tank')}, unix_ts=4_000_000_000)
+    guild_store.save()
+    return guild_store
+
+
+def test_leader_serves_feed_and_api(guild_with_event):
+    for path, token in _paths():
+        status, _, body = _get(path, token=token)
+        assert status == 200, path
+        assert b'W1 - Vale Guardian' in body
+
+
+def test_standby_refuses_reads(guild_with_event):
+    raid_bot.leader.release()           # the lease moved to another replica
+    for path, token in _paths():
+        status, headers, _ = _get(path, token=token)
+        assert status == 503, path
+        assert headers['Retry-After'] == str(raid_bot.LEADER_HEARTBEAT_SECONDS)
+
+
+def test_wrong_token_is_not_found(guild_with_event):
+    for path, _ in _paths():
+        assert _get(path, token='0' * 24)[0] == 404
+
+
+@pytest.mark.parametrize('token', ['ünïcode', '../../etc', ''])
+def test_malformed_feed_token_is_not_found(guild_with_event, token):
+    assert _get(f'/calendar/{GUILD_ID}.ics', token=token)[0] == 404
+
+
+def test_feed_is_off_without_a_secret(guild_with_event, monkeypatch):
+    monkeypatch.setattr(raid_bot, 'PUBLIC_URL', 'https://bot.example')
+    assert raid_bot.calendar_url(GUILD_ID).startswith('https://bot.example/calendar/')
+    monkeypatch.setattr(raid_bot, 'CALENDAR_SECRET', '')
+    # with an empty key anyone could compute this token
+    forged = raid_bot._url_token(GUILD_ID)
+    assert _get(f'/calendar/{GUILD_ID}.ics', token=forged)[0] == 503
+    assert raid_bot.calendar_url(GUILD_ID) is None
+
+
+@pytest.mark.parametrize('token', ['ünïcode', 'x' * 24])
+def test_malformed_api_token_is_not_found(guild_with_event, token):
+    status, _, body = _get(f'/api/{GUILD_ID}/events', token=token)
+    assert status == 404
+    assert b'not found' in body
+
+
+def test_api_token_in_authorization_header(guild_with_event):
+    async def main():
+        async with TestClient(TestServer(raid_bot.web_app())) as client:
+            headers = {'Authorization': 'Bearer ' + raid_bot._url_token(GUILD_ID, 'api')}
+            bad     = {'Authorization': 'Bearer ünïcode'.encode().decode('latin-1')}
+            return (await client.get(f'/api/{GUILD_ID}/events', headers=headers)).status, \
+                   (await client.get(f'/api/{GUILD_ID}/events', headers=bad)).status
+    assert asyncio.run(main()) == (200, 404)
+
+
+def test_api_is_off_without_a_secret(guild_with_event, monkeypatch):
+    monkeypatch.setattr(raid_bot, 'PUBLIC_URL', 'https://bot.example')
+    assert raid_bot.api_url(GUILD_ID) is not None
+    monkeypatch.setattr(raid_bot, 'CALENDAR_SECRET', '')
+    forged = raid_bot._url_token(GUILD_ID, 'api')
+    assert _get(f'/api/{GUILD_ID}/events', token=forged)[0] == 503
+    assert raid_bot.api_url(GUILD_ID) is None
+
+
+def test_gzipped_api_body_has_its_own_etag(guild_with_event, monkeypatch):
+    monkeypatch.setattr(raid_bot, 'API_GZIP_MIN_BYTES', 0)
+    monkeypatch.setattr(raid_bot, '_api_responses', raid_bot.LruCache(raid_bot.MAX_CACHED_API))   # built after the patch
+    params = {'token': raid_bot._url_token(GUILD_ID, 'api')}
+
+    async def main():
+        async with TestClient(TestServer(raid_bot.web_app())) as client:
+            async def get(encoding, etag=None):
+                headers = {'Accept-Encoding': encoding, **({'If-None-Match': etag} if etag else {})}
+                resp = await client.get(f'/api/{GUILD_ID}/events', params=params, headers=headers)
+                await resp.read()
+                return resp.status, resp.headers
+            _, plain = await get('identity')
+            _, gz    = await get('gzip')
+            return plain, gz, [await get(encoding, tag) for encoding, tag in [
+                ('identity', plain['ETag']), ('gzip', gz['ETag']), ('gzip', plain['ETag'])]]
+    plain, gz, revalidated = asyncio.run(main())
+    assert gz['Content-Encoding'] == 'gzip' and 'Content-Encoding' not in plain
+    assert gz['ETag'] != plain['ETag']
+    assert gz['Vary'] == plain['Vary'] == 'Accept-Encoding'
+    assert [status for status, _ in revalidated] == [304, 304, 200]
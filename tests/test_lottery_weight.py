@@ -0,0 +1,46 @@
+"""Lottery weight decay: weights are seeded at load and never outlive a spell with decay off."""
+import pytest
+
+import raid_bot
+
+DAY = 86400
+T0  = 1_800_000_000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [T0]
+    monkeypatch.setattr(raid_bot.time, 'time', lambda: now[0])
+    return now
+
+
+def _load(players: dict, monkeypatch, half_life: float) -> dict:
+    monkeypatch.setattr(raid_bot, 'LOTTERY_HALF_LIFE_DAYS', half_life)
+    return raid_bot._load_model({'events': {}, 'players': players, 'lotteries': {}})['players']
+
+
+def test_new_player_weighs_from_the_award(monkeypatch, clock):
+    monkeypatch.setattr(raid_bot, 'LOTTERY_HALF_LIFE_DAYS', 10)
+    player = raid_bot.Player(name='A', points=0, events_attended=0)
+    assert raid_bot.lottery_weight(player, T0) == 0
+    raid_bot.add_lottery_weight(player, 20, T0 - 10 * DAY)
+    # when it is read doesn't matter: the award counts from when it was earned
+    clock[0] += 5 * DAY
+    assert (player['weight'], player['weight_ts']) == (20.0, T0 - 10 * DAY)
+    assert raid_bot.lottery_weight(player, T0) == pytest.approx(10)
+
+
+def test_turning_decay_off_and_on_reseeds_from_points(monkeypatch, clock):
+    players = _load({'a': {'name': 'A', 'points': 20, 'events_attended': 1}}, monkeypatch, 10)
+    assert (players['a']['weight'], players['a']['weight_ts']) == (20.0, T0)
+
+    # decay off: awards go to points only, so the old weight must not survive
+    players = _load({'a': dict(players['a'])}, monkeypatch, 0)
+    assert 'weight' not in players['a'] and 'weight_ts' not in players['a']
+    raid_bot.add_lottery_weight(players['a'], 30, T0 + DAY)
+    players['a']['points'] += 30
+
+    clock[0] = T0 + 2 * DAY
+    players = _load({'a': dict(players['a'])}, monkeypatch, 10)
+    assert (players['a']['weight'], players['a']['weight_ts']) == (50.0, T0 + 2 * DAY)
+    assert raid_bot.lottery_weight(players['a'], T0 + 2 * DAY) == 50
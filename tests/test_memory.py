@@ -0,0 +1,30 @@
+"""/memory: allocations are charged to the part of the bot whose code made them."""
+import inspect
+
+import raid_bot
+from extensions import lottery
+
+
+def _line(obj) -> int:
+    return inspect.getsourcelines(obj)[1]
+
+
+def test_core_lines_are_charged_to_their_section():
+    starts, titles = raid_bot._SECTIONS
+    assert starts == sorted(starts) and len(set(titles)) == len(titles)
+    where = {
+        raid_bot._tokens:          'In-memory indexes',
+        raid_bot.Player:           'Domain model',
+        raid_bot.Store.save:       'Data layer',
+        raid_bot._is_officer:      'Permissions',
+        raid_bot.memory_report:    'Memory report',
+    }
+    for obj, title in where.items():
+        assert raid_bot._subsystem(raid_bot.__file__, _line(obj)) == 'core: ' + title
+    assert raid_bot._subsystem(raid_bot.__file__, 1) == 'core: imports'
+
+
+def test_other_files_are_charged_by_module():
+    assert raid_bot._subsystem(lottery.__file__, _line(lottery)) == 'extensions.lottery'
+    assert raid_bot._subsystem('/venv/lib/site-packages/aiohttp/web.py', 10) == 'aiohttp'
+    assert raid_bot._subsystem('/usr/lib/python3.11/json/decoder.py', 10) is None
@@ -0,0 +1,260 @@
+"""/pizza providers against a local stub HTTP server: fetch, timeout, 5xx, circuit breaker, refill."""
+import asyncio
+import contextlib
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+import raid_bot
+from extensions import pizza
+
+CATEGORY = 0   # dad joke: {"joke": ...}
+
+
+@contextlib.asynccontextmanager
+async def stub_server(handler):
+    """Serve `handler` on a free localhost port; yields the base URL."""
+    app = web.Application()
+    app.router.add_get('/', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}/"
+    finally:
+        await runner.cleanup()
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Point CATEGORY at the stub server (URL filled in per test) with a short timeout, and
+    give it a fresh breaker and buffer."""
+    entry = dict(pizza.PIZZA_PROVIDERS[CATEGORY], timeout=0.2)
+    monkeypatch.setitem(pizza.PIZZA_PROVIDERS, CATEGORY, entry)
+    monkeypatch.setitem(pizza._pizza_breakers, CATEGORY, pizza.CircuitBreaker(threshold=2, cooldown=60))
+    monkeypatch.setitem(pizza._pizza_buffers, CATEGORY, pizza.deque(maxlen=pizza.PIZZA_BUFFER_SIZE))
+    return entry
+
+
+def run_with_session(provider, handler, body):
+    """Run `body()` with the bot's shared session open and `provider` aimed at `handler`."""
+    async def main():
+        async with stub_server(handler) as url:
+            provider['url'] = url
+            raid_bot.bot.http_session = aiohttp.ClientSession()
+            try:
+                return await body()
+            finally:
+                await raid_bot.bot.http_session.close()
+                raid_bot.bot.http_session = None
+    return asyncio.run(main())
+
+
+def test_fetch_success(provider):
+    async def handler(request):
+        assert request.headers['Accept'] == 'application/json'
+        return web.json_response({'joke': 'I used to be a banker, but I lost interest.'})
+
+    items = run_with_session(provider, handler, lambda: pizza._fetch_pizza(CATEGORY))
+    assert items == ['I used to be a banker, but I lost interest.']
+    assert pizza._pizza_breakers[CATEGORY].failures == 0
+
+
+def test_fetch_timeout_counts_as_failure(provider):
+    async def handler(request):
+        await asyncio.sleep(2)
+        return web.json_response({'joke': 'too late'})
+
+    items = run_with_session(provider, handler, lambda: pizza._fetch_pizza(CATEGORY))
+    assert items == []
+    assert pizza._pizza_breakers[CATEGORY].failures == 1
+
+
+def test_fetch_server_error_opens_breaker(provider):
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        return web.Response(status=503, text='down')
+
+    async def body():
+        results = [await pizza._fetch_pizza(CATEGORY) for _ in range(4)]
+        return results
+
+    results = run_with_session(provider, handler, body)
+    assert results == [[], [], [], []]
+    # threshold=2: the third and fourth calls never reach the server
+    assert calls == 2
+    assert pizza._pizza_breakers[CATEGORY].opened_at is not None
+
+
+def test_fetch_without_session_is_a_no_op(provider):
+    raid_bot.bot.http_session = None
+    assert asyncio.run(pizza._fetch_pizza(CATEGORY)) == []
+    assert pizza._pizza_breakers[CATEGORY].failures == 0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(pizza.time, 'monotonic', fake)
+    return fake
+
+
+def test_breaker_opens_at_threshold(clock):
+    breaker = pizza.CircuitBreaker(threshold=3, cooldown=120)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now += 119
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_lets_one_probe_through(clock):
+    breaker = pizza.CircuitBreaker(threshold=1, cooldown=120)
+    breaker.record_failure()
+    clock.now += 120
+    assert breaker.allow()          # the probe
+    assert not breaker.allow()      # everyone else waits on it
+    assert not breaker.allow()
+
+
+def test_breaker_probe_success_closes(clock):
+    breaker = pizza.CircuitBreaker(threshold=1, cooldown=120)
+    breaker.record_failure()
+    clock.now += 120
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+    assert breaker.failures == 0
+
+
+def test_breaker_probe_failure_reopens(clock):
+    breaker = pizza.CircuitBreaker(threshold=1, cooldown=120)
+    breaker.record_failure()
+    clock.now += 120
+    assert breaker.allow()
+    breaker.record_failure()
+    clock.now += 60
+    assert not breaker.allow()
+    clock.now += 60
+    assert breaker.allow()
+
+
+def test_breaker_lost_probe_allows_another_after_cooldown(clock):
+    breaker = pizza.CircuitBreaker(threshold=1, cooldown=120)
+    breaker.record_failure()
+    clock.now += 120
+    assert breaker.allow()          # probe never reports back (e.g. cancelled)
+    clock.now += 120
+    assert breaker.allow()
+
+
+def test_refill_tops_up_buffer(provider):
+    served = 0
+
+    async def handler(request):
+        nonlocal served
+        served += 1
+        return web.json_response({'joke': f'joke {served}'})
+
+    buf = pizza._pizza_buffers[CATEGORY]
+    buf.append('left over')
+    run_with_session(provider, handler, lambda: pizza._refill_pizza(CATEGORY))
+    assert len(buf) == pizza.PIZZA_BUFFER_SIZE
+    assert buf[0] == 'left over'
+    assert served == pizza.PIZZA_BUFFER_SIZE - 1   # one joke per request
+    assert CATEGORY not in pizza._pizza_refilling
+
+
+def test_refill_stops_when_provider_fails(provider):
+    async def handler(request):
+        return web.Response(status=500)
+
+    run_with_session(provider, handler, lambda: pizza._refill_pizza(CATEGORY))
+    assert len(pizza._pizza_buffers[CATEGORY]) == 0
+    assert pizza._pizza_breakers[CATEGORY].failures == 1   # gave up after the first empty batch
+    assert CATEGORY not in pizza._pizza_refilling
+
+
+def test_refill_runs_once_per_category(provider):
+    served = 0
+
+    async def handler(request):
+        nonlocal served
+        served += 1
+        await asyncio.sleep(0.05)
+        return web.json_response({'joke': 'ok'})
+
+    async def body():
+        await asyncio.gather(pizza._refill_pizza(CATEGORY), pizza._refill_pizza(CATEGORY))
+
+    run_with_session(provider, handler, body)
+    assert len(pizza._pizza_buffers[CATEGORY]) == pizza.PIZZA_BUFFER_SIZE
+    assert served == pizza.PIZZA_BUFFER_SIZE   # the second refill found the first in flight
+
+
+@pytest.mark.parametrize('leads', [False, True])
+def test_refill_loop_runs_only_on_the_leader(monkeypatch, request, leads):
+    if leads:
+        request.getfixturevalue('leading')
+    refilled = []
+
+    async def fake_refill(category):
+        refilled.append(category)
+
+    monkeypatch.setattr(pizza, '_refill_pizza', fake_refill)
+    asyncio.run(pizza.pizza_refill.coro())
+    assert refilled == (list(pizza.PIZZA_PROVIDERS) if leads else [])
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+
+class FakeResponse:
+    async def defer(self):
+        pass
+
+
+class FakeInteraction:
+    def __init__(self):
+        self.user     = type('User', (), {'id': 1})()
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+
+def test_live_fetch_keeps_the_rest_of_the_batch(provider, monkeypatch):
+    served = 0
+
+    async def handler(request):
+        nonlocal served
+        served += 1
+        return web.json_response({'joke': 'batch'})
+
+    provider['parse'] = lambda payload: [f"{payload['joke']} {i}" for i in range(3)]
+    monkeypatch.setattr(pizza.random, 'randint', lambda a, b: CATEGORY)
+    interaction = FakeInteraction()
+    run_with_session(provider, handler, lambda: pizza.pizza_command.callback(interaction))
+
+    buf = pizza._pizza_buffers[CATEGORY]
+    assert served == 1 and len(interaction.followup.sent) == 1
+    assert sorted([*interaction.followup.sent, *buf]) == ['batch 0', 'batch 1', 'batch 2']
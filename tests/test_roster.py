@@ -0,0 +1,126 @@
+"""Roster refits after a series template changes an event's limits or signup mode."""
+import asyncio
+
+import raid_bot
+from conftest import add_event, signup
+from extensions import series as series_ext
+
+
+def _roster(event) -> dict:
+    return {uid: (p['role'], p.get('boon'), p.get('special_role')) for uid, p in event['participants'].items()}
+
+
+def test_lowered_role_limit_waitlists_latest_signups(guild_store):
+    event = add_event(guild_store, '1', participants={
+        'a': signup('A', 'Tank'), 'b': signup('B', 'Tank'), 'c': signup('C', 'DPS'),
+    }, role_limits={'Tank': 2, 'Heal': 2, 'DPS': 7})
+    raid_bot._join_waitlist(event, 'w', 'W', 'Tank', None)
+
+    event['role_limits'] = {'Tank': 1, 'Heal': 2, 'DPS': 7}
+    promoted, changed = raid_bot._refit_roster('1', event)
+
+    assert set(event['participants']) == {'a', 'c'}
+    assert promoted == []
+    assert 'waitlist' in changed['b']
+    # the bumped player goes ahead of whoever was already waiting
+    queue = event['waitlist'][raid_bot._waitlist_key('Tank', None)]
+    assert list(queue) == ['b', 'w']
+    assert guild_store.event_index.by_user.get('b') is None
+
+
+def test_role_removed_from_template(guild_store):
+    event = add_event(guild_store, '1', participants={'a': signup('A', 'Tank'), 'c': signup('C', 'DPS')})
+    event['role_limits'] = {'Tank': 0, 'Heal': 2, 'DPS': 8}
+    _, changed = raid_bot._refit_roster('1', event)
+    assert set(event['participants']) == {'c'}
+    assert set(changed) == {'a'}
+
+
+def test_lowered_boon_limit(guild_store):
+    event = add_event(guild_store, '1', participants={
+        'a': signup('A', 'DPS', 'Alacrity'), 'b': signup('B', 'DPS', 'Alacrity'), 'c': signup('C', 'DPS'),
+    })
+    event['boon_limits'] = {'Alacrity': 1, 'Quickness': 2}
+    _, changed = raid_bot._refit_roster('1', event)
+    assert set(event['participants']) == {'a', 'c'}
+    assert list(event['waitlist']) == [raid_bot._waitlist_key('DPS', 'Alacrity')]
+    assert set(changed) == {'b'}
+
+
+def test_lowered_special_limit_keeps_the_slot(guild_store):
+    event = add_event(guild_store, '1', participants={
+        'a': signup('A', 'DPS', special_role='Cannons'), 'b': signup('B', 'DPS', special_role='Cannons'),
+    }, special_role_limits={'Cannons': 2})
+    event['special_role_limits'] = {'Cannons': 1}
+    _, changed = raid_bot._refit_roster('1', event)
+    assert _roster(event) == {'a': ('DPS', None, 'Cannons'), 'b': ('DPS', None, None)}
+    assert 'Cannons' in changed['b']
+
+
+def test_open_signup_to_roles_drops_attendees_keeps_fillers(guild_store):
+    event = add_event(guild_store, '1', open_signup=True, role_limits={}, participants={
+        'a': signup('A', 'Attendee'), 'f': signup('F', 'Filler'),
+    })
+    event['open_signup'] = False
+    event['role_limits'] = {'Tank': 1, 'Heal': 2, 'DPS': 7}
+    _, changed = raid_bot._refit_roster('1', event)
+    assert set(event['participants']) == {'f'}
+    assert 'register again' in changed['a']
+
+
+def test_roles_to_open_signup_lets_everyone_in(guild_store):
+    event = add_event(guild_store, '1', participants={'a': signup('A', 'Tank')},
+                      role_limits={'Tank': 1, 'Heal': 0, 'DPS': 0})
+    raid_bot._join_waitlist(event, 'w', 'W', 'Tank', None)
+    event['flex'] = {'x': {'name': 'X', 'choices': [['DPS', None]], 'specials': [], 'joined': 1.0}}
+
+    event['open_signup'] = True
+    event['role_limits'] = {}
+    promoted, changed = raid_bot._refit_roster('1', event)
+    assert set(promoted) == {'w', 'x'}
+    assert changed == {}
+    assert set(event['participants']) == {'a', 'w', 'x'}
+    assert not event['waitlist'] and not event['flex']
+
+
+def test_seated_flex_player_unseated_by_lower_limit(guild_store):
+    event = add_event(guild_store, '1', participants={'a': signup('A', 'Heal')},
+                      role_limits={'Tank': 0, 'Heal': 2, 'DPS': 0})
+    event['flex'] = {'x': {'name': 'X', 'choices': [['Heal', None]], 'specials': [], 'joined': 1.0}}
+    raid_bot._rebalance('1', event)
+    assert event['participants']['x']['flex']
+
+    event['role_limits'] = {'Tank': 0, 'Heal': 1, 'DPS': 0}
+    _, changed = raid_bot._refit_roster('1', event)
+    assert set(event['participants']) == {'a'}
+    assert 'flexible pool' in changed['x']
+
+
+def test_series_edit_refits_and_notifies(guild_store, monkeypatch):
+    told = []
+
+    async def fake_dm(event_id, event, uid, what):
+        told.append((event_id, uid))
+
+    monkeypatch.setattr(raid_bot, '_dm_roster_change', fake_dm)
+    data  = guild_store.data
+    event = add_event(guild_store, '1', series_id='1', unix_ts=2_000_000_000, participants={
+        'a': signup('A', 'Tank'), 'b': signup('B', 'DPS'),
+    })
+    data['series']['1'] = {
+        'name': 'Weekly Sabetha', 'description': '', 'weekday': 0, 'time': '20:00', 'utc_offset': 'UTC',
+        'template': 'W1 - Sabetha', 'channel_id': 1, 'creator_id': 1, 'horizon': 1,
+        'status': 'active', 'occurrences': ['1'], 'last_ts': 2_000_000_000,
+    }
+
+    async def main():
+        updated = await series_ext._apply_series_to_future(data, data['series']['1'], reschedule=False)
+        await asyncio.sleep(0)   # let the DM tasks run
+        return updated
+
+    assert asyncio.run(main()) == 1
+    assert event['role_limits']['Tank'] == 0
+    assert set(event['participants']) == {'b'}
+    assert told == [('1', 'a')]
+    # the refit was saved and published
+    assert set(guild_store.view.events['1']['participants']) == {'b'}
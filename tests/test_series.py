@@ -0,0 +1,47 @@
+"""Series occurrences: overlapping top-ups don't post an occurrence twice, and a failed post is undone."""
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from extensions import series as series_ext
+
+
+@pytest.fixture
+def series(guild_store, monkeypatch):
+    monkeypatch.setattr(series_ext.bot, 'get_channel', lambda channel_id: object())
+    guild_store.data['series']['1'] = {
+        'name': 'Weekly Sabetha', 'description': '', 'weekday': 0, 'time': '20:00', 'utc_offset': 'UTC',
+        'template': 'W1 - Sabetha', 'channel_id': 1, 'creator_id': 1, 'horizon': 2,
+        'status': 'active', 'occurrences': [], 'last_ts': None,
+    }
+    return guild_store.data['series']['1']
+
+
+def test_overlapping_runs_post_each_occurrence_once(guild_store, series, monkeypatch):
+    async def publish(channel, eid, event):
+        await asyncio.sleep(0)   # the other run gets in here
+
+    monkeypatch.setattr(series_ext, '_publish_event', publish)
+
+    async def main():
+        data = guild_store.data
+        await asyncio.gather(series_ext._materialize_series(data), series_ext._materialize_series(data))
+    asyncio.run(main())
+
+    events = guild_store.data['events']
+    times  = sorted(event['unix_ts'] for event in events.values())
+    assert len(events) == 2 and len(set(times)) == 2
+    assert sorted(series['occurrences']) == sorted(events)
+    assert series['last_ts'] == times[-1]
+
+
+def test_failed_post_is_undone(guild_store, series, monkeypatch):
+    async def publish(channel, eid, event):
+        raise discord.HTTPException(SimpleNamespace(status=403, reason='Forbidden'), 'Missing Access')
+
+    monkeypatch.setattr(series_ext, '_publish_event', publish)
+    asyncio.run(series_ext._materialize_series(guild_store.data))
+    assert not guild_store.data['events']
+    assert series['occurrences'] == [] and series['last_ts'] is None
@@ -0,0 +1,109 @@
+"""Signup buttons: leaving the roster, the waitlist or a flexible signup, and who gets told."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import raid_bot
+from conftest import add_event, signup
+
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append(content)
+
+
+def fake_interaction(uid: int, custom_id: str = 'leave'):
+    return SimpleNamespace(
+        id=uid * 1000, user=SimpleNamespace(id=uid, display_name=f'User {uid}'),
+        guild_id=1234, command=None, data={'custom_id': custom_id}, response=FakeResponse(),
+    )
+
+
+@pytest.fixture
+def dms(monkeypatch):
+    """Promotion DMs sent, as (event_id, uid)."""
+    sent = []
+
+    async def fake_dm(event_id, event, uid):
+        sent.append((event_id, uid))
+
+    monkeypatch.setattr(raid_bot, '_dm_promoted', fake_dm)
+    return sent
+
+
+def _leave(event_id: str, uid: int):
+    async def main():
+        view = raid_bot.EventView(event_id)
+        await view.leave.callback(interaction)
+        await asyncio.sleep(0)   # let spawned DM tasks run
+    interaction = fake_interaction(uid)
+    asyncio.run(main())
+    return interaction.response.messages
+
+
+def test_leaving_roster_promotes_and_notifies(guild_store, dms):
+    event = add_event(guild_store, '1', participants={'1': signup('A', 'Tank')})
+    raid_bot._join_waitlist(event, '2', 'B', 'Tank', None)
+    assert _leave('1', 1) == ["✅ You've left the event."]
+    assert set(event['participants']) == {'2'}
+    assert dms == [('1', '2')]
+
+
+def test_withdrawing_flex_signup_notifies_promoted(guild_store, dms, caplog):
+    event = add_event(guild_store, '1', participants={'1': signup('A', 'Tank')},
+                      role_limits={'Tank': 1, 'Heal': 0, 'DPS': 0})
+    raid_bot._join_waitlist(event, '3', 'C', 'Tank', None)
+    event['flex'] = {'2': {'name': 'B', 'choices': [['Tank', None]], 'specials': [], 'joined': 1.0}}
+    # The Tank slot opens up without a rebalance (e.g. a limit raised by hand in the file)
+    event['role_limits'] = {'Tank': 2, 'Heal': 0, 'DPS': 0}
+
+    with caplog.at_level('INFO', logger='kds.signup'):
+        assert _leave('1', 2) == ["✅ Your flexible signup was withdrawn."]
+    assert '2' not in event['flex']
+    assert [(r.getMessage(), r.target_user) for r in caplog.records if r.name == 'kds.signup'][0] == \
+        ("Withdrew flexible signup", '2')
+    assert set(event['participants']) == {'1', '3'}
+    assert dms == [('1', '3')]
+
+
+def test_leaving_waitlist(guild_store, dms):
+    event = add_event(guild_store, '1', participants={'1': signup('A', 'Tank')},
+                      role_limits={'Tank': 1, 'Heal': 0, 'DPS': 0})
+    raid_bot._join_waitlist(event, '2', 'B', 'Tank', None)
+    assert _leave('1', 2) == ["✅ You've left the waitlist."]
+    assert not event['waitlist']
+    assert dms == []
+
+
+@pytest.fixture
+def clicks(monkeypatch):
+    """Fresh click throttling state; returns the last-click table."""
+    monkeypatch.setattr(raid_bot, '_click_buckets', {})
+    monkeypatch.setattr(raid_bot, '_last_click', {})
+    return raid_bot._last_click
+
+
+def _check(event_id: str, interaction) -> bool:
+    async def main():
+        return await raid_bot.EventView(event_id).interaction_check(interaction)
+    return asyncio.run(main())
+
+
+def test_standby_leaves_clicks_alone(clicks):
+    assert not raid_bot.leader.is_leader
+    interaction = fake_interaction(1, 'register')
+    assert _check('1', interaction) is False
+    assert interaction.response.messages == []   # the leader answers it
+    assert clicks == {}
+
+
+def test_leader_dedupes_a_repeated_click(guild_store, clicks):
+    add_event(guild_store, '1', participants={})
+    assert _check('1', fake_interaction(1, 'register')) is True
+    again = fake_interaction(1, 'register')
+    assert _check('1', again) is False
+    assert again.response.messages == ["⏳ Already on it — that click was just handled."]
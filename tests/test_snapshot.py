@@ -0,0 +1,135 @@
+"""Read snapshots: only dirty records are republished, nested writes are tracked, and a reader
+never sees a change half-applied."""
+import asyncio
+import random
+import threading
+
+import raid_bot
+from conftest import add_event, signup
+
+
+def test_nested_writes_are_published_without_touch(guild_store):
+    st    = guild_store
+    event = add_event(st, '1', participants={'a': signup('A', 'Tank')})
+    raid_bot._join_waitlist(event, 'w', 'W', 'Tank', None)
+    event['flex'] = {'f': {'name': 'F', 'choices': [['DPS', None]], 'specials': [], 'joined': 1.0}}
+    st.save()
+
+    event['participants']['a']['role'] = 'Heal'
+    event['waitlist']['Tank/-']['w']['name'] = 'Walt'
+    event['flex']['f']['choices'] = [['Heal', None]]   # lists are replaced, not edited in place
+    st.save()
+
+    published = st.view.events['1']
+    assert published['participants']['a']['role'] == 'Heal'
+    assert published['waitlist']['Tank/-']['w']['name'] == 'Walt'
+    assert published['flex']['f']['choices'] == (('Heal', None),)
+
+
+def test_only_dirty_records_are_refrozen(guild_store):
+    st = guild_store
+    for eid in '123':
+        add_event(st, eid, participants={})
+    st.data['players']['a'] = raid_bot.Player(name='A', points=0, events_attended=0)
+    st.save()
+    before = st.view
+
+    raid_bot._set_participant('2', st.data['events']['2'], 'a', 'A', 'DPS')
+    assert st.data['events'].dirty == {'2'}
+    st.save()
+    after = st.view
+
+    assert after.events['1'] is before.events['1']
+    assert after.events['3'] is before.events['3']
+    assert after.players['a'] is before.players['a']
+    assert after.events['2'] is not before.events['2']
+    assert 'a' in after.events['2']['participants'] and not before.events['2']['participants']
+    assert not st.data['events'].dirty
+
+
+def test_snapshot_sections_match_live_state_through_compaction(guild_store, monkeypatch):
+    monkeypatch.setattr(raid_bot, 'SNAPSHOT_COMPACT_MIN', 4)
+    st  = guild_store
+    rng = random.Random(39)
+    views = []
+    for step in range(300):
+        events = st.data['events']
+        eid    = str(rng.randrange(40))
+        if eid in events and rng.random() < 0.3:
+            del events[eid]
+        elif eid in events:
+            events[eid]['name'] = f'Edit {step}'
+        else:
+            add_event(st, eid, participants={})
+        st.save()
+        views.append((st.view, {k: raid_bot._thaw(raid_bot._freeze(v)) for k, v in events.items()}))
+    # every snapshot still reads as the state it was published from
+    for view, expected in views:
+        assert len(view.events) == len(expected)
+        assert set(view.events) == set(expected)
+        assert {k: raid_bot._thaw(v) for k, v in view.events.items()} == expected
+        assert 'missing' not in view.events
+
+
+def test_reader_never_sees_a_half_applied_signup(guild_store):
+    """A waitlist rotation through a one-slot roster: between its steps the leaving player is
+    on neither list, but a snapshot reader must only ever see whole rotations."""
+    st    = guild_store
+    users = ['a', 'b', 'c', 'd', 'e']
+    event = add_event(st, '1', participants={'a': signup('A', 'Tank')},
+                      role_limits={'Tank': 1, 'Heal': 0, 'DPS': 0})
+    for uid in users[1:]:
+        raid_bot._join_waitlist(event, uid, uid.upper(), 'Tank', None)
+    st.save()
+
+    def consistent(events) -> bool:
+        ev      = events['1']
+        roster  = set(ev['participants'])
+        waiting = {uid for queue in ev.get('waitlist', {}).values() for uid in queue}
+        return len(roster) == 1 and not roster & waiting and roster | waiting == set(users)
+
+    done, seen = threading.Event(), []
+
+    def reader():
+        while not done.is_set():
+            seen.append(consistent(st.view.events))
+
+    async def rotate():
+        for _ in range(200):
+            async with st.transaction() as data:
+                ev   = data['events']['1']
+                tank = next(iter(ev['participants']))
+                raid_bot._remove_participant('1', ev, tank)
+                assert not consistent(data['events']) and consistent(st.view.events)
+                raid_bot._join_waitlist(ev, tank, tank.upper(), 'Tank', None)
+            await asyncio.sleep(0)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        asyncio.run(rotate())
+    finally:
+        done.set()
+        thread.join()
+    assert seen and all(seen)
+    assert consistent(st.view.events)
+
+
+def test_snapshot_is_unchanged_mid_transaction(guild_store):
+    st    = guild_store
+    event = add_event(st, '1', participants={}, role_limits={'Tank': 1, 'Heal': 0, 'DPS': 0})
+    st.save()
+    before = st.view
+
+    async def main():
+        async with st.transaction() as data:
+            raid_bot._set_participant('1', data['events']['1'], 'a', 'A', 'Tank')
+            raid_bot._join_waitlist(data['events']['1'], 'b', 'B', 'Tank', None)
+            assert st.view is before
+            assert not before.events['1']['participants'] and 'waitlist' not in before.events['1']
+    asyncio.run(main())
+
+    assert set(st.view.events['1']['participants']) == {'a'}
+    assert list(st.view.events['1']['waitlist']['Tank/-']) == ['b']
+    assert not before.events['1']['participants']
+    assert event is st.data['events']['1']
@@ -0,0 +1,45 @@
+"""Store writes: save_data refuses data from a store that was reloaded, and a failed write
+leaves the previous file intact."""
+import os
+
+import pytest
+
+import raid_bot
+from conftest import GUILD_ID, add_event
+
+
+def test_save_data_refuses_a_reloaded_store(guild_store):
+    add_event(guild_store, '1', participants={})
+    guild_store.save()
+    data = raid_bot.load_data()
+
+    raid_bot.stores.reset()                 # e.g. a new leader term while the handler awaited
+    data['events']['1']['name'] = 'Stale'
+    with pytest.raises(raid_bot.StaleData):
+        raid_bot.save_data(data)
+
+    fresh = raid_bot.stores.get(GUILD_ID)
+    assert fresh.data['events']['1']['name'] == 'W1 - Vale Guardian'
+    raid_bot.save_data(raid_bot.load_data())   # the reloaded state saves fine
+
+
+def test_interrupted_save_keeps_the_old_file(guild_store, monkeypatch):
+    add_event(guild_store, '1', participants={})
+    guild_store.save()
+    with open(guild_store.path, 'rb') as f:
+        before = f.read()
+
+    def crash(src, dst):
+        raise OSError("disk full")
+
+    add_event(guild_store, '2', participants={})
+    with monkeypatch.context() as m:
+        m.setattr(raid_bot.os, 'replace', crash)
+        with pytest.raises(OSError):
+            guild_store.save()
+    with open(guild_store.path, 'rb') as f:
+        assert f.read() == before
+
+    guild_store.save()
+    assert set(raid_bot._decode_state(open(guild_store.path, 'rb').read())['events']) == {'1', '2'}
+    assert not os.path.exists(guild_store.path + '.tmp')
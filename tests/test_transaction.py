@@ -0,0 +1,119 @@
+"""Store.transaction: one save on success, a full rollback when the block or the save fails."""
+import asyncio
+
+import pytest
+
+import raid_bot
+from conftest import add_event, signup
+
+
+class Boom(Exception):
+    pass
+
+
+def _run_failing(st, body):
+    async def main():
+        async with st.transaction() as data:
+            body(data)
+            raise Boom
+    with pytest.raises(Boom):
+        asyncio.run(main())
+
+
+@pytest.fixture
+def populated(guild_store):
+    st = guild_store
+    add_event(st, '1', participants={'a': signup('A', 'Tank')}, group_id='1')
+    add_event(st, '2', participants={}, group_id='1')
+    st.data['players']['a'] = raid_bot.Player(name='A', points=20, events_attended=1)
+    st.data['lotteries']['1'] = raid_bot.Lottery(name='Spring', prizes=['x'], status='open', winners=[])
+    st.data['next_event_id'] = 3
+    st._rebuild_indexes()
+    st.save()
+    return st
+
+
+def test_commit_saves_once(populated):
+    st    = populated
+    saved = []
+    st.on_save = saved.append
+
+    async def main():
+        async with st.transaction() as data:
+            raid_bot._set_participant('2', data['events']['2'], 'b', 'B', 'DPS')
+    asyncio.run(main())
+    assert saved == [st]
+    assert 'b' in st.view.events['2']['participants']
+
+
+def test_failed_block_rolls_back_everything(populated):
+    st     = populated
+    before = raid_bot._decode_state(open(st.path, 'rb').read())
+
+    def body(data):
+        raid_bot._set_participant('2', data['events']['2'], 'b', 'B', 'DPS')
+        raid_bot._remove_participant('1', data['events']['1'], 'a')
+        temp   = dict(raid_bot._template_fields('W1 - Gorseval'), name='New', description='',
+                      unix_ts=1_950_000_000, channel_id=None)
+        eid, _ = raid_bot._add_event(data, temp, 1)
+        data['events'][eid]['group_id'] = '1'
+        st.event_index.update(eid, data['events'][eid])
+        data['players']['a']['points'] = 0
+        st.index_player('a')
+        del data['lotteries']['1']
+        st.lottery_search.remove('1')
+        data['series']['1'] = {'name': 'half made'}
+
+    _run_failing(st, body)
+
+    data = st.data
+    assert set(data['events']) == {'1', '2'}
+    assert set(data['events']['1']['participants']) == {'a'}
+    assert data['events']['2']['participants'] == {}
+    assert data['next_event_id'] == 3
+    assert data['players']['a']['points'] == 20
+    assert data['lotteries']['1']['name'] == 'Spring'
+    assert data['series'] == {}
+    # indexes follow the restored records
+    assert st.event_index.by_user == {'a': {'1'}}
+    assert st.event_index.by_group['1'] == {'1', '2'}
+    assert st.event_index.by_time.range() == ['1', '2']
+    assert st.lottery_search.search('spring') == {'1'}
+    assert st.player_rank.page(0, 5) == ['a']
+    # nothing was written, and the next unrelated save doesn't write the failed changes either
+    assert raid_bot._decode_state(open(st.path, 'rb').read()) == before
+    st.save()
+    after = raid_bot._decode_state(open(st.path, 'rb').read())
+    assert set(after['events']) == {'1', '2'}
+    assert set(after['events']['1']['participants']) == {'a'}
+    assert after['players']['a']['points'] == 20
+
+
+def test_rollback_keeps_record_identity(populated):
+    st    = populated
+    event = st.data['events']['1']
+    _run_failing(st, lambda data: data['events']['1'].__setitem__('status', 'closed'))
+    assert st.data['events']['1'] is event
+    assert event['status'] == 'open'
+    assert st.event_index.open_by_time.range() == ['1', '2']
+
+
+def test_rollback_restores_unsaved_changes_from_before(populated):
+    """Changes made before the transaction but not yet saved survive its rollback."""
+    st = populated
+    st.data['events']['1']['message_id'] = 42   # e.g. set while a post was in flight
+    _run_failing(st, lambda data: data['events']['1'].__setitem__('message_id', 7))
+    assert st.data['events']['1']['message_id'] == 42
+
+
+def test_failed_save_rolls_back(populated, monkeypatch):
+    st = populated
+
+    async def main():
+        async with st.transaction() as data:
+            raid_bot._set_participant('2', data['events']['2'], 'b', 'B', 'DPS')
+            monkeypatch.setattr(raid_bot.leader, '_valid_until', 0.0)   # lease lost mid-transaction
+    with pytest.raises(raid_bot.NotLeader):
+        asyncio.run(main())
+    assert st.data['events']['2']['participants'] == {}
+    assert 'b' not in st.event_index.by_user